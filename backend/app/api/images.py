@@ -0,0 +1,52 @@
+from typing import Optional
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import get_db
+from ..models.product import ProductImage
+from ..services.image_store import image_store, is_digest
+from ..utils.image import THUMBNAIL_MEDIA_TYPE
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+@router.get("/{digest}")
+@router.get("/{digest}/{size}")
+async def get_image(
+    digest: str,
+    request: Request,
+    size: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    读取商品图片原图或缩略图
+
+    URL按内容摘要寻址，内容不会变化：以摘要作为ETag，并允许浏览器和CDN长期缓存；
+    图片在 <img> 中直接引用，不要求登录
+    """
+    if not is_digest(digest):
+        raise HTTPException(status_code=404, detail="图片不存在")
+    if size is not None and size not in settings.IMAGE_THUMBNAIL_SIZES:
+        raise HTTPException(status_code=404, detail="不支持的缩略图尺寸")
+
+    etag = f'"{digest}"' if size is None else f'"{digest}-{size}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.IMAGE_CACHE_MAX_AGE}, immutable"
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    path = image_store.path(digest, size)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="图片不存在")
+    if size is None:
+        media_type = db.query(ProductImage.media_type).filter(ProductImage.digest == digest).limit(1).scalar()
+        if media_type is None:
+            raise HTTPException(status_code=404, detail="图片不存在")
+    else:
+        media_type = THUMBNAIL_MEDIA_TYPE
+    return FileResponse(path, media_type=media_type, headers=headers)
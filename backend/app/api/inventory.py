@@ -17,6 +17,7 @@ from ..schemas.inventory import (
     CategoryTurnoverQuery, TurnoverSummary
 )
 from ..auth.jwt import check_permission
+from ..services.category_stats import category_stats
 
 router = APIRouter(prefix="/inventory", tags=["库存分析"])
 
@@ -227,8 +228,8 @@ async def calculate_inventory_analysis(
             db.add(product_turnover)
     
     # 计算品类周转率
-    categories = db.query(Product.category).distinct().all()
-    for category, in categories:
+    for category_row in category_stats.all(db):
+        category = category_row.name or None
         # 获取品类销售数据
         category_sales = db.query(
             func.sum(OrderItem.quantity).label("sales_quantity"),
@@ -243,23 +244,13 @@ async def calculate_inventory_analysis(
             Product.category == category
         ).first()
         
-        # 获取品类库存数据
-        category_inventory = db.query(
-            func.count(Product.id).label("total_products"),
-            func.sum(Product.stock).label("total_stock"),
-            func.sum(Product.stock * Product.cost).label("total_value"),
-            func.count(case((Product.stock > 0, 1), else_=None)).label("active_products"),
-            func.count(case((Product.stock == 0, 1), else_=None)).label("stockout_products"),
-            func.count(case((Product.stock > Product.alert_threshold * 2, 1), else_=None)).label("overstock_products")
-        ).filter(
-            Product.category == category,
-            Product.status == "active"
-        ).first()
+        # 品类库存数据，读取分类维度表
+        category_inventory = category_row
         
         # 计算品类周转指标
         sales_quantity = category_sales.sales_quantity or 0
         sales_amount = category_sales.sales_amount or 0
-        average_stock = category_inventory.total_stock or 0
+        average_stock = category_inventory.stock_units or 0
         
         if average_stock > 0 and period_days > 0:
             category_turnover_rate = (sales_quantity / average_stock) * (365 / period_days)
@@ -276,33 +267,33 @@ async def calculate_inventory_analysis(
         ).first()
         
         if category_turnover:
-            category_turnover.total_products = category_inventory.total_products
-            category_turnover.total_stock = category_inventory.total_stock
-            category_turnover.total_value = category_inventory.total_value
+            category_turnover.total_products = category_inventory.active_count
+            category_turnover.total_stock = category_inventory.stock_units
+            category_turnover.total_value = category_inventory.stock_value
             category_turnover.sales_quantity = sales_quantity
             category_turnover.sales_amount = sales_amount
             category_turnover.turnover_rate = category_turnover_rate
             category_turnover.turnover_days = category_turnover_days
-            category_turnover.active_products = category_inventory.active_products
-            category_turnover.inactive_products = category_inventory.total_products - category_inventory.active_products
-            category_turnover.stockout_products = category_inventory.stockout_products
-            category_turnover.overstock_products = category_inventory.overstock_products
+            category_turnover.active_products = category_inventory.in_stock_count
+            category_turnover.inactive_products = category_inventory.active_count - category_inventory.in_stock_count
+            category_turnover.stockout_products = category_inventory.stockout_count
+            category_turnover.overstock_products = category_inventory.overstock_count
         else:
             category_turnover = CategoryTurnover(
                 category=category,
                 date=analysis_date,
                 type=analysis_type,
-                total_products=category_inventory.total_products,
-                total_stock=category_inventory.total_stock,
-                total_value=category_inventory.total_value,
+                total_products=category_inventory.active_count,
+                total_stock=category_inventory.stock_units,
+                total_value=category_inventory.stock_value,
                 sales_quantity=sales_quantity,
                 sales_amount=sales_amount,
                 turnover_rate=category_turnover_rate,
                 turnover_days=category_turnover_days,
-                active_products=category_inventory.active_products,
-                inactive_products=category_inventory.total_products - category_inventory.active_products,
-                stockout_products=category_inventory.stockout_products,
-                overstock_products=category_inventory.overstock_products
+                active_products=category_inventory.in_stock_count,
+                inactive_products=category_inventory.active_count - category_inventory.in_stock_count,
+                stockout_products=category_inventory.stockout_count,
+                overstock_products=category_inventory.overstock_count
             )
             db.add(category_turnover)
     
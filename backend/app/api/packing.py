@@ -3,13 +3,15 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from fastapi.responses import StreamingResponse
 import pandas as pd
 import io
+import os
 from datetime import datetime
+from sqlalchemy import delete, insert, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..models.packing import PackingList, PackingListItem, BoxQuantity, BoxSpecs
-from ..models.product import Product
+from ..models.import_manifest import ImportStatus
 from ..schemas.packing import (
     PackingListCreate,
     PackingListUpdate,
@@ -18,6 +20,10 @@ from ..schemas.packing import (
     ExportRequest
 )
 from ..auth.jwt import check_permission
+from ..config import settings
+from ..utils.excel import spool_upload, iter_workbook_chunks, cell_text
+from ..services.import_manifest_service import import_manifest_service
+from ..services.product_catalog import product_catalog
 
 router = APIRouter(prefix="/packing-lists", tags=["packing-lists"])
 
@@ -32,12 +38,10 @@ async def create_packing_list(
     """
     try:
         # 验证商品是否存在且有效
+        products = product_catalog.get_many(db, (item.product_id for item in data.items))
         for item in data.items:
-            product = db.query(Product).filter(
-                Product.id == item.product_id,
-                Product.status == "active"
-            ).first()
-            if not product:
+            product = products.get(item.product_id)
+            if not product or product.status != "active":
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"商品ID {item.product_id} 不存在或已停用"
@@ -143,13 +147,11 @@ async def update_packing_list(
             ).delete()
 
             # 创建新明细
+            products = product_catalog.get_many(db, (item.product_id for item in data.items))
             for item_data in data.items:
                 # 验证商品
-                product = db.query(Product).filter(
-                    Product.id == item_data.product_id,
-                    Product.status == "active"
-                ).first()
-                if not product:
+                product = products.get(item_data.product_id)
+                if not product or product.status != "active":
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail=f"商品ID {item_data.product_id} 不存在或已停用"
@@ -214,6 +216,61 @@ async def update_packing_list(
             detail=str(e)
         )
 
+def _create_packing_list(db: Session, store_name: str, type_name: str, user_id: int) -> int:
+    """创建待审核装箱单并返回ID"""
+    packing_list = PackingList(
+        store_name=store_name,
+        type=type_name,
+        status='pending',
+        created_by=user_id
+    )
+    db.add(packing_list)
+    db.flush()  # 获取ID
+    return packing_list.id
+
+def _insert_packing_rows(db: Session, packing_list_id: int, group: pd.DataFrame) -> None:
+    """
+    批量写入一个分组的装箱单明细和装箱数量
+
+    group 中需已包含通过SKU映射得到的 product_id 列
+    """
+    # 校验SKU，与逐行处理时一样报告第一个找不到的SKU
+    missing = group.loc[group['product_id'].isna(), '商品SKU']
+    if not missing.empty:
+        if missing.iloc[0] is None:
+            raise ValueError("商品SKU不能为空")
+        raise ValueError(f"找不到SKU为 {missing.iloc[0]} 的商品")
+    
+    # 批量创建装箱单明细，按参数顺序返回ID
+    item_rows = pd.DataFrame({
+        'packing_list_id': packing_list_id,
+        'product_id': group['product_id'].astype(int),
+        'quantity': group['数量'].astype(int)
+    }).to_dict('records')
+    item_ids = db.execute(
+        insert(PackingListItem).returning(
+            PackingListItem.id, sort_by_parameter_order=True
+        ),
+        item_rows
+    ).scalars().all()
+    
+    # 批量创建装箱明细
+    box_rows = pd.DataFrame({
+        'packing_list_item_id': item_ids,
+        'box_no': group['箱号'].astype(str).to_numpy(),
+        'quantity': group['装箱数量'].astype(int).to_numpy()
+    }).to_dict('records')
+    db.execute(insert(BoxQuantity), box_rows)
+
+def _discard_packing_list(db: Session, packing_list_id: int) -> None:
+    """删除导入失败分组在之前批次中已写入的数据"""
+    item_ids = select(PackingListItem.id).where(
+        PackingListItem.packing_list_id == packing_list_id
+    )
+    db.execute(delete(BoxQuantity).where(BoxQuantity.packing_list_item_id.in_(item_ids)))
+    db.execute(delete(PackingListItem).where(PackingListItem.packing_list_id == packing_list_id))
+    db.execute(delete(PackingList).where(PackingList.id == packing_list_id))
+
 @router.post("/import", response_model=ImportResult)
 async def import_packing_lists(
     file: UploadFile = File(...),
@@ -222,85 +279,107 @@ async def import_packing_lists(
 ):
     """
     从Excel导入装箱单
+
+    上传文件先落盘，再按 IMPORT_CHUNK_ROWS 行分批读取、校验并写入，
+    内存占用与文件大小无关。内容相同的文件直接返回上次结果，
+    上次部分失败时只重新导入失败的店铺/类型分组
     """
+    path = None
+    manifest = None
     try:
-        contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
+        path = await spool_upload(file)
         
-        # 验证Excel格式
-        required_columns = ['店铺名称', '类型', '商品SKU', '数量', '箱号', '装箱数量']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return ImportResult(
-                success=False,
-                error=f"Excel缺少必要列: {', '.join(missing_columns)}"
-            )
+        # 内容相同的文件直接返回上次结果，部分失败时跳过已成功的分组；
+        # 同一文件并发上传时只有一个请求能取得清单并写入
+        manifest, claimed = import_manifest_service.claim(
+            db, "packing", import_manifest_service.hash_file(path), file.filename, current_user.id,
+            stale_seconds=settings.IMPORT_STALE_SECONDS
+        )
+        db.commit()
+        if not claimed:
+            if manifest.status == ImportStatus.COMPLETED:
+                return ImportResult(**manifest.result)
+            return ImportResult(success=False, error="该文件正在导入中，请稍后重试")
+        completed = import_manifest_service.completed_groups(db, manifest)
         
-        # 处理数据
-        success_count = 0
-        error_count = 0
-        error_messages = []
+        required_columns = ['店铺名称', '类型', '商品SKU', '数量', '箱号', '装箱数量']
+        group_ids = {}  # (店铺名称, 类型) -> 装箱单ID
+        failed_groups = {}  # (店铺名称, 类型) -> 错误信息
         
-        # 按店铺名称和类型分组
-        for (store_name, type_name), group in df.groupby(['店铺名称', '类型']):
-            try:
-                # 创建装箱单
-                packing_list = PackingList(
-                    store_name=store_name,
-                    type=type_name,
-                    status='pending',
-                    created_by=current_user.id
+        for df in iter_workbook_chunks(path):
+            # 验证Excel格式
+            missing_columns = [col for col in required_columns if col not in df.columns]
+            if missing_columns:
+                return ImportResult(
+                    success=False,
+                    error=f"Excel缺少必要列: {', '.join(missing_columns)}"
                 )
-                db.add(packing_list)
-                db.flush()  # 获取ID
-                
-                # 处理商品明细
-                for _, row in group.iterrows():
-                    product = db.query(Product).filter(
-                        Product.sku == row['商品SKU']
-                    ).first()
-                    
-                    if not product:
-                        raise ValueError(f"找不到SKU为 {row['商品SKU']} 的商品")
-                    
-                    # 创建装箱单明细
-                    item = PackingListItem(
-                        packing_list_id=packing_list.id,
-                        product_id=product.id,
-                        quantity=row['数量']
-                    )
-                    db.add(item)
+            
+            # 从商品目录批量解析本批所有SKU，避免逐行查询；
+            # 纯数字SKU按文本读取，空单元格不参与解析
+            df['商品SKU'] = df['商品SKU'].map(cell_text)
+            sku_to_id = product_catalog.resolve_skus(db, df['商品SKU'].dropna().unique().tolist())
+            df['product_id'] = df['商品SKU'].map(sku_to_id)
+            
+            # 按店铺名称和类型分组，同一分组可能跨越多个批次
+            for key, group in df.groupby(['店铺名称', '类型']):
+                if key in failed_groups or import_manifest_service.hash_group(*key) in completed:
+                    continue
+                store_name, type_name = key
+                try:
+                    # 每个分组使用独立的保存点，失败时不会残留半成品装箱单
+                    with db.begin_nested():
+                        if key not in group_ids:
+                            group_ids[key] = _create_packing_list(
+                                db, store_name, type_name, current_user.id
+                            )
+                        _insert_packing_rows(db, group_ids[key], group)
                     
-                    # 创建装箱明细
-                    box = BoxQuantity(
-                        packing_list_item_id=item.id,
-                        box_no=str(row['箱号']),
-                        quantity=row['装箱数量']
-                    )
-                    db.add(box)
-                
-                success_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                error_messages.append(f"处理 {store_name} 的数据时出错: {str(e)}")
-                continue
+                except Exception as e:
+                    failed_groups[key] = f"处理 {store_name} 的数据时出错: {str(e)}"
+                    packing_list_id = group_ids.pop(key, None)
+                    if packing_list_id is not None:
+                        _discard_packing_list(db, packing_list_id)
         
-        db.commit()
+        # 分组结果与数据在同一事务中记录到导入清单
+        for (store_name, type_name), packing_list_id in group_ids.items():
+            import_manifest_service.record_group(
+                db, manifest, import_manifest_service.hash_group(store_name, type_name),
+                group_key=f"{store_name}/{type_name}",
+                details={'packing_list_id': packing_list_id}
+            )
+        for (store_name, type_name), message in failed_groups.items():
+            import_manifest_service.record_group(
+                db, manifest, import_manifest_service.hash_group(store_name, type_name),
+                group_key=f"{store_name}/{type_name}",
+                error=message
+            )
         
-        return ImportResult(
+        success_count = len(group_ids)
+        error_count = len(failed_groups)
+        result = ImportResult(
             success=True,
             total=success_count + error_count,
             success_count=success_count,
             error_count=error_count,
-            error_messages=error_messages
+            error_messages=list(failed_groups.values())
         )
+        import_manifest_service.finish(db, manifest, result.dict(), error_count)
+        db.commit()
+        return result
         
     except Exception as e:
+        db.rollback()
+        if manifest is not None and manifest.id is not None:
+            import_manifest_service.fail(db, manifest, str(e))
+            db.commit()
         return ImportResult(
             success=False,
             error=f"导入失败: {str(e)}"
         )
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
 
 @router.post("/export")
 async def export_packing_lists(
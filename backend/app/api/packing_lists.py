@@ -1,19 +1,49 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, status, Response
-from sqlalchemy.orm import Session, joinedload
-from datetime import datetime
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, update, insert, select, literal, Date, DateTime, String
+from sqlalchemy.orm import Session, selectinload
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+import io
 import pandas as pd
 
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..models.packing_list import PackingList, PackingListItem, BoxSpecs
 from ..models.product import Product
+from ..models.stock import TransitStock
+from ..models.import_manifest import ImportManifest, ImportStatus
 from ..schemas.packing_list import (
     PackingListCreate, PackingListUpdate, PackingListResponse,
     PackingListQuery, ImportResult, ExportRequest, BatchApproveRequest,
-    StoreStatistics
+    StoreStatistics, FileImportResult, BatchImportResult, BatchApproveResult,
+    FreightAllocationRequest, FreightAllocationResult, LoadPlanRequest, LoadPlanResult,
+    PrintRequest
 )
 from ..auth.jwt import get_current_user, check_permission
-from ..utils.excel import create_workbook, read_workbook
+from ..config import settings
+from ..services.freight_service import freight_service
+from ..services.import_manifest_service import import_manifest_service
+from ..services.packing_import_service import packing_import_service, init_worker as init_import_worker
+from ..services.load_planning_service import load_planning_service, ContainerSpec
+from ..services.product_catalog import product_catalog
+from ..services.store_statistics_cache import store_statistics_cache
+from ..utils.excel import (
+    spool_upload, extract_workbooks,
+    iter_packing_list_rows, stream_workbook, stream_csv,
+    PACKING_LIST_HEADERS, XLSX_MEDIA_TYPE, CSV_MEDIA_TYPE
+)
+from ..utils.pdf import (
+    render_packing_lists, build_print_documents, merge_pdfs,
+    PDF_MEDIA_TYPE, ZIP_MEDIA_TYPE
+)
+from ..utils.query import iter_keyset, sync_rows
 
 router = APIRouter(prefix="/api/packing-lists", tags=["装箱单"])
 
@@ -40,6 +70,7 @@ async def list_packing_lists(
     total = db.query(PackingList).filter(*query_filter).count()
     packing_lists = (
         db.query(PackingList)
+        .options(selectinload(PackingList.items))
         .filter(*query_filter)
         .order_by(PackingList.created_at.desc())
         .offset((query.page - 1) * query.page_size)
@@ -63,8 +94,8 @@ async def create_packing_list(
     """创建装箱单"""
     # 验证产品是否存在
     product_ids = [item.product_id for item in data.items]
-    products = db.query(Product).filter(Product.id.in_(product_ids)).all()
-    if len(products) != len(product_ids):
+    products = product_catalog.get_many(db, product_ids)
+    if len(products) != len(set(product_ids)):
         raise HTTPException(status_code=400, detail="存在无效的产品ID")
     
     # 创建装箱单
@@ -77,11 +108,13 @@ async def create_packing_list(
         total_volume=sum(spec.volume for spec in data.box_specs),
         total_pieces=sum(item.quantity for item in data.items),
         total_value=sum(
-            item.quantity * next(p.price for p in products if p.id == item.product_id)
+            item.quantity * (products[item.product_id].price or 0)
             for item in data.items
         )
     )
     db.add(packing_list)
+    # 先取得装箱单ID，箱子规格和明细才能关联
+    db.flush()
     
     # 创建箱子规格
     for spec in data.box_specs:
@@ -89,20 +122,17 @@ async def create_packing_list(
         db.add(box_spec)
     
     # 创建装箱单明细
-    for item in data.items:
-        product = next(p for p in products if p.id == item.product_id)
-        packing_item = PackingListItem(
-            packing_list_id=packing_list.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            box_quantities=item.box_quantities,
-            weight=product.weight * item.quantity if hasattr(product, 'weight') else 0,
-            volume=product.volume * item.quantity if hasattr(product, 'volume') else 0
+    db.add_all(
+        PackingListItem.from_catalog(
+            packing_list.id, products[item.product_id], item.quantity,
+            [box.dict() for box in item.box_quantities]
         )
-        db.add(packing_item)
+        for item in data.items
+    )
     
     db.commit()
     db.refresh(packing_list)
+    store_statistics_cache.invalidate(packing_list.created_at)
     return packing_list
 
 @router.get("/{id}", response_model=PackingListResponse)
@@ -112,11 +142,19 @@ async def get_packing_list(
     current_user = Depends(check_permission("packing_lists:read"))
 ):
     """获取装箱单详情"""
-    packing_list = db.query(PackingList).filter(PackingList.id == id).first()
+    packing_list = (
+        db.query(PackingList)
+        .options(selectinload(PackingList.items))
+        .filter(PackingList.id == id)
+        .first()
+    )
     if not packing_list:
         raise HTTPException(status_code=404, detail="装箱单不存在")
     return packing_list
 
+# 编辑装箱单时按产品比对后需要同步的明细列
+ITEM_SYNC_FIELDS = ["quantity", "box_quantities", "weight", "volume"]
+
 @router.put("/{id}", response_model=PackingListResponse)
 async def update_packing_list(
     id: int,
@@ -135,35 +173,47 @@ async def update_packing_list(
             setattr(packing_list, field, value)
     
     if data.items:
-        # 删除原有明细
-        db.query(PackingListItem).filter(PackingListItem.packing_list_id == id).delete()
-        
-        # 验证产品并创建新明细
-        product_ids = [item.product_id for item in data.items]
-        products = db.query(Product).filter(Product.id.in_(product_ids)).all()
+        # 一次性验证产品
+        product_ids = {item.product_id for item in data.items}
+        products = product_catalog.get_many(db, product_ids)
         if len(products) != len(product_ids):
             raise HTTPException(status_code=400, detail="存在无效的产品ID")
-            
-        for item in data.items:
-            product = next(p for p in products if p.id == item.product_id)
-            packing_item = PackingListItem(
-                packing_list_id=id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                box_quantities=item.box_quantities,
-                weight=product.weight * item.quantity if hasattr(product, 'weight') else 0,
-                volume=product.volume * item.quantity if hasattr(product, 'volume') else 0
+        
+        # 按产品与原有明细比对，只增删改有变化的行；
+        # 重量、体积随数量重新计算，数量变化时一并更新
+        items = [
+            PackingListItem.from_catalog(
+                id, products[item.product_id], item.quantity,
+                [box.dict() for box in item.box_quantities]
             )
-            db.add(packing_item)
+            for item in data.items
+        ]
+        sync_rows(
+            db,
+            PackingListItem,
+            [PackingListItem.packing_list_id == id],
+            key_fields=["product_id"],
+            value_fields=ITEM_SYNC_FIELDS,
+            rows=[
+                {
+                    "packing_list_id": id,
+                    "product_id": item.product_id,
+                    **{field: getattr(item, field) for field in ITEM_SYNC_FIELDS}
+                }
+                for item in items
+            ]
+        )
     
     if data.box_specs:
-        # 删除原有箱子规格
-        db.query(BoxSpecs).filter(BoxSpecs.packing_list_id == id).delete()
-        
-        # 创建新箱子规格
-        for spec in data.box_specs:
-            box_spec = BoxSpecs(**spec.dict(), packing_list_id=id)
-            db.add(box_spec)
+        # 按箱子尺寸与重量与原有规格比对
+        sync_rows(
+            db,
+            BoxSpecs,
+            [BoxSpecs.packing_list_id == id],
+            key_fields=["length", "width", "height", "weight"],
+            value_fields=["volume", "edge_volume", "total_pieces"],
+            rows=[{**spec.dict(), "packing_list_id": id} for spec in data.box_specs]
+        )
     
     # 更新汇总信息
     packing_list.total_boxes = sum(spec.total_pieces for spec in data.box_specs) if data.box_specs else packing_list.total_boxes
@@ -173,6 +223,7 @@ async def update_packing_list(
     
     db.commit()
     db.refresh(packing_list)
+    store_statistics_cache.invalidate(packing_list.created_at)
     return packing_list
 
 @router.delete("/{id}")
@@ -186,83 +237,211 @@ async def delete_packing_list(
     if not packing_list:
         raise HTTPException(status_code=404, detail="装箱单不存在")
         
+    created_at = packing_list.created_at
     db.delete(packing_list)
     db.commit()
+    store_statistics_cache.invalidate(created_at)
     return {"message": "删除成功"}
 
+IMPORT_TYPE = "packing_lists"
+
+def _claimed_result(manifest: ImportManifest) -> ImportResult:
+    """未取得导入清单时的结果：已完成返回上次结果，其他请求正在导入时返回当前进度"""
+    if manifest.status == ImportStatus.COMPLETED:
+        result = ImportResult(**manifest.result)
+        result.message = "文件已导入，返回上次导入结果"
+        return result
+    result = ImportResult(**(manifest.result or {'success': False, 'message': ''}))
+    result.success = False
+    result.message = "文件正在导入中，请稍后重试"
+    return result
+
 @router.post("/import", response_model=ImportResult)
 async def import_packing_lists(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user = Depends(check_permission("packing_lists:write"))
 ):
-    """导入装箱单"""
+    """
+    导入装箱单
+
+    上传文件先落盘，再按 IMPORT_CHUNK_ROWS 行分批解析并写入，
+    同一店铺/SKU跨批次出现时合并到已创建的装箱单。
+    内容相同的文件直接返回上次结果；上次部分失败时只重新处理未成功的分组
+    """
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="仅支持Excel文件")
     
+    path = None
+    manifest = None
     try:
-        # 读取Excel文件
-        df = read_workbook(file.file)
-        parsed_data = parse_packing_list(df)
-        
-        result = ImportResult(
-            success=True,
-            message="导入成功",
-            total=len(parsed_data)
+        path = await spool_upload(file)
+        # 同一文件并发上传时只有一个请求能取得清单并写入
+        file_hash = await asyncio.to_thread(import_manifest_service.hash_file, path)
+        manifest, claimed = import_manifest_service.claim(
+            db, IMPORT_TYPE, file_hash, file.filename, current_user.id,
+            stale_seconds=settings.IMPORT_STALE_SECONDS
         )
+        db.commit()
+        if not claimed:
+            return _claimed_result(manifest)
         
-        # 处理每个装箱单
-        for data in parsed_data:
-            try:
-                # 查找或创建产品
-                product = db.query(Product).filter(Product.sku == data['sku']).first()
-                if not product:
-                    product = Product(
-                        sku=data['sku'],
-                        name=data['sku'],
-                        chinese_name=f"待补充({data['sku']})",
-                        type=data['type'],
-                        is_auto_created=True,
-                        needs_completion=True
-                    )
-                    db.add(product)
-                    db.flush()
-                    result.created += 1
-                
-                # 创建装箱单
-                packing_list = PackingList(
-                    store_name=data['store_name'],
-                    type=data['type'],
-                    remarks=data['remarks'],
-                    total_boxes=len(data['box_quantities']),
-                    total_pieces=data['quantity'],
-                    total_weight=0,  # 需要根据实际情况计算
-                    total_volume=0,  # 需要根据实际情况计算
-                    total_value=data['quantity'] * (product.price or 0)
-                )
-                db.add(packing_list)
-                db.flush()
-                
-                # 创建装箱单明细
-                packing_item = PackingListItem(
-                    packing_list_id=packing_list.id,
-                    product_id=product.id,
-                    quantity=data['quantity'],
-                    box_quantities=data['box_quantities']
-                )
-                db.add(packing_item)
-                
-                result.updated += 1
-                
-            except Exception as e:
-                result.failed += 1
-                result.errors.append(f"处理 {data['sku']} 失败: {str(e)}")
+        # 同步写库放到线程中执行，不阻塞事件循环
+        result = ImportResult(success=True, message="导入成功")
+        await asyncio.to_thread(packing_import_service.import_file, db, manifest, path, result)
         
+        import_manifest_service.finish(db, manifest, result.dict(), result.failed)
         db.commit()
         return result
         
     except Exception as e:
+        db.rollback()
+        if manifest is not None and manifest.id is not None:
+            import_manifest_service.fail(db, manifest, str(e))
+            db.commit()
         raise HTTPException(status_code=400, detail=f"导入失败: {str(e)}")
+    finally:
+        # 新建的装箱单创建时间为当前时间
+        store_statistics_cache.invalidate(datetime.now())
+        if path and os.path.exists(path):
+            os.remove(path)
+
+# 批量导入进程池常驻，与打印进程池相同，首次使用时创建；
+# 每个子进程使用自己的数据库连接解析并写入整个文件
+_import_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_import_pool() -> ProcessPoolExecutor:
+    global _import_pool
+    if _import_pool is None:
+        _import_pool = ProcessPoolExecutor(
+            max_workers=settings.IMPORT_WORKERS, initializer=init_import_worker
+        )
+    return _import_pool
+
+@router.post("/import/batch", response_model=BatchImportResult)
+async def batch_import_packing_lists(
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("packing_lists:write"))
+):
+    """
+    批量导入多个店铺的海运ERP装箱单
+
+    支持上传多个"{店铺名}海运ERP.xlsx"文件或包含这些文件的zip压缩包，
+    店铺名称从文件名提取；文件在进程池中并行解析并分批写入，
+    每个文件使用独立的会话与事务。已导入过的文件不再解析
+    """
+    started = time.perf_counter()
+    workdir = tempfile.mkdtemp(prefix="batch_import_")
+    try:
+        # 上传文件落盘，zip压缩包解压为单个Excel文件
+        sources = []
+        for file in files:
+            path = await spool_upload(file, directory=workdir)
+            if file.filename.lower().endswith('.zip'):
+                sources.extend(extract_workbooks(path, workdir))
+            else:
+                sources.append((file.filename, path))
+        
+        if not sources:
+            raise HTTPException(status_code=400, detail="未找到可导入的Excel文件")
+        
+        # 从文件名提取店铺名称，内容相同的已导入文件直接返回上次结果
+        file_results = []
+        jobs = []
+        for filename, path in sources:
+            file_result = FileImportResult(filename=filename)
+            file_results.append(file_result)
+            try:
+                file_result.store_name = PackingList.extract_store_name(filename)
+            except ValueError as e:
+                file_result.errors.append(str(e))
+                continue
+            
+            # 每个文件单独提交取得的清单，并发上传的同一文件只有一个请求写入
+            file_hash = await asyncio.to_thread(import_manifest_service.hash_file, path)
+            manifest, claimed = import_manifest_service.claim(
+                db, IMPORT_TYPE, file_hash, filename, current_user.id,
+                stale_seconds=settings.IMPORT_STALE_SECONDS
+            )
+            db.commit()
+            if not claimed:
+                if manifest.status == ImportStatus.COMPLETED:
+                    file_results[-1] = FileImportResult(**{**manifest.result, 'filename': filename})
+                else:
+                    file_result.errors.append("文件正在导入中，请稍后重试")
+                continue
+            jobs.append((len(file_results) - 1, file_result, path, manifest.id))
+        
+        # 在常驻进程池中并行解析并写入，每个文件在子进程中分批提交，
+        # 解析数据不回传到本进程，内存占用与文件大小无关，也不阻塞事件循环
+        loop = asyncio.get_running_loop()
+        pool = _get_import_pool()
+        outcomes = await asyncio.gather(*(
+            loop.run_in_executor(
+                pool, packing_import_service.run_file, manifest_id, path, file_result.filename, file_result.store_name
+            )
+            for _, file_result, path, manifest_id in jobs
+        ), return_exceptions=True)
+        
+        for (index, file_result, _, manifest_id), outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                # 子进程异常退出，未能记录结果：标记清单失败，之后重新上传可再次取得
+                file_result.errors.append(f"导入失败: {str(outcome)}")
+                import_manifest_service.fail(db, db.get(ImportManifest, manifest_id), f"导入失败: {str(outcome)}")
+                db.commit()
+                continue
+            file_results[index] = FileImportResult(**outcome)
+        
+        elapsed = time.perf_counter() - started
+        total_rows = sum(r.rows for r in file_results)
+        success_files = sum(1 for r in file_results if r.success)
+        return BatchImportResult(
+            success=success_files == len(file_results),
+            message=f"成功导入 {success_files}/{len(file_results)} 个文件",
+            files=file_results,
+            total_rows=total_rows,
+            elapsed_seconds=round(elapsed, 3),
+            rows_per_second=round(total_rows / elapsed, 1) if elapsed > 0 else 0
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"导入失败: {str(e)}")
+    finally:
+        store_statistics_cache.invalidate(datetime.now())
+        shutil.rmtree(workdir, ignore_errors=True)
+
+EXPORT_BATCH_SIZE = 1000
+
+def _iter_export_items(ids: List[int]):
+    """按明细ID游标分批读取导出数据，展开为每箱一行"""
+    # 流式响应在请求结束后仍在读取数据，使用独立会话
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(
+                PackingListItem.id,
+                PackingList.store_name,
+                PackingList.type,
+                PackingList.remarks,
+                Product.sku,
+                Product.chinese_name,
+                PackingListItem.quantity,
+                PackingListItem.weight,
+                PackingListItem.volume,
+                PackingListItem.box_quantities
+            )
+            .join(PackingList, PackingList.id == PackingListItem.packing_list_id)
+            .join(Product, Product.id == PackingListItem.product_id)
+            .filter(PackingListItem.packing_list_id.in_(ids))
+        )
+        items = (row._asdict() for row in iter_keyset(query, PackingListItem.id, EXPORT_BATCH_SIZE))
+        yield from iter_packing_list_rows(items)
+    finally:
+        db.close()
 
 @router.post("/export")
 async def export_packing_lists(
@@ -270,63 +449,237 @@ async def export_packing_lists(
     db: Session = Depends(get_db),
     current_user = Depends(check_permission("packing_lists:read"))
 ):
-    """导出装箱单"""
-    packing_lists = (
-        db.query(PackingList)
-        .filter(PackingList.id.in_(data.ids))
-        .options(
-            joinedload(PackingList.items).joinedload(PackingListItem.product)
+    """
+    导出装箱单
+
+    按明细ID游标分批查询，边查询边写入xlsx/csv并以流式响应返回
+    """
+    exists = db.query(PackingList.id).filter(PackingList.id.in_(data.ids)).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="未找到指定的装箱单")
+    
+    rows = _iter_export_items(data.ids)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if data.format == "csv":
+        content = stream_csv(PACKING_LIST_HEADERS, rows)
+        media_type = CSV_MEDIA_TYPE
+        filename = f"packing_lists_{timestamp}.csv"
+    else:
+        content = stream_workbook(PACKING_LIST_HEADERS, rows, sheet_name="装箱单")
+        media_type = XLSX_MEDIA_TYPE
+        filename = f"packing_lists_{timestamp}.xlsx"
+    
+    # 设置响应头
+    headers = {
+        'Content-Disposition': f'attachment; filename={filename}'
+    }
+    
+    return StreamingResponse(content, media_type=media_type, headers=headers)
+
+# 打印进程池常驻，子进程中注册的字体和模板在多次打印间复用
+_print_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_print_pool() -> ProcessPoolExecutor:
+    global _print_pool
+    if _print_pool is None:
+        _print_pool = ProcessPoolExecutor(max_workers=settings.PRINT_WORKERS)
+    return _print_pool
+
+@router.post("/print")
+async def print_packing_lists(
+    data: PrintRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("packing_lists:read"))
+):
+    """
+    批量打印装箱单和箱标签
+
+    一次查询读取所选装箱单的全部明细，按 PRINT_CHUNK_SIZE 分批在进程池中渲染PDF，
+    合并为一个PDF或按装箱单打包为zip返回
+    """
+    if not data.include_packing_list and not data.include_labels:
+        raise HTTPException(status_code=400, detail="请至少选择装箱单或箱标签")
+    
+    rows = (
+        db.query(
+            PackingListItem.packing_list_id,
+            PackingList.store_name,
+            PackingList.type,
+            PackingList.remarks,
+            Product.sku,
+            Product.chinese_name,
+            PackingListItem.quantity,
+            PackingListItem.box_quantities
         )
+        .join(PackingList, PackingList.id == PackingListItem.packing_list_id)
+        .join(Product, Product.id == PackingListItem.product_id)
+        .filter(PackingListItem.packing_list_id.in_(data.ids))
+        .order_by(PackingListItem.packing_list_id, PackingListItem.id)
         .all()
     )
-    
-    if not packing_lists:
+    documents = build_print_documents(row._asdict() for row in rows)
+    if not documents:
         raise HTTPException(status_code=404, detail="未找到指定的装箱单")
     
-    # 准备导出数据
-    export_data = []
-    for pl in packing_lists:
-        for item in pl.items:
-            item_data = {
-                'store_name': pl.store_name,
-                'type': pl.type,
-                'sku': item.product.sku,
-                'chinese_name': item.product.chinese_name,
-                'quantity': item.quantity,
-                'weight': item.weight,
-                'volume': item.volume,
-                'remarks': pl.remarks,
-                'box_quantities': item.box_quantities
-            }
-            export_data.append(item_data)
+    # 按请求中的顺序打印
+    order = {id: index for index, id in enumerate(data.ids)}
+    documents.sort(key=lambda document: order.get(document['id'], len(order)))
     
-    # 创建Excel文件
-    excel_data = create_workbook(export_data, "packing_list")
+    split = data.format == "zip"
+    chunk_size = settings.PRINT_CHUNK_SIZE
+    loop = asyncio.get_running_loop()
+    outcomes = await asyncio.gather(*(
+        loop.run_in_executor(
+            _get_print_pool(), render_packing_lists,
+            documents[start:start + chunk_size],
+            data.include_packing_list, data.include_labels, split
+        )
+        for start in range(0, len(documents), chunk_size)
+    ))
+    files = [file for outcome in outcomes for file in outcome]
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if split:
+        buffer = io.BytesIO()
+        # PDF已压缩，zip中直接存储
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+            for name, content in files:
+                archive.writestr(name, content)
+        content = buffer.getvalue()
+        media_type = ZIP_MEDIA_TYPE
+        filename = f"packing_lists_{timestamp}.zip"
+    else:
+        content = await asyncio.to_thread(merge_pdfs, [content for _, content in files])
+        media_type = PDF_MEDIA_TYPE
+        filename = f"packing_lists_{timestamp}.pdf"
     
-    # 设置响应头
     headers = {
-        'Content-Disposition': f'attachment; filename=packing_lists_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
-        'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        'Content-Disposition': f'attachment; filename={filename}'
     }
-    
-    return Response(content=excel_data, headers=headers)
+    return Response(content, media_type=media_type, headers=headers)
 
-@router.post("/batch-approve")
+@router.post("/batch-approve", response_model=BatchApproveResult)
 async def batch_approve(
     data: BatchApproveRequest,
     db: Session = Depends(get_db),
     current_user = Depends(check_permission("packing_lists:write"))
 ):
-    """批量审批装箱单"""
-    packing_lists = db.query(PackingList).filter(PackingList.id.in_(data.ids)).all()
-    if not packing_lists:
+    """
+    批量审批装箱单
+
+    通过：一条UPDATE把未审批的装箱单置为approved，再用一条INSERT...SELECT
+    为这些装箱单的全部明细生成在途库存；驳回：装箱单退回pending并取消其在途库存。
+    只处理状态实际变化的装箱单，重复提交不会生成重复的在途库存，全部操作在同一事务中完成
+    """
+    ids = list(set(data.ids))
+    matched = db.query(PackingList.id).filter(PackingList.id.in_(ids)).count()
+    if not matched:
         raise HTTPException(status_code=404, detail="未找到指定的装箱单")
     
-    for pl in packing_lists:
-        pl.status = "approved" if data.action == "approve" else "pending"
+    approve = data.action == "approve"
+    target_status = "approved" if approve else "pending"
+    result = BatchApproveResult(message=f"已{data.action}选中的装箱单", matched=matched)
+    try:
+        changed_ids = db.execute(
+            update(PackingList)
+            .where(
+                PackingList.id.in_(ids),
+                PackingList.status != target_status
+            )
+            .values(status=target_status)
+            .returning(PackingList.id),
+            execution_options={"synchronize_session": False}
+        ).scalars().all()
+        result.changed = len(changed_ids)
+        
+        if changed_ids and approve:
+            shipping_date = data.shipping_date or datetime.now().date()
+            transit_days = settings.AIR_TRANSIT_DAYS if data.transport_type == "air" else settings.SEA_TRANSIT_DAYS
+            estimated_arrival = data.estimated_arrival or shipping_date + timedelta(days=transit_days)
+            now = datetime.utcnow()
+            items = select(
+                PackingListItem.product_id,
+                PackingListItem.packing_list_id,
+                PackingListItem.quantity,
+                literal(shipping_date, Date),
+                literal(estimated_arrival, Date),
+                literal(data.transport_type, String),
+                literal("in_transit", String),
+                literal(now, DateTime),
+                literal(now, DateTime)
+            ).where(PackingListItem.packing_list_id.in_(changed_ids))
+            result.transit_created = db.execute(
+                insert(TransitStock).from_select(
+                    [
+                        "product_id", "packing_list_id", "quantity",
+                        "shipping_date", "estimated_arrival", "transport_type",
+                        "status", "created_at", "updated_at"
+                    ],
+                    items
+                )
+            ).rowcount
+        elif changed_ids:
+            result.transit_cancelled = db.execute(
+                update(TransitStock)
+                .where(
+                    TransitStock.packing_list_id.in_(changed_ids),
+                    TransitStock.status == "in_transit"
+                )
+                .values(status="cancelled", updated_at=datetime.utcnow()),
+                execution_options={"synchronize_session": False}
+            ).rowcount
+        
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    return result
+
+@router.post("/freight/allocate", response_model=FreightAllocationResult)
+async def allocate_freight(
+    data: FreightAllocationRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("packing_lists:write"))
+):
+    """按计费重分摊一批货的头程运费，写入明细的单位到岸成本和产品头程运费"""
+    try:
+        result = freight_service.allocate(
+            db, data.packing_list_ids, data.freight_amount, data.volumetric_divisor
+        )
+        db.commit()
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        db.rollback()
+        raise
+    return result
+
+@router.post("/load-plan", response_model=LoadPlanResult)
+async def plan_container_load(
+    data: LoadPlanRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("packing_lists:read"))
+):
+    """根据装箱单的箱子规格计算集装箱装载方案"""
+    try:
+        boxes = load_planning_service.load_boxes(db, data.packing_list_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not boxes:
+        raise HTTPException(status_code=404, detail="所选装箱单没有箱子规格")
     
-    db.commit()
-    return {"message": f"已{data.action}选中的装箱单"}
+    containers = [ContainerSpec(**spec.dict()) for spec in data.container_types or []]
+    # 计算为纯CPU运算，放到线程中执行以免阻塞事件循环
+    return await asyncio.to_thread(
+        load_planning_service.plan,
+        boxes,
+        containers or None,
+        data.allow_rotation,
+        data.allow_tipping,
+        data.include_positions
+    )
 
 @router.get("/statistics/store", response_model=List[StoreStatistics])
 async def get_store_statistics(
@@ -335,29 +688,54 @@ async def get_store_statistics(
     db: Session = Depends(get_db),
     current_user = Depends(check_permission("packing_lists:read"))
 ):
-    """获取店铺统计信息"""
-    query = db.query(PackingList)
+    """
+    获取店铺统计信息
+
+    按店铺分组的单条聚合查询，商品数来自明细计数子查询；
+    结果按日期范围缓存，范围内的装箱单变更时失效
+    """
+    cached = store_statistics_cache.get(start_date, end_date)
+    if cached is not None:
+        return cached
+    
+    # 每个装箱单的明细数
+    item_counts = (
+        db.query(
+            PackingListItem.packing_list_id.label("packing_list_id"),
+            func.count(PackingListItem.id).label("item_count")
+        )
+        .group_by(PackingListItem.packing_list_id)
+        .subquery()
+    )
+    
+    query = (
+        db.query(
+            PackingList.store_name,
+            func.count(PackingList.id).label("total_lists"),
+            func.coalesce(func.sum(item_counts.c.item_count), 0).label("total_products"),
+            func.coalesce(func.sum(PackingList.total_pieces), 0).label("total_pieces"),
+            func.coalesce(func.sum(PackingList.total_boxes), 0).label("total_boxes"),
+            func.coalesce(func.sum(PackingList.total_value), 0).label("total_value")
+        )
+        .outerjoin(item_counts, item_counts.c.packing_list_id == PackingList.id)
+    )
     
     if start_date:
         query = query.filter(PackingList.created_at >= start_date)
     if end_date:
         query = query.filter(PackingList.created_at <= end_date)
     
-    stats = []
-    for store_name, group in query.group_by(PackingList.store_name):
-        total_lists = group.count()
-        total_products = sum(len(pl.items) for pl in group)
-        total_pieces = sum(pl.total_pieces for pl in group)
-        total_boxes = sum(pl.total_boxes for pl in group)
-        total_value = sum(pl.total_value for pl in group)
-        
-        stats.append(StoreStatistics(
-            store_name=store_name,
-            total_lists=total_lists,
-            total_products=total_products,
-            total_pieces=total_pieces,
-            total_boxes=total_boxes,
-            total_value=total_value
-        ))
+    stats = [
+        StoreStatistics(
+            store_name=row.store_name,
+            total_lists=row.total_lists,
+            total_products=row.total_products,
+            total_pieces=row.total_pieces,
+            total_boxes=row.total_boxes,
+            total_value=row.total_value
+        )
+        for row in query.group_by(PackingList.store_name).all()
+    ]
     
-    return stats 
\ No newline at end of file
+    store_statistics_cache.set(start_date, end_date, stats)
+    return stats
@@ -1,49 +1,54 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy import or_, func
+from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File
+from sqlalchemy import or_, func, select
 from sqlalchemy.orm import Session
 from fastapi.responses import StreamingResponse
-from fastapi_cache.decorator import cache
-import pandas as pd
-import io
 from datetime import datetime, timedelta
+import asyncio
+import os
 
-from ..database import get_db
-from ..models.product import Product
-from ..schemas.product import ProductResponse, ProductExportRequest, ProductListResponse
+from ..database import get_db, SessionLocal
+from ..models.product import Product, ProductImage
+from ..schemas.product import (
+    CategorySummary, ProductResponse, ProductExportRequest, ProductImageResponse, ProductListResponse,
+    ProductImportResult, TagFacet
+)
 from ..auth.jwt import check_permission
+from ..utils.excel import spool_upload, stream_workbook, stream_csv, XLSX_MEDIA_TYPE, CSV_MEDIA_TYPE
+from ..services.category_stats import category_stats
+from ..services.image_store import image_store
+from ..services.product_facets import active_condition, product_facet_counter
+from ..services.product_import_service import product_import_service
+from ..services.product_search import product_search_index
+from ..services.product_tags import product_tag_index
+from ..services.response_cache import response_cache, category_tag, PRODUCT_TAG, STOCK_TAG
+from ..utils.query import iter_keyset
 
 router = APIRouter(prefix="/products", tags=["products"])
 
-@router.get("/search", response_model=ProductListResponse)
-@cache(expire=300)  # 缓存5分钟
-async def search_products(
+def _search_tags(params: dict) -> list:
+    """按分类筛选的搜索只受该分类商品变更影响"""
+    if params.get("category"):
+        return [category_tag(params["category"])]
+    return [PRODUCT_TAG, STOCK_TAG]
+
+def _filter_products(
+    query,
     keyword: Optional[str] = None,
     type: Optional[str] = None,
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     in_stock: Optional[bool] = None,
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user = Depends(check_permission("products:read"))
+    tags_any: Optional[List[str]] = None,
+    tags_all: Optional[List[str]] = None
 ):
-    """
-    搜索商品(带分页)
-    """
-    # 构建基础查询
-    query = db.query(Product).filter(Product.status == "active")
+    """为商品查询加上搜索条件，只包含有效商品"""
+    query = query.filter(active_condition())
     
-    # 关键词搜索
+    # 关键词搜索，使用搜索索引过滤并按相关度排序
     if keyword:
-        query = query.filter(
-            or_(
-                Product.sku.ilike(f"%{keyword}%"),
-                Product.name.ilike(f"%{keyword}%"),
-                Product.chinese_name.ilike(f"%{keyword}%")
-            )
-        )
+        query = product_search_index.apply(query, keyword)
     
     # 类型筛选
     if type:
@@ -66,35 +71,99 @@ async def search_products(
         else:
             query = query.filter(Product.stock == 0)
     
+    # 标签筛选
+    query = product_tag_index.apply(query, tags_any, tags_all)
+    
+    return query
+
+@router.get("/search", response_model=ProductListResponse)
+@response_cache.cached(expire=300, tags=_search_tags, response_model=ProductListResponse)  # 缓存5分钟
+async def search_products(
+    keyword: Optional[str] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+    tags_any: Optional[List[str]] = Query(None),
+    tags_all: Optional[List[str]] = Query(None),
+    facets: bool = False,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("products:read"))
+):
+    """
+    搜索商品(带分页)
+
+    tags_any 命中任一标签，tags_all 需包含全部标签，均由标签索引筛选；
+    facets 为 True 时同时返回当前条件下按分类、类型、库存状态和价格区间的商品数
+    """
+    query = _filter_products(
+        db.query(Product), keyword, type, category, min_price, max_price, in_stock, tags_any, tags_all
+    )
+    
+    # 分面统计：只有分类、类型、库存条件时读计数表，否则对筛选结果做一次分组统计
+    facet_counts = None
+    if facets:
+        if keyword or tags_any or tags_all or min_price is not None or max_price is not None:
+            counts = product_facet_counter.grouped(query)
+        else:
+            counts = product_facet_counter.counts(db, category, type, in_stock)
+        facet_counts = product_facet_counter.summarize(counts)
+    
     # 计算总数
     total = query.count()
     
-    # 分页
+    # 分页，关键词搜索时先按相关度再按SKU排序
     query = query.order_by(Product.sku)
     query = query.offset((page - 1) * page_size).limit(page_size)
     
     # 执行查询
     products = query.all()
     
+    # 列表只返回缩略图URL
+    thumbnails = image_store.list_thumbnails(db, [product.id for product in products])
+    for product in products:
+        product.thumbnails = thumbnails.get(product.id, [])
+    
     return {
         "items": products,
         "total": total,
         "page": page,
-        "page_size": page_size
+        "page_size": page_size,
+        "facets": facet_counts
     }
 
 @router.get("/categories", response_model=List[str])
-@cache(expire=3600)  # 缓存1小时
+@response_cache.cached(expire=3600, tags=[PRODUCT_TAG])  # 缓存1小时
 async def get_categories(
     db: Session = Depends(get_db),
     current_user = Depends(check_permission("products:read"))
 ):
-    """获取所有商品分类"""
-    categories = db.query(Product.category).distinct().all()
-    return [c[0] for c in categories if c[0]]
+    """获取所有商品分类，读取分类维度表"""
+    return [category.name for category in category_stats.all(db) if category.name]
+
+@router.get("/categories/summary", response_model=List[CategorySummary])
+@response_cache.cached(expire=300, tags=[PRODUCT_TAG, STOCK_TAG])  # 缓存5分钟
+async def get_category_summary(
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("products:read"))
+):
+    """获取各分类的商品数与库存汇总"""
+    return [
+        {
+            "category": category.name or None,
+            "product_count": category.product_count,
+            "active_count": category.active_count,
+            "stock_units": category.stock_units,
+            "stock_value": category.stock_value,
+        }
+        for category in category_stats.all(db)
+    ]
 
 @router.get("/statistics", response_model=dict)
-@cache(expire=300)  # 缓存5分钟
+@response_cache.cached(expire=300, tags=[PRODUCT_TAG, STOCK_TAG])  # 缓存5分钟
 async def get_statistics(
     db: Session = Depends(get_db),
     current_user = Depends(check_permission("products:read"))
@@ -107,7 +176,7 @@ async def get_statistics(
         func.avg(Product.price).label('avg_price'),
         func.count(func.nullif(Product.stock > 0, False)).label('in_stock_count'),
         func.count(func.nullif(Product.stock <= Product.alert_threshold, False)).label('low_stock_count')
-    ).filter(Product.status == 'active').first()
+    ).filter(active_condition()).first()
     
     return {
         "total_products": stats.total_products or 0,
@@ -117,20 +186,201 @@ async def get_statistics(
         "low_stock_count": stats.low_stock_count or 0
     }
 
+@router.get("/tags", response_model=List[TagFacet])
+@response_cache.cached(expire=300, tags=_search_tags)  # 缓存5分钟
+async def get_tag_facets(
+    keyword: Optional[str] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+    tags_any: Optional[List[str]] = Query(None),
+    tags_all: Optional[List[str]] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("products:read"))
+):
+    """
+    按标签统计符合搜索条件的商品数
+
+    在标签索引上分组计数，商品表只用于按搜索条件限定商品ID
+    """
+    product_ids = _filter_products(
+        db.query(Product.id), keyword, type, category, min_price, max_price, in_stock, tags_any, tags_all
+    ).order_by(None).subquery()
+    return product_tag_index.facet_counts(db, select(product_ids.c.id), limit)
+
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+    file: UploadFile = File(...),
+    mode: str = Query("upsert", pattern="^(insert|upsert)$"),
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("products:write"))
+):
+    """
+    批量导入产品（CSV/XLSX）
+
+    按SKU写入：upsert 更新已有产品（空单元格保留原值），insert 跳过已有SKU；
+    表头可使用导出列名或字段名，返回逐行错误报告
+    """
+    if not file.filename.lower().endswith(('.xlsx', '.csv')):
+        raise HTTPException(status_code=400, detail="仅支持xlsx或csv文件")
+    
+    path = None
+    try:
+        path = await spool_upload(file)
+        # 解析与写入在线程中执行，不阻塞事件循环
+        return await asyncio.to_thread(
+            product_import_service.import_file, db, path, file.filename, mode, current_user.id
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"导入失败: {str(e)}")
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def _image_response(image: ProductImage) -> dict:
+    return {
+        **{column: getattr(image, column) for column in (
+            "id", "product_id", "digest", "media_type", "width", "height", "size", "position"
+        )},
+        "url": image_store.url(image.digest),
+        "thumbnails": image_store.thumbnail_urls(image.digest),
+    }
+
+@router.get("/{product_id}/images", response_model=List[ProductImageResponse])
+async def get_product_images(
+    product_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("products:read"))
+):
+    """商品图片（原图与各尺寸缩略图URL），按显示顺序"""
+    images = db.query(ProductImage).filter(
+        ProductImage.product_id == product_id
+    ).order_by(ProductImage.position, ProductImage.id).all()
+    return [_image_response(image) for image in images]
+
+@router.post("/{product_id}/images", response_model=ProductImageResponse)
+async def upload_product_image(
+    product_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("products:write"))
+):
+    """
+    上传商品图片
+
+    图片分块写盘并按内容摘要去重，缩略图在进程池中生成；
+    同一商品重复上传相同图片时返回已有记录
+    """
+    product = db.query(Product).filter(Product.id == product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="商品不存在")
+    
+    try:
+        digest, size = await image_store.save(file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        info = await image_store.process(digest)
+    except ValueError as e:
+        if not image_store.is_referenced(db, digest):
+            image_store.remove(digest)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    image = db.query(ProductImage).filter(
+        ProductImage.product_id == product_id,
+        ProductImage.digest == digest
+    ).first()
+    if image:
+        return _image_response(image)
+    
+    position = db.query(func.max(ProductImage.position)).filter(
+        ProductImage.product_id == product_id
+    ).scalar()
+    image = ProductImage(
+        product_id=product_id,
+        digest=digest,
+        size=size,
+        position=0 if position is None else position + 1,
+        **info
+    )
+    db.add(image)
+    db.commit()
+    db.refresh(image)
+    response_cache.invalidate(PRODUCT_TAG, category_tag(product.category))
+    return _image_response(image)
+
+@router.delete("/{product_id}/images/{image_id}")
+async def delete_product_image(
+    product_id: int,
+    image_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("products:write"))
+):
+    """删除商品图片，图片文件不再被任何商品引用时一并删除"""
+    image = db.query(ProductImage).filter(
+        ProductImage.id == image_id,
+        ProductImage.product_id == product_id
+    ).first()
+    if not image:
+        raise HTTPException(status_code=404, detail="图片不存在")
+    
+    digest = image.digest
+    category = db.query(Product.category).filter(Product.id == product_id).scalar()
+    db.delete(image)
+    db.commit()
+    if not image_store.is_referenced(db, digest):
+        image_store.remove(digest)
+    response_cache.invalidate(PRODUCT_TAG, category_tag(category))
+    return {"message": "删除成功"}
+
+# 导出字段（列名, 列宽）
+EXPORT_FIELDS = {
+    "sku": ("SKU", 18),
+    "name": ("商品名称", 30),
+    "chinese_name": ("中文名称", 30),
+    "type": ("类型", 10),
+    "category": ("分类", 15),
+    "price": ("价格", 12),
+    "cost": ("成本", 12),
+    "stock": ("库存", 10),
+    "alert_threshold": ("预警阈值", 10),
+    "status": ("状态", 10)
+}
+
+EXPORT_BATCH_SIZE = 1000
+
+def _iter_export_rows(filters: list, columns: list):
+    """按主键游标分批读取导出数据，只查询选中的列"""
+    # 流式响应在请求结束后仍在读取数据，使用独立会话
+    db = SessionLocal()
+    try:
+        query = db.query(Product.id, *columns).filter(*filters)
+        for row in iter_keyset(query, Product.id, EXPORT_BATCH_SIZE):
+            yield list(row[1:])
+    finally:
+        db.close()
+
 @router.post("/export")
 async def export_products(
     request: ProductExportRequest,
     db: Session = Depends(get_db),
     current_user = Depends(check_permission("products:read"))
 ):
-    """导出产品列表(优化大数据量处理)"""
-    # 分批次查询数据
-    BATCH_SIZE = 1000
-    query = db.query(Product).filter(Product.status == "active")
+    """
+    导出产品列表
+
+    按主键游标分批查询，边查询边写入xlsx/csv并以流式响应返回，
+    内存占用与导出行数无关
+    """
+    filters = [active_condition()]
     
     # 应用过滤条件
     if request.keyword:
-        query = query.filter(
+        filters.append(
             or_(
                 Product.sku.ilike(f"%{request.keyword}%"),
                 Product.name.ilike(f"%{request.keyword}%"),
@@ -139,86 +389,49 @@ async def export_products(
         )
     
     if request.type:
-        query = query.filter(Product.type == request.type)
+        filters.append(Product.type == request.type)
     
     if request.category:
-        query = query.filter(Product.category == request.category)
+        filters.append(Product.category == request.category)
         
     if request.min_price is not None:
-        query = query.filter(Product.price >= request.min_price)
+        filters.append(Product.price >= request.min_price)
         
     if request.max_price is not None:
-        query = query.filter(Product.price <= request.max_price)
+        filters.append(Product.price <= request.max_price)
         
     if request.in_stock is not None:
         if request.in_stock:
-            query = query.filter(Product.stock > 0)
+            filters.append(Product.stock > 0)
         else:
-            query = query.filter(Product.stock == 0)
+            filters.append(Product.stock == 0)
     
-    # 准备数据
-    data = []
-    field_mapping = {
-        "sku": "SKU",
-        "name": "商品名称",
-        "chinese_name": "中文名称",
-        "type": "类型",
-        "category": "分类",
-        "price": "价格",
-        "cost": "成本",
-        "stock": "库存",
-        "alert_threshold": "预警阈值",
-        "supplier": "供应商",
-        "status": "状态"
-    }
-    
-    selected_fields = request.fields or list(field_mapping.keys())
-    
-    # 分批处理数据
-    offset = 0
-    while True:
-        batch = query.order_by(Product.id).offset(offset).limit(BATCH_SIZE).all()
-        if not batch:
-            break
-            
-        for product in batch:
-            item = {}
-            for field in selected_fields:
-                if field in field_mapping:
-                    item[field_mapping[field]] = getattr(product, field)
-            data.append(item)
-            
-        offset += BATCH_SIZE
-        
-        # 如果数据量太大,可能需要主动清理内存
-        if offset % (BATCH_SIZE * 10) == 0:
-            import gc
-            gc.collect()
-    
-    # 创建Excel文件
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-    
-    # 使用xlsxwriter引擎处理大文件
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='产品列表')
-        
-        # 调整列宽
-        worksheet = writer.sheets['产品列表']
-        for idx, col in enumerate(df.columns):
-            max_length = max(
-                df[col].astype(str).apply(len).max(),
-                len(col)
-            )
-            worksheet.set_column(idx, idx, max_length + 2)
+    matching = product_tag_index.matching(request.tags_any, request.tags_all)
+    if matching is not None:
+        filters.append(Product.id.in_(matching))
     
-    output.seek(0)
+    # 在开始流式响应前解析导出列，无效字段返回400而不是中断下载
+    selected_fields = request.fields or list(EXPORT_FIELDS.keys())
+    invalid_fields = [field for field in selected_fields if field not in EXPORT_FIELDS]
+    if invalid_fields:
+        raise HTTPException(status_code=400, detail=f"无效的字段: {', '.join(invalid_fields)}")
+    columns = [getattr(Product, field) for field in selected_fields]
+    headers = [EXPORT_FIELDS[field] for field in selected_fields]
+    rows = _iter_export_rows(filters, columns)
     
     # 生成文件名
-    filename = f"products_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if request.format == "csv":
+        content = stream_csv(headers, rows)
+        media_type = CSV_MEDIA_TYPE
+        filename = f"products_{timestamp}.csv"
+    else:
+        content = stream_workbook(headers, rows, sheet_name='产品列表')
+        media_type = XLSX_MEDIA_TYPE
+        filename = f"products_{timestamp}.xlsx"
     
     return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        content,
+        media_type=media_type,
         headers={"Content-Disposition": f"attachment; filename={filename}"}
-    ) 
\ No newline at end of file
+    )
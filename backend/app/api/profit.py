@@ -17,6 +17,7 @@ from ..schemas.profit import (
     CategoryProfitQuery, ProfitSummary
 )
 from ..auth.jwt import check_permission
+from ..services.category_stats import category_stats
 
 router = APIRouter(prefix="/profit", tags=["利润分析"])
 
@@ -160,7 +161,7 @@ async def calculate_profit_analysis(
         # 计算成本
         unit_cost = product.cost
         total_cost = unit_cost * sales_quantity
-        shipping_cost = sales_quantity * 5  # 假设每件商品5元运费
+        shipping_cost = sales_quantity * (product.freight_cost or 0)  # 头程运费分摊得到的单位运费
         
         # 计算利润
         gross_profit = sales_amount - total_cost
@@ -205,8 +206,8 @@ async def calculate_profit_analysis(
             db.add(product_profit)
     
     # 计算品类利润
-    categories = db.query(Product.category).distinct().all()
-    for category, in categories:
+    for category_row in category_stats.all(db):
+        category = category_row.name or None
         # 获取品类销售数据
         category_sales = db.query(
             func.count(distinct(Order.id)).label("total_orders"),
@@ -222,11 +223,8 @@ async def calculate_profit_analysis(
             Product.category == category
         ).first()
         
-        # 获取品类商品数量
-        total_products = db.query(func.count(Product.id)).filter(
-            Product.category == category,
-            Product.status == "active"
-        ).scalar()
+        # 品类有效商品数量，读取分类维度表
+        total_products = category_row.active_count
         
         total_orders = category_sales.total_orders or 0
         sales_quantity = category_sales.sales_quantity or 0
@@ -234,7 +232,8 @@ async def calculate_profit_analysis(
         
         # 计算成本
         category_cost = db.query(
-            func.sum(OrderItem.quantity * Product.cost).label("product_cost")
+            func.sum(OrderItem.quantity * Product.cost).label("product_cost"),
+            func.sum(OrderItem.quantity * func.coalesce(Product.freight_cost, 0)).label("shipping_cost")
         ).join(
             Order, OrderItem.order_id == Order.id
         ).join(
@@ -246,7 +245,7 @@ async def calculate_profit_analysis(
         ).first()
         
         product_cost = category_cost.product_cost or 0
-        shipping_cost = sales_quantity * 5  # 假设每件商品5元运费
+        shipping_cost = category_cost.shipping_cost or 0  # 头程运费分摊得到的单位运费
         operation_cost = total_orders * 10  # 假设每单10元运营成本
         
         # 计算利润
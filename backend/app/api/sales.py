@@ -1,18 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
+from sqlalchemy import func, desc, and_, case
 from typing import List, Optional
 from datetime import datetime, date, timedelta
+import asyncio
+import os
 
+from ..config import settings
 from ..database import get_db
+from ..models.import_manifest import ImportManifest
 from ..models.sales import Order, OrderItem, SalesStatistics
 from ..models.product import Product
 from ..schemas.sales import (
     OrderCreate, OrderUpdate, OrderResponse, OrderQuery,
     SalesStatisticsCreate, SalesStatisticsUpdate, SalesStatisticsResponse,
-    SalesQuery, SalesSummary
+    SalesQuery, SalesSummary, OrderImportJob
 )
 from ..auth.jwt import check_permission
+from ..services.import_manifest_service import import_manifest_service
+from ..services.order_import_service import order_import_service
+from ..services.order_service import order_service
+from ..services.sales_statistics_service import sales_statistics_service
+from ..utils.excel import spool_upload
 
 router = APIRouter(prefix="/sales", tags=["销售管理"])
 
@@ -65,57 +74,100 @@ async def create_order(
     db: Session = Depends(get_db),
     current_user = Depends(check_permission("sales:write"))
 ):
-    """创建订单"""
-    # 生成订单编号
-    order_no = f"SO{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    
-    # 计算订单金额
-    subtotal = sum(item.quantity * item.unit_price for item in data.items)
-    total = subtotal + data.shipping_fee + data.tax - data.discount
-    
-    # 创建订单
-    order = Order(
-        **data.dict(exclude={'items'}),
-        order_no=order_no,
-        subtotal=subtotal,
-        total=total,
-        operator_id=current_user.id
-    )
-    
-    db.add(order)
-    db.flush()  # 获取订单ID
+    """创建订单，同一事务中原子扣减库存"""
+    return _create_orders(db, [data], current_user.id)[0]
+
+@router.post("/orders/batch", response_model=List[OrderResponse])
+async def create_orders(
+    data: List[OrderCreate],
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("sales:write"))
+):
+    """批量创建订单，任一订单失败时全部不创建"""
+    if not data:
+        raise HTTPException(status_code=400, detail="订单列表不能为空")
+    return _create_orders(db, data, current_user.id)
+
+def _create_orders(db: Session, orders: List[OrderCreate], operator_id: int) -> List[Order]:
+    try:
+        return order_service.create_orders(db, orders, operator_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _import_job(manifest: ImportManifest) -> dict:
+    return {
+        "id": manifest.id,
+        "filename": manifest.filename,
+        "status": manifest.status.value if manifest.status else None,
+        "result": manifest.result,
+        "error": manifest.error
+    }
+
+@router.post("/orders/import", response_model=OrderImportJob)
+async def import_orders(
+    background_tasks: BackgroundTasks,
+    platform: str = Query(..., description="平台，决定列映射"),
+    store_name: Optional[str] = Query(None, description="文件中没有店铺列时使用的店铺名称"),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("sales:write"))
+):
+    """
+    导入平台订单导出文件（CSV/XLSX）
+
+    文件落盘后在后台任务中按平台列映射逐块导入，立即返回任务；
+    通过 GET /sales/orders/import/{job_id} 查询进度。内容相同的文件已导入完成时直接返回上次结果
+    """
+    if not file.filename.lower().endswith(('.xlsx', '.csv')):
+        raise HTTPException(status_code=400, detail="仅支持xlsx或csv文件")
+    try:
+        order_import_service.mapping(platform)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # 创建订单明细
-    for item_data in data.items:
-        product = db.query(Product).filter(Product.id == item_data.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"产品ID {item_data.product_id} 不存在")
-        
-        # 计算明细金额
-        item_subtotal = item_data.quantity * item_data.unit_price
-        item_total = item_subtotal + item_data.tax - item_data.discount
-        
-        # 创建明细
-        item = OrderItem(
-            order_id=order.id,
-            **item_data.dict(),
-            subtotal=item_subtotal,
-            total=item_total,
-            sku=product.sku,
-            product_name=product.name
+    path = None
+    try:
+        path = await spool_upload(file)
+        file_hash = await asyncio.to_thread(import_manifest_service.hash_file, path)
+        import_type = f"orders:{platform}:{store_name}" if store_name else f"orders:{platform}"
+        # 新文件，或上次失败、部分失败、中断后重新导入（未变化的订单按内容哈希跳过）；
+        # 已完成或正由其他请求导入时直接返回该任务
+        manifest, claimed = import_manifest_service.claim(
+            db, import_type, file_hash, file.filename, current_user.id,
+            stale_seconds=settings.ORDER_IMPORT_STALE_SECONDS
         )
+        db.commit()
+        if not claimed:
+            return _import_job(manifest)
         
-        db.add(item)
-        
-        # 更新库存
-        product.stock -= item_data.quantity
-        if product.stock < 0:
-            raise HTTPException(status_code=400, detail=f"产品 {product.name} 库存不足")
-    
-    db.commit()
-    db.refresh(order)
-    
-    return order
+        background_tasks.add_task(
+            order_import_service.run, manifest.id, path, file.filename, platform, store_name, current_user.id
+        )
+        path = None  # 由后台任务删除
+        return _import_job(manifest)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"导入失败: {str(e)}")
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+@router.get("/orders/import/{job_id}", response_model=OrderImportJob)
+async def get_order_import(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(check_permission("sales:read"))
+):
+    """查询平台订单导入任务的进度与结果"""
+    manifest = db.query(ImportManifest).filter(
+        ImportManifest.id == job_id,
+        ImportManifest.import_type.like("orders:%")
+    ).first()
+    if not manifest:
+        raise HTTPException(status_code=404, detail="导入任务不存在")
+    return _import_job(manifest)
 
 @router.get("/orders/{id}", response_model=OrderResponse)
 async def get_order(
@@ -186,95 +238,17 @@ async def calculate_sales_statistics(
     db: Session = Depends(get_db),
     current_user = Depends(check_permission("sales:write"))
 ):
-    """计算指定日期范围的销售统计"""
-    current_date = start_date
-    while current_date <= end_date:
-        # 按店铺和平台分组计算统计数据
-        stats_data = db.query(
-            Order.store_name,
-            Order.platform,
-            func.count(Order.id).label("order_count"),
-            func.sum(case((Order.status == "completed", 1), else_=0)).label("completed_order_count"),
-            func.sum(case((Order.status == "cancelled", 1), else_=0)).label("cancelled_order_count"),
-            func.sum(Order.total).label("total_sales"),
-            func.sum(Order.shipping_fee).label("shipping_fee"),
-            func.sum(Order.tax).label("tax"),
-            func.sum(Order.discount).label("discount")
-        ).filter(
-            Order.order_date == current_date
-        ).group_by(
-            Order.store_name,
-            Order.platform
-        ).all()
-        
-        for store_name, platform, order_count, completed_count, cancelled_count, total_sales, shipping_fee, tax, discount in stats_data:
-            # 计算商品统计
-            items_data = db.query(
-                func.sum(OrderItem.quantity).label("total_items"),
-                func.count(distinct(OrderItem.product_id)).label("unique_items"),
-                func.sum(OrderItem.quantity * Product.cost).label("total_cost")
-            ).join(
-                Order, OrderItem.order_id == Order.id
-            ).join(
-                Product, OrderItem.product_id == Product.id
-            ).filter(
-                Order.order_date == current_date,
-                Order.store_name == store_name,
-                Order.platform == platform
-            ).first()
-            
-            # 计算平均订单金额和转化率
-            average_order_value = total_sales / order_count if order_count > 0 else 0
-            conversion_rate = completed_count / order_count if order_count > 0 else 0
-            
-            # 创建或更新统计记录
-            stats = db.query(SalesStatistics).filter(
-                SalesStatistics.date == current_date,
-                SalesStatistics.store_name == store_name,
-                SalesStatistics.platform == platform
-            ).first()
-            
-            if stats:
-                # 更新现有记录
-                stats.order_count = order_count
-                stats.completed_order_count = completed_count
-                stats.cancelled_order_count = cancelled_count
-                stats.total_sales = total_sales
-                stats.total_cost = items_data.total_cost
-                stats.gross_profit = total_sales - items_data.total_cost
-                stats.shipping_fee = shipping_fee
-                stats.tax = tax
-                stats.discount = discount
-                stats.total_items = items_data.total_items
-                stats.unique_items = items_data.unique_items
-                stats.average_order_value = average_order_value
-                stats.conversion_rate = conversion_rate
-            else:
-                # 创建新记录
-                stats = SalesStatistics(
-                    date=current_date,
-                    store_name=store_name,
-                    platform=platform,
-                    order_count=order_count,
-                    completed_order_count=completed_count,
-                    cancelled_order_count=cancelled_count,
-                    total_sales=total_sales,
-                    total_cost=items_data.total_cost,
-                    gross_profit=total_sales - items_data.total_cost,
-                    shipping_fee=shipping_fee,
-                    tax=tax,
-                    discount=discount,
-                    total_items=items_data.total_items,
-                    unique_items=items_data.unique_items,
-                    average_order_value=average_order_value,
-                    conversion_rate=conversion_rate
-                )
-                db.add(stats)
-        
-        current_date += timedelta(days=1)
-    
+    """
+    计算指定日期范围的销售统计
+
+    整个范围一次计算：订单和明细各一次分组查询，一条批量 upsert 写入
+    """
+    try:
+        count = sales_statistics_service.calculate(db, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     db.commit()
-    return {"message": "销售统计计算完成"}
+    return {"message": "销售统计计算完成", "count": count}
 
 @router.get("/summary", response_model=SalesSummary)
 async def get_sales_summary(
@@ -1,47 +0,0 @@
-from pydantic import BaseModel
-from typing import List
-import os
-from dotenv import load_dotenv
-
-# 加载环境变量
-load_dotenv()
-
-class Settings(BaseModel):
-    # 基础配置
-    DEBUG: bool = True
-    API_V1_STR: str = "/api/v1"
-    PROJECT_NAME: str = "ANY-GO"
-    
-    # 数据库配置
-    POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
-    POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "postgres")
-    POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
-    POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
-    POSTGRES_DB: str = os.getenv("POSTGRES_DB", "any_go")
-    DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
-    
-    # 安全配置
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
-    
-    # CORS配置
-    CORS_ORIGINS: List[str] = ["http://localhost:5173"]
-    
-    # 文件上传配置
-    UPLOAD_DIR: str = "uploads"
-    MAX_UPLOAD_SIZE: int = 5 * 1024 * 1024  # 5MB
-    
-    # 邮件配置
-    SMTP_TLS: bool = True
-    SMTP_PORT: int = 587
-    SMTP_HOST: str = "smtp.gmail.com"
-    SMTP_USER: str = ""
-    SMTP_PASSWORD: str = ""
-    EMAILS_FROM_EMAIL: str = ""
-    EMAILS_FROM_NAME: str = ""
-
-    class Config:
-        case_sensitive = True
-
-# 创建全局配置实例
-settings = Settings()
\ No newline at end of file
@@ -1,4 +1,2 @@
 from .database import DatabaseSettings
-
-# 创建数据库配置实例
-settings = DatabaseSettings()
\ No newline at end of file
+from .settings import Settings, settings
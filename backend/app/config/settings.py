@@ -0,0 +1,101 @@
+from pydantic import BaseModel
+from typing import List
+import os
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+class Settings(BaseModel):
+    # 基础配置
+    DEBUG: bool = True
+    API_V1_STR: str = "/api/v1"
+    PROJECT_NAME: str = "ANY-GO"
+    
+    # 数据库配置
+    POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
+    POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "postgres")
+    POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
+    POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
+    POSTGRES_DB: str = os.getenv("POSTGRES_DB", "any_go")
+    DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    
+    # 安全配置
+    SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    
+    # CORS配置
+    CORS_ORIGINS: List[str] = ["http://localhost:5173"]
+    
+    # 文件上传配置
+    UPLOAD_DIR: str = "uploads"
+    MAX_UPLOAD_SIZE: int = 5 * 1024 * 1024  # 5MB
+    
+    # Excel导入配置
+    IMPORT_MAX_FILE_SIZE: int = int(os.getenv("IMPORT_MAX_FILE_SIZE", 100 * 1024 * 1024))  # 上传文件大小上限，100MB
+    IMPORT_CHUNK_ROWS: int = int(os.getenv("IMPORT_CHUNK_ROWS", 2000))  # 每批读取并入库的行数
+    IMPORT_SPOOL_CHUNK_SIZE: int = 1024 * 1024  # 上传文件落盘时每次读取的字节数，1MB
+    IMPORT_WORKERS: int = int(os.getenv("IMPORT_WORKERS", os.cpu_count() or 2))  # 批量导入解析进程数
+    IMPORT_MAX_ERRORS: int = 1000  # 导入结果中最多返回的错误行数
+    IMPORT_STALE_SECONDS: int = int(os.getenv("IMPORT_STALE_SECONDS", 600))  # 导入中的装箱单清单超过该秒数无进度时视为中断，可重新导入
+    
+    # 平台订单导入配置
+    ORDER_IMPORT_MAPPINGS_FILE: str = os.getenv("ORDER_IMPORT_MAPPINGS_FILE", "")  # 平台列映射JSON文件，覆盖或补充内置映射
+    ORDER_IMPORT_STALE_SECONDS: int = int(os.getenv("ORDER_IMPORT_STALE_SECONDS", 600))  # 导入中的清单超过该秒数无进度时视为中断，可重新导入
+    
+    # 数据湖导出配置
+    DATALAKE_DIR: str = os.getenv("DATALAKE_DIR", "datalake")  # Parquet文件根目录（本地目录或挂载的对象存储）
+    DATALAKE_BATCH_SIZE: int = 50000  # 每个Parquet文件批次的行数
+    
+    # 接口缓存配置
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")  # memory: 进程内LRU；redis: 共享Redis；local: 进程内Redis替身
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_KEY_PREFIX: str = os.getenv("CACHE_KEY_PREFIX", "anygo:cache:")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", 10000))  # 进程内缓存最大条目数
+    
+    # 统计缓存配置
+    STATS_CACHE_TTL: int = int(os.getenv("STATS_CACHE_TTL", 300))  # 统计结果缓存秒数
+    
+    # 在途库存配置
+    SEA_TRANSIT_DAYS: int = int(os.getenv("SEA_TRANSIT_DAYS", 35))  # 海运预计到货天数
+    AIR_TRANSIT_DAYS: int = int(os.getenv("AIR_TRANSIT_DAYS", 10))  # 空运预计到货天数
+    
+    # 头程运费配置
+    FREIGHT_VOLUMETRIC_DIVISOR: float = float(os.getenv("FREIGHT_VOLUMETRIC_DIVISOR", 6000))  # 体积重除数，cm³/kg
+    
+    # 装载规划配置
+    LOAD_PLAN_MAX_BOXES: int = int(os.getenv("LOAD_PLAN_MAX_BOXES", 20000))  # 单次装载规划的箱子数上限
+    
+    # 商品搜索配置
+    SEARCH_RANK_LIMIT: int = int(os.getenv("SEARCH_RANK_LIMIT", 5000))  # 命中数不超过该值时按相关度排序
+    FACET_PRICE_BANDS: List[float] = [0, 10, 50, 100, 500, 1000]  # 价格分面的区间下限
+    
+    # 商品目录配置
+    CATALOG_SYNC_INTERVAL: float = float(os.getenv("CATALOG_SYNC_INTERVAL", 1.0))  # 检查商品变更日志的最小间隔秒数
+    CATALOG_CHANGE_RETENTION_DAYS: int = 1  # 商品变更日志保留天数，启动加载时清理
+
+    # 商品图片配置
+    IMAGE_THUMBNAIL_SIZES: List[int] = [128, 256, 512]  # 缩略图最长边像素
+    IMAGE_LIST_THUMBNAIL_SIZE: int = 256  # 商品列表返回的缩略图尺寸
+    IMAGE_MAX_PIXELS: int = 40000000  # 原图像素上限，防止解压炸弹
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", os.cpu_count() or 2))  # 缩略图生成进程数
+    IMAGE_CACHE_MAX_AGE: int = 365 * 24 * 3600  # 图片响应缓存秒数，文件按内容寻址不会变化
+
+    # 打印配置
+    PRINT_WORKERS: int = int(os.getenv("PRINT_WORKERS", os.cpu_count() or 2))  # PDF渲染进程数
+    PRINT_CHUNK_SIZE: int = 20  # 每个渲染任务包含的装箱单数
+    
+    # 邮件配置
+    SMTP_TLS: bool = True
+    SMTP_PORT: int = 587
+    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_USER: str = ""
+    SMTP_PASSWORD: str = ""
+    EMAILS_FROM_EMAIL: str = ""
+    EMAILS_FROM_NAME: str = ""
+
+    class Config:
+        case_sensitive = True
+
+# 创建全局配置实例
+settings = Settings()
\ No newline at end of file
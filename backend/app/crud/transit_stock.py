@@ -7,6 +7,7 @@ from ..models.stock import TransitStock
 from ..models.product import Product
 from ..models.packing import PackingList
 from ..schemas.stock import TransitStockCreate, TransitStockQuery
+from ..services.product_catalog import product_catalog
 
 def get_transit_stock(db: Session, query: TransitStockQuery) -> List[TransitStock]:
     """获取在途库存记录"""
@@ -39,8 +40,7 @@ def get_transit_stock(db: Session, query: TransitStockQuery) -> List[TransitStoc
 def create_transit_stock(db: Session, data: TransitStockCreate) -> TransitStock:
     """创建在途库存记录"""
     # 检查产品是否存在
-    product = db.query(Product).filter(Product.id == data.product_id).first()
-    if not product:
+    if product_catalog.get(db, data.product_id) is None:
         raise ValueError("产品不存在")
     
     # 检查装箱单是否存在
@@ -1,7 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.auth.router import router as auth_router
-from app.database import init_db
+from app.database import init_db, engine, SessionLocal
+from app.services.product_catalog import product_catalog
+from app.services.category_stats import category_stats
+from app.services.product_facets import product_facet_counter
+from app.services.product_search import product_search_index
+from app.services.product_tags import product_tag_index
 
 app = FastAPI(
     title="ANY-GO API",
@@ -25,6 +30,15 @@ app.include_router(auth_router, prefix="/api/auth", tags=["认证"])
 async def startup_event():
     """应用启动时运行"""
     init_db()
+    product_search_index.ensure(engine)
+    product_tag_index.ensure(engine)
+    product_facet_counter.ensure(engine)
+    category_stats.ensure(engine)
+    db = SessionLocal()
+    try:
+        product_catalog.load(db)
+    finally:
+        db.close()
 
 @app.get("/health")
 async def health_check():
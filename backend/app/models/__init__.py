@@ -5,12 +5,19 @@
 """
 
 from .user import User
-from .product import Product
-from .packing_list import PackingList, PackingItem
+from .product import Product, ProductCategory, ProductChange, ProductFacetCount, ProductImage, ProductTag
+from .packing_list import PackingList, PackingListItem, PackingItem, PackingScan
 
 __all__ = [
     'User',
     'Product',
+    'ProductCategory',
+    'ProductChange',
+    'ProductFacetCount',
+    'ProductImage',
+    'ProductTag',
     'PackingList',
-    'PackingItem'
+    'PackingListItem',
+    'PackingItem',
+    'PackingScan'
 ]
\ No newline at end of file
@@ -1,13 +1,12 @@
-from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, Integer, DateTime
 from datetime import datetime
 
-Base = declarative_base()
+from ..database import Base
 
 class BaseModel(Base):
-    """基础模型类"""
+    """基础模型类，与商品等模型共用同一个 Base，关系和外键才能互相解析"""
     __abstract__ = True
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
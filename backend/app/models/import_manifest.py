@@ -0,0 +1,48 @@
+from sqlalchemy import Column, String, Integer, Enum, JSON, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from .base import BaseModel
+import enum
+
+class ImportStatus(str, enum.Enum):
+    """导入状态"""
+    PROCESSING = "processing"  # 导入中
+    COMPLETED = "completed"  # 已完成
+    PARTIAL = "partial"  # 部分分组失败，可续传
+    FAILED = "failed"  # 失败
+
+class ImportManifest(BaseModel):
+    """导入清单，按文件内容哈希记录每次导入"""
+    __tablename__ = "import_manifests"
+
+    import_type = Column(String, nullable=False)  # 导入类型，如 packing_lists
+    file_hash = Column(String(64), nullable=False, index=True)  # 文件内容SHA-256
+    filename = Column(String, nullable=False)  # 首次上传的文件名
+    status = Column(Enum(ImportStatus), default=ImportStatus.PROCESSING)
+    result = Column(JSON, nullable=True)  # 最近一次导入结果
+    error = Column(String, nullable=True)
+    created_by = Column(ForeignKey("users.id"), nullable=True)
+
+    # 关联
+    groups = relationship("ImportManifestGroup", back_populates="manifest", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        UniqueConstraint("import_type", "file_hash", name="uq_import_manifests_type_hash"),
+    )
+
+class ImportManifestGroup(BaseModel):
+    """导入清单中的逻辑分组，记录每个分组的写入结果"""
+    __tablename__ = "import_manifest_groups"
+
+    manifest_id = Column(Integer, ForeignKey("import_manifests.id"), nullable=False)
+    group_hash = Column(String(64), nullable=False)  # 分组内容SHA-256
+    group_key = Column(String, nullable=True)  # 分组标识，便于排查
+    status = Column(Enum(ImportStatus), nullable=False)
+    details = Column(JSON, nullable=True)  # 写入的记录ID等续传所需信息
+    error = Column(String, nullable=True)
+
+    # 关联
+    manifest = relationship("ImportManifest", back_populates="groups")
+
+    __table_args__ = (
+        Index("ix_import_manifest_groups_manifest_hash", "manifest_id", "group_hash"),
+    )
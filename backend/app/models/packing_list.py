@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Enum, Float, Integer, JSON, ForeignKey, DateTime, Text
+from sqlalchemy import Column, String, Enum, Float, Integer, JSON, ForeignKey, DateTime, Text, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import BaseModel
@@ -30,10 +30,26 @@ class PackingListItem(BaseModel):
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer, nullable=False)
     box_quantities = Column(JSON, nullable=False)  # [{box_no: str, quantity: int}]
+    weight = Column(Float, nullable=True)  # 明细总重量(kg)，商品未维护重量时为空
+    volume = Column(Float, nullable=True)  # 明细总体积(m³)，商品未维护体积时为空
+    freight_cost = Column(Float, default=0)  # 分摊到该明细的头程运费合计
+    landed_cost = Column(Float, nullable=True)  # 单位到岸成本 = 采购成本 + 单位头程运费
     
     # 关联
     product = relationship("Product")
 
+    @classmethod
+    def from_catalog(cls, packing_list_id: int, product, quantity: int, box_quantities) -> "PackingListItem":
+        """按商品目录中的商品生成明细，重量、体积为单件值乘以数量，商品未维护时留空而不是按0计入"""
+        return cls(
+            packing_list_id=packing_list_id,
+            product_id=product.id,
+            quantity=quantity,
+            box_quantities=box_quantities,
+            weight=product.weight * quantity if product.weight is not None else None,
+            volume=product.volume * quantity if product.volume is not None else None
+        )
+
 class PackingList(BaseModel):
     """装箱单模型"""
     __tablename__ = "packing_lists"
@@ -47,6 +63,8 @@ class PackingList(BaseModel):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     created_by = Column(Integer, ForeignKey("users.id"))
+    chargeable_weight = Column(Float, nullable=True)  # 计费重(kg)
+    freight_cost = Column(Float, default=0)  # 分摊到该装箱单的头程运费
     
     # 关系
     items = relationship("PackingItem", back_populates="packing_list", cascade="all, delete-orphan")
@@ -82,6 +100,27 @@ class PackingItem(BaseModel):
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer, default=1)
     notes = Column(Text)
+    packed_quantity = Column(Integer, default=0, nullable=False)  # 已扫码装箱数量
+    is_packed = Column(Boolean, default=False, nullable=False)  # 已装箱数量达到计划数量
     
     # 关系
-    packing_list = relationship("PackingList", back_populates="items")
\ No newline at end of file
+    packing_list = relationship("PackingList", back_populates="items")
+
+class PackingScan(BaseModel):
+    """
+    装箱扫码记录，event_id 由扫码枪生成，用于重复上报时去重
+
+    删除装箱单时一并删除其扫码记录；编辑装箱单删除已扫码的明细时保留记录，明细ID置空
+    """
+    __tablename__ = "packing_scans"
+
+    event_id = Column(String(64), unique=True, nullable=False, index=True)
+    packing_list_id = Column(
+        Integer, ForeignKey("packing_lists.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    packing_item_id = Column(Integer, ForeignKey("packing_items.id", ondelete="SET NULL"), nullable=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    code = Column(String, nullable=False)  # 扫描到的SKU/条码
+    quantity = Column(Integer, nullable=False)
+    box_no = Column(String(20), nullable=True)
+    scanned_by = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Enum, Index, UniqueConstraint
 from sqlalchemy.sql import func
 import enum
 
@@ -24,10 +24,16 @@ class Product(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
+    chinese_name = Column(String)  # 中文名称
     description = Column(Text)
     sku = Column(String, unique=True, index=True)
     price = Column(Float)
+    cost = Column(Float, default=0)  # 采购成本
+    freight_cost = Column(Float, default=0)  # 单位头程运费，由运费分摊写入
     weight = Column(Float)
+    volume = Column(Float)  # 单件体积(m³)
+    stock = Column(Integer, default=0)  # 当前库存
+    alert_threshold = Column(Integer, default=10)  # 库存预警阈值
     dimensions = Column(String)
     category = Column(String, index=True)
     tags = Column(String)  # 逗号分隔的标签列表
@@ -36,4 +42,70 @@ class Product(Base):
     status = Column(Enum(ProductStatus), default=ProductStatus.ACTIVE)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    created_by = Column(Integer, ForeignKey("users.id"))
\ No newline at end of file
+    created_by = Column(Integer, ForeignKey("users.id"))
+
+    __table_args__ = (
+        # 商品目录按SKU查询时不区分大小写（upper(sku) IN ...），需要表达式索引
+        Index("ix_products_sku_upper", func.upper(sku)),
+    )
+
+class ProductTag(Base):
+    """商品标签索引，主键 (tag, product_id) 使按标签筛选和统计只需读索引"""
+    __tablename__ = "product_tags"
+
+    tag = Column(String, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_product_tags_product_id", "product_id"),
+    )
+
+class ProductImage(Base):
+    """商品图片，文件按内容摘要存储，多个商品可共用同一文件"""
+    __tablename__ = "product_images"
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    digest = Column(String(64), nullable=False, index=True)  # 内容SHA-256
+    media_type = Column(String, nullable=False)
+    width = Column(Integer)
+    height = Column(Integer)
+    size = Column(Integer)  # 原图字节数
+    position = Column(Integer, nullable=False, default=0)  # 显示顺序，最小的为主图
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("product_id", "digest", name="uq_product_images_product_digest"),
+        Index("ix_product_images_product_position", "product_id", "position"),
+    )
+
+class ProductFacetCount(Base):
+    """商品分面计数，按 (分类, 类型, 库存状态, 价格区间) 汇总有效商品数，空字符串表示未填写"""
+    __tablename__ = "product_facet_counts"
+
+    category = Column(String, primary_key=True)
+    type = Column(String, primary_key=True)
+    stock_state = Column(String, primary_key=True)
+    price_band = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class ProductCategory(Base):
+    """商品分类维度，汇总各分类的商品数与库存，由商品和库存写入增量维护"""
+    __tablename__ = "product_categories"
+
+    name = Column(String, primary_key=True)  # 空字符串表示未分类
+    product_count = Column(Integer, nullable=False, default=0)  # 商品总数
+    active_count = Column(Integer, nullable=False, default=0)  # 有效商品数
+    stock_units = Column(Integer, nullable=False, default=0)  # 有效商品库存件数
+    stock_value = Column(Float, nullable=False, default=0)  # 有效商品库存金额（按成本）
+    in_stock_count = Column(Integer, nullable=False, default=0)  # 有库存的有效商品数
+    stockout_count = Column(Integer, nullable=False, default=0)  # 无库存的有效商品数
+    overstock_count = Column(Integer, nullable=False, default=0)  # 库存超过两倍预警阈值的有效商品数
+
+class ProductChange(Base):
+    """商品变更日志，各进程的商品目录据此增量同步"""
+    __tablename__ = "product_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(Integer, nullable=False)  # 不设外键，删除的商品也需记录
+    created_at = Column(DateTime, server_default=func.now(), index=True)
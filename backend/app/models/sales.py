@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Enum, Float, Integer, ForeignKey, JSON, Date
+from sqlalchemy import Column, String, Enum, Float, Integer, ForeignKey, JSON, Date, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 import enum
@@ -47,6 +47,7 @@ class Order(BaseModel):
     
     # 其他信息
     notes = Column(String, nullable=True)  # 备注
+    content_hash = Column(String(64), nullable=True)  # 平台导入订单的内容哈希，内容未变化时跳过
     operator_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # 操作员
     
     # 关联
@@ -104,5 +105,6 @@ class SalesStatistics(BaseModel):
     average_order_value = Column(Float, default=0)  # 平均订单金额
     conversion_rate = Column(Float, default=0)  # 转化率
     
-    class Config:
-        unique_together = [("date", "store_name", "platform")] 
\ No newline at end of file
+    __table_args__ = (
+        UniqueConstraint("date", "store_name", "platform", name="uq_sales_statistics_date_store_platform"),
+    )
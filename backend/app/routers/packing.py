@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import select, update, insert, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload, raiseload
+from typing import Dict, List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.database import get_db
 from app.dependencies import get_current_user
 from app.models import PackingList, PackingItem, Product, User
+from app.models.packing_list import PackingScan
+from app.services.product_catalog import normalize_sku, product_catalog
+from app.utils.query import sync_rows
 from app.schemas.packing_list import (
     PackingListCreate,
     PackingListResponse,
@@ -64,6 +69,41 @@ class PackingListResponse(PackingListBase):
     class Config:
         orm_mode = True
 
+class ScanEvent(BaseModel):
+    event_id: str = Field(..., min_length=1, max_length=64)
+    packing_list_id: int
+    code: str = Field(..., min_length=1)
+    quantity: int = Field(default=1, gt=0)
+    box_no: Optional[str] = Field(None, max_length=20)
+
+class ScanBatch(BaseModel):
+    events: List[ScanEvent] = Field(..., min_length=1, max_length=1000)
+
+class ScanRejection(BaseModel):
+    event_id: str
+    reason: str
+
+class ScannedItem(BaseModel):
+    id: int
+    packing_list_id: int
+    product_id: int
+    quantity: int
+    packed_quantity: int
+    is_packed: bool
+
+class ScanBatchResult(BaseModel):
+    accepted: int
+    duplicates: int
+    rejected: List[ScanRejection]
+    items: List[ScannedItem]
+
+# 装箱单读取的加载策略：响应只序列化明细，明细用selectin批量加载，
+# 其余关联一律禁止懒加载，避免序列化时产生N+1查询
+PACKING_LIST_LOAD_OPTIONS = (
+    selectinload(PackingList.items),
+    raiseload("*")
+)
+
 # 路由定义
 @router.get("/", response_model=List[PackingListResponse])
 async def get_packing_lists(
@@ -81,15 +121,16 @@ async def get_packing_lists(
             detail="没有权限访问装箱单"
         )
     
-    # 构建查询
-    query = db.query(PackingList)
+    # 构建查询，明细一次性批量加载，其他关联禁止懒加载
+    # 无论分页大小，固定为 装箱单 + 明细 两条查询
+    query = db.query(PackingList).options(*PACKING_LIST_LOAD_OPTIONS)
     
     # 根据状态筛选
     if status:
         query = query.filter(PackingList.status == status)
     
     # 分页
-    packing_lists = query.offset(skip).limit(limit).all()
+    packing_lists = query.order_by(PackingList.id).offset(skip).limit(limit).all()
     
     return packing_lists
 
@@ -108,7 +149,12 @@ async def get_packing_list(
         )
     
     # 查询装箱单
-    packing_list = db.query(PackingList).filter(PackingList.id == packing_list_id).first()
+    packing_list = (
+        db.query(PackingList)
+        .options(*PACKING_LIST_LOAD_OPTIONS)
+        .filter(PackingList.id == packing_list_id)
+        .first()
+    )
     
     if packing_list is None:
         raise HTTPException(
@@ -213,30 +259,38 @@ async def update_packing_list(
             )
         db_packing_list.assigned_to = packing_list_update.assigned_to
     
-    # 如果提供了新的明细项，则更新
+    # 如果提供了新的明细项，按产品与现有明细比对，只增删改有变化的行
     if packing_list_update.items is not None:
-        # 删除现有明细
-        db.query(PackingItem).filter(PackingItem.packing_list_id == packing_list_id).delete()
-        
-        # 添加新明细
-        for item in packing_list_update.items:
-            # 检查产品是否存在
-            product = db.query(Product).filter(Product.id == item.product_id).first()
-            if not product:
-                db.rollback()
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"产品ID {item.product_id} 不存在"
-                )
-            
-            db_item = PackingItem(
-                packing_list_id=db_packing_list.id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                notes=item.notes
+        # 一次性检查所有产品是否存在
+        product_ids = {item.product_id for item in packing_list_update.items}
+        existing_ids = {
+            product_id for (product_id,) in
+            db.query(Product.id).filter(Product.id.in_(product_ids))
+        }
+        missing_ids = sorted(product_ids - existing_ids)
+        if missing_ids:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"产品ID {', '.join(map(str, missing_ids))} 不存在"
             )
-            
-            db.add(db_item)
+        
+        sync_rows(
+            db,
+            PackingItem,
+            [PackingItem.packing_list_id == packing_list_id],
+            key_fields=["product_id"],
+            value_fields=["quantity", "notes"],
+            rows=[
+                {
+                    "packing_list_id": packing_list_id,
+                    "product_id": item.product_id,
+                    "quantity": item.quantity,
+                    "notes": item.notes
+                }
+                for item in packing_list_update.items
+            ]
+        )
     
     db.commit()
     db.refresh(db_packing_list)
@@ -401,6 +455,120 @@ async def update_packing_list_item(
     
     return db_item
 
+@router.post("/scans", response_model=ScanBatchResult)
+async def submit_scans(
+    batch: ScanBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    批量提交装箱扫码
+
+    SKU通过内存索引解析，已处理过的 event_id 直接计为重复，
+    有效扫码按明细汇总后用一条批量UPDATE累加已装箱数量，并与扫码记录在同一事务中提交
+    """
+    # 检查权限
+    if "packing_lists:write" not in current_user.permissions:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="没有权限修改装箱单"
+        )
+    
+    # 批内重复的事件只保留第一次，再排除已处理过的事件
+    events: Dict[str, ScanEvent] = {}
+    for event in batch.events:
+        events.setdefault(event.event_id, event)
+    processed = set(db.execute(
+        select(PackingScan.event_id).where(PackingScan.event_id.in_(list(events)))
+    ).scalars())
+    pending = [event for event_id, event in events.items() if event_id not in processed]
+    duplicates = len(batch.events) - len(pending)
+    
+    # 解析SKU并定位明细，同一装箱单同一产品有多行时记到第一行
+    product_ids = product_catalog.resolve_skus(db, (event.code for event in pending))
+    items = {}
+    if pending:
+        for row in db.execute(
+            select(PackingItem.id, PackingItem.packing_list_id, PackingItem.product_id)
+            .where(PackingItem.packing_list_id.in_({event.packing_list_id for event in pending}))
+            .order_by(PackingItem.id)
+        ):
+            items.setdefault((row.packing_list_id, row.product_id), row.id)
+    
+    rejected = []
+    deltas: Dict[int, int] = {}
+    scans = []
+    for event in pending:
+        code = normalize_sku(event.code)
+        product_id = product_ids.get(event.code)
+        if product_id is None:
+            rejected.append(ScanRejection(event_id=event.event_id, reason=f"未知的SKU {code}"))
+            continue
+        item_id = items.get((event.packing_list_id, product_id))
+        if item_id is None:
+            rejected.append(ScanRejection(
+                event_id=event.event_id,
+                reason=f"装箱单 {event.packing_list_id} 中没有 {code}"
+            ))
+            continue
+        deltas[item_id] = deltas.get(item_id, 0) + event.quantity
+        scans.append({
+            "event_id": event.event_id,
+            "packing_list_id": event.packing_list_id,
+            "packing_item_id": item_id,
+            "product_id": product_id,
+            "code": code,
+            "quantity": event.quantity,
+            "box_no": event.box_no,
+            "scanned_by": current_user.id
+        })
+    
+    if scans:
+        table = PackingItem.__table__
+        packed = table.c.packed_quantity + bindparam("delta")
+        try:
+            db.execute(insert(PackingScan), scans)
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("item_id"))
+                .values(packed_quantity=packed, is_packed=packed >= table.c.quantity),
+                [{"item_id": item_id, "delta": delta} for item_id, delta in deltas.items()]
+            )
+            db.commit()
+        except IntegrityError:
+            # 同一事件被并发提交，回滚后由扫码端重试，重试时会被识别为重复
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="扫码事件正在被处理，请重试"
+            )
+    
+    scanned_items = []
+    if deltas:
+        scanned_items = [
+            ScannedItem(
+                id=row.id,
+                packing_list_id=row.packing_list_id,
+                product_id=row.product_id,
+                quantity=row.quantity or 0,
+                packed_quantity=row.packed_quantity,
+                is_packed=row.is_packed
+            )
+            for row in db.execute(
+                select(
+                    PackingItem.id, PackingItem.packing_list_id, PackingItem.product_id,
+                    PackingItem.quantity, PackingItem.packed_quantity, PackingItem.is_packed
+                ).where(PackingItem.id.in_(list(deltas)))
+            )
+        ]
+    
+    return ScanBatchResult(
+        accepted=len(scans),
+        duplicates=duplicates,
+        rejected=rejected,
+        items=scanned_items
+    )
+
 @router.delete("/{packing_list_id}/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_packing_list_item(
     packing_list_id: int,
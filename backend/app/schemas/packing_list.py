@@ -1,6 +1,6 @@
 from typing import Optional, List
 from pydantic import BaseModel, Field, validator, confloat
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from .base import BaseSchema, PageParams
 from .product import ProductResponse
@@ -51,7 +51,7 @@ class PackingItemBase(BaseModel):
 
 class PackingItemCreate(PackingItemBase):
     """创建装箱单项目模型"""
-    pass
+    box_quantities: List[BoxQuantity] = Field(default_factory=list, description="各箱数量")
 
 class PackingItem(PackingItemBase):
     """装箱单项目模型"""
@@ -117,19 +117,136 @@ class ImportResult(BaseModel):
     created: int = 0
     updated: int = 0
     failed: int = 0
+    skipped: int = 0
     errors: List[str] = []
 
+class FileImportResult(BaseModel):
+    """单个文件的导入结果"""
+    filename: str
+    store_name: Optional[str] = None
+    success: bool = False
+    rows: int = 0
+    total: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    skipped: int = 0
+    errors: List[str] = []
+
+class BatchImportResult(BaseModel):
+    """批量导入结果"""
+    success: bool
+    message: str
+    files: List[FileImportResult] = []
+    total_rows: int = 0
+    elapsed_seconds: float = 0
+    rows_per_second: float = 0
+
 class ExportRequest(BaseModel):
     """导出请求"""
     ids: List[int]
     include_box_specs: bool = True
     include_product_details: bool = True
+    format: str = Field(default="xlsx", pattern="^(xlsx|csv)$")
+
+class PrintRequest(BaseModel):
+    """打印请求"""
+    ids: List[int] = Field(..., min_length=1)
+    include_packing_list: bool = True  # 打印装箱单
+    include_labels: bool = True  # 打印箱标签
+    format: str = Field(default="pdf", pattern="^(pdf|zip)$")  # pdf: 合并为一个PDF；zip: 每个装箱单一个PDF
 
 class BatchApproveRequest(BaseModel):
     """批量审批请求"""
     ids: List[int]
     action: str = Field(..., pattern="^(approve|reject)$")
     reason: Optional[str] = None
+    transport_type: str = Field(default="sea", pattern="^(sea|air)$", description="审批通过后生成在途库存的运输方式")
+    shipping_date: Optional[date] = Field(None, description="发货日期，默认当天")
+    estimated_arrival: Optional[date] = Field(None, description="预计到货日期，默认按运输方式推算")
+
+class FreightAllocationRequest(BaseModel):
+    """头程运费分摊请求"""
+    packing_list_ids: List[int] = Field(..., min_length=1, description="同一批货的装箱单ID")
+    freight_amount: confloat(gt=0) = Field(..., description="运费账单金额")
+    volumetric_divisor: Optional[confloat(gt=0)] = Field(None, description="体积重除数(cm³/kg)，默认使用系统配置")
+
+class PackingListFreight(BaseModel):
+    """装箱单运费分摊结果"""
+    packing_list_id: int
+    chargeable_weight: float
+    freight_cost: float
+
+class FreightAllocationResult(BaseModel):
+    """头程运费分摊结果"""
+    freight_amount: float
+    chargeable_weight: float
+    boxes: int
+    items: int
+    packing_lists: List[PackingListFreight]
+    elapsed_seconds: float
+
+class ContainerType(BaseModel):
+    """集装箱类型"""
+    name: str = Field(..., min_length=1, max_length=20, description="箱型名称，如 40HQ")
+    length: confloat(gt=0) = Field(..., description="内长(cm)")
+    width: confloat(gt=0) = Field(..., description="内宽(cm)")
+    height: confloat(gt=0) = Field(..., description="内高(cm)")
+    max_weight: confloat(gt=0) = Field(..., description="最大载重(kg)")
+    max_volume: Optional[confloat(gt=0)] = Field(None, description="可用体积上限(m³)")
+
+class LoadPlanRequest(BaseModel):
+    """装载规划请求"""
+    packing_list_ids: List[int] = Field(..., min_length=1)
+    container_types: Optional[List[ContainerType]] = Field(None, description="可用箱型，默认 20GP/40GP/40HQ")
+    allow_rotation: bool = Field(True, description="允许水平旋转")
+    allow_tipping: bool = Field(False, description="允许侧放或倒放")
+    include_positions: bool = Field(True, description="返回每个箱子的摆放坐标")
+
+class BoxAssignment(BaseModel):
+    """箱规分配数量"""
+    packing_list_id: int
+    box_spec_id: int
+    quantity: int
+
+class BoxPlacement(BaseModel):
+    """箱子摆放位置，坐标为箱子靠里、靠左、底部的角点(cm)"""
+    packing_list_id: int
+    box_spec_id: int
+    x: float
+    y: float
+    z: float
+    length: float
+    width: float
+    height: float
+
+class ContainerLoad(BaseModel):
+    """单个集装箱的装载结果"""
+    index: int
+    container_type: str
+    boxes: int
+    weight: float
+    volume: float
+    volume_utilization: float
+    weight_utilization: float
+    assignments: List[BoxAssignment]
+    placements: List[BoxPlacement] = []
+
+class LoadPlanResult(BaseModel):
+    """装载规划结果"""
+    total_boxes: int
+    container_count: int
+    containers: List[ContainerLoad]
+    unplaced: List[BoxAssignment]
+    elapsed_seconds: float
+
+class BatchApproveResult(BaseModel):
+    """批量审批结果"""
+    message: str
+    matched: int = 0  # 找到的装箱单数
+    changed: int = 0  # 状态实际发生变化的装箱单数
+    transit_created: int = 0  # 新建的在途库存记录数
+    transit_cancelled: int = 0  # 取消的在途库存记录数
 
 class StoreStatistics(BaseModel):
     """店铺统计"""
@@ -1,8 +1,10 @@
-from typing import Optional, List
-from pydantic import BaseModel, Field, validator
+import numbers
+from typing import Dict, Optional, List
+from pydantic import BaseModel, Field, field_validator, validator
 from datetime import datetime
 from decimal import Decimal
 from .base import BaseSchema, PageParams
+from ..utils.excel import cell_text
 
 class ProductBase(BaseSchema):
     """产品基础模式"""
@@ -71,12 +73,26 @@ class ProductResponse(ProductBase):
     updated_at: datetime
     is_auto_created: bool
     needs_completion: bool
+    thumbnails: List[str] = []  # 列表尺寸的缩略图URL，按显示顺序
 
     @property
     def total_cost(self) -> Decimal:
         """计算总成本"""
         return self.cost + self.freight_cost
 
+class ProductImageResponse(BaseSchema):
+    """商品图片"""
+    id: int
+    product_id: int
+    digest: str
+    media_type: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    size: Optional[int] = None
+    position: int
+    url: str
+    thumbnails: Dict[str, str] = {}  # 尺寸 -> 缩略图URL
+
 class ProductQuery(PageParams):
     """产品查询参数"""
     keyword: Optional[str] = None
@@ -110,29 +126,104 @@ class ProductExportRequest(BaseModel):
     min_price: Optional[float] = Field(None, ge=0)
     max_price: Optional[float] = Field(None, ge=0)
     in_stock: Optional[bool] = None
+    tags_any: Optional[List[str]] = None
+    tags_all: Optional[List[str]] = None
     fields: Optional[List[str]] = None
+    format: str = Field(default="xlsx", pattern="^(xlsx|csv)$")
 
     @validator('fields')
     def validate_fields(cls, v):
         if v:
             valid_fields = {
                 "sku", "name", "chinese_name", "type", "category",
-                "price", "cost", "stock", "alert_threshold",
-                "supplier", "status"
+                "price", "cost", "stock", "alert_threshold", "status"
             }
             invalid_fields = set(v) - valid_fields
             if invalid_fields:
                 raise ValueError(f"无效的字段: {', '.join(invalid_fields)}")
         return v
 
+class FacetCount(BaseModel):
+    """分面取值及其商品数"""
+    value: Optional[str] = None
+    count: int
+
 class ProductListResponse(BaseModel):
     """产品列表响应"""
     items: List[ProductResponse]
     total: int
     page: int
     page_size: int
+    facets: Optional[Dict[str, List[FacetCount]]] = None
 
     @property
     def total_pages(self) -> int:
         """计算总页数"""
-        return (self.total + self.page_size - 1) // self.page_size 
\ No newline at end of file
+        return (self.total + self.page_size - 1) // self.page_size
+
+class CategorySummary(BaseModel):
+    """分类汇总"""
+    category: Optional[str] = None
+    product_count: int
+    active_count: int
+    stock_units: int
+    stock_value: float
+
+class TagFacet(BaseModel):
+    """标签及其商品数"""
+    tag: str
+    count: int
+
+class ProductImportRow(BaseModel):
+    """批量导入的一行产品数据，除SKU外均可为空"""
+    sku: str = Field(..., min_length=1, max_length=50)
+    name: Optional[str] = Field(None, max_length=200)
+    chinese_name: Optional[str] = Field(None, max_length=200)
+    description: Optional[str] = None
+    category: Optional[str] = Field(None, max_length=50)
+    type: Optional[str] = Field(None, pattern="^(physical|digital|service)$")
+    status: Optional[str] = Field(None, pattern="^(active|inactive|draft|archived)$")
+    price: Optional[float] = Field(None, ge=0)
+    cost: Optional[float] = Field(None, ge=0)
+    weight: Optional[float] = Field(None, ge=0)
+    volume: Optional[float] = Field(None, ge=0)
+    stock: Optional[int] = Field(None, ge=0)
+    alert_threshold: Optional[int] = Field(None, ge=0)
+    tags: Optional[str] = None
+
+    @field_validator("sku", "name", "chinese_name", "description", "category", "tags", mode="before")
+    @classmethod
+    def number_to_text(cls, v):
+        """表格中纯数字的SKU、名称等单元格读出为数字，按文本处理（整数值的浮点数去掉小数部分）"""
+        if isinstance(v, numbers.Real) and not isinstance(v, bool):
+            return cell_text(v)
+        return v
+
+    @field_validator("sku")
+    @classmethod
+    def validate_sku(cls, v):
+        """与产品SKU校验规则一致：去空白并转大写"""
+        v = v.strip().upper()
+        if not v:
+            raise ValueError("SKU不能为空")
+        return v
+
+class ProductImportError(BaseModel):
+    """导入失败的行"""
+    row: int
+    sku: Optional[str] = None
+    field: Optional[str] = None
+    message: str
+
+class ProductImportResult(BaseModel):
+    """产品批量导入结果"""
+    success: bool
+    message: str
+    total: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[ProductImportError] = []
+    elapsed_seconds: float = 0
+    rows_per_second: float = 0
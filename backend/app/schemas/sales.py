@@ -156,4 +156,30 @@ class SalesSummary(BaseModel):
     average_order_value: Decimal
     conversion_rate: Decimal
     top_products: List[Dict]
-    top_stores: List[Dict] 
\ No newline at end of file
+    top_stores: List[Dict] 
+
+class OrderImportError(BaseModel):
+    """导入失败的订单"""
+    row: int
+    order_no: Optional[str] = None
+    message: str
+
+class OrderImportResult(BaseModel):
+    """平台订单导入进度与结果"""
+    total: int = 0  # 已读取的明细行数
+    orders: int = 0  # 已处理的订单数
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0  # 内容未变化而跳过的订单数
+    failed: int = 0
+    errors: List[OrderImportError] = []
+    elapsed_seconds: float = 0
+    rows_per_second: float = 0
+
+class OrderImportJob(BaseModel):
+    """平台订单导入任务"""
+    id: int
+    filename: str
+    status: str
+    result: Optional[OrderImportResult] = None
+    error: Optional[str] = None
@@ -0,0 +1,130 @@
+"""
+批量下单基准测试
+
+在一个空的测试库中写入 N 个商品，按批调用 order_service.create_orders，
+输出每批耗时、执行的SQL语句数和订单吞吐。默认使用临时SQLite文件，
+指定 --database-url 时只能指向没有商品的空库：
+
+    python -m app.scripts.benchmark_orders --products 10000 --batch 200 --items 5 --rounds 5
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+from typing import List
+
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  注册全部模型
+from app.database import Base
+from app.models.product import Product, ProductStatus, ProductType
+from app.models.user import User
+from app.schemas.sales import OrderCreate, OrderItemCreate
+from app.services.category_stats import category_stats
+from app.services.order_service import order_service
+from app.services.product_catalog import product_catalog
+from app.services.product_facets import product_facet_counter
+
+SEED_BATCH_SIZE = 5000
+CATEGORIES = ["服装", "数码", "家居", "美妆", "户外"]
+
+def seed_products(engine, count: int, stock: int) -> List[int]:
+    """批量写入测试商品，返回商品ID"""
+    with engine.begin() as conn:
+        for start in range(0, count, SEED_BATCH_SIZE):
+            conn.execute(insert(Product), [
+                {
+                    "sku": f"BENCH-{index:07d}",
+                    "name": f"Benchmark product {index}",
+                    "category": CATEGORIES[index % len(CATEGORIES)],
+                    "price": 10 + index % 90,
+                    "cost": 5 + index % 40,
+                    "stock": stock,
+                    "type": ProductType.PHYSICAL,
+                    "status": ProductStatus.ACTIVE,
+                }
+                for index in range(start, min(start + SEED_BATCH_SIZE, count))
+            ])
+        return conn.execute(select(Product.id).order_by(Product.id)).scalars().all()
+
+def build_orders(rng: random.Random, product_ids: List[int], batch: int, items: int) -> List[OrderCreate]:
+    """生成一批订单，每单 items 个不同商品"""
+    return [
+        OrderCreate(
+            store_name=f"店铺{index % 3 + 1}",
+            platform="benchmark",
+            order_date=date.today(),
+            items=[
+                OrderItemCreate(product_id=product_id, quantity=rng.randint(1, 3), unit_price=19.9)
+                for product_id in rng.sample(product_ids, items)
+            ]
+        )
+        for index in range(batch)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="批量下单基准测试")
+    parser.add_argument("--products", type=int, default=10000, help="写入的商品数")
+    parser.add_argument("--batch", type=int, default=100, help="每批订单数")
+    parser.add_argument("--items", type=int, default=5, help="每单明细数")
+    parser.add_argument("--rounds", type=int, default=5, help="批次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--database-url", help="测试库连接，默认使用临时SQLite文件")
+    args = parser.parse_args()
+    if args.items > args.products:
+        parser.error("每单明细数不能超过商品数")
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='order_bench_'), 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        if conn.execute(select(Product.id).limit(1)).first() is not None:
+            parser.error("测试库中已有商品，请指定空库")
+
+    started = time.perf_counter()
+    # 库存足够所有批次扣减，测试不会因库存不足中断
+    product_ids = seed_products(engine, args.products, stock=args.rounds * args.batch * 3 + 1)
+    with engine.begin() as conn:
+        operator_id = conn.execute(
+            insert(User).values(username="benchmark", email="benchmark@example.com").returning(User.id)
+        ).scalar()
+    product_facet_counter.ensure(engine)
+    category_stats.ensure(engine)
+    print(f"写入 {len(product_ids)} 个商品，耗时 {time.perf_counter() - started:.2f}s（{url}）")
+
+    statements = 0
+
+    def count_statement(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+
+    rng = random.Random(args.seed)
+    db = sessionmaker(bind=engine)()
+    try:
+        product_catalog.load(db)
+        timings = []
+        for round_no in range(1, args.rounds + 1):
+            orders = build_orders(rng, product_ids, args.batch, args.items)
+            statements = 0
+            started = time.perf_counter()
+            order_service.create_orders(db, orders, operator_id)
+            elapsed = time.perf_counter() - started
+            timings.append(elapsed)
+            print(
+                f"第 {round_no} 批：{args.batch} 单 / {args.batch * args.items} 条明细，"
+                f"耗时 {elapsed * 1000:.1f}ms，SQL语句 {statements} 条"
+            )
+    finally:
+        db.close()
+
+    median = statistics.median(timings)
+    print(f"中位耗时 {median * 1000:.1f}ms，约 {args.batch / median:.0f} 单/秒")
+
+if __name__ == "__main__":
+    main()
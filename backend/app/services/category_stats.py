@@ -0,0 +1,151 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from sqlalchemy import and_, case, delete, event, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from ..models.product import Product, ProductCategory, ProductStatus
+from ..utils.query import upsert_statement
+from .product_facets import active_condition, plain_value, previous_values, track_previous_values
+
+METRICS = (
+    "product_count", "active_count", "stock_units", "stock_value",
+    "in_stock_count", "stockout_count", "overstock_count"
+)
+
+# 影响分类汇总的商品字段，flush前需取得其原值
+CATEGORY_FIELDS = ("category", "status", "stock", "cost", "alert_threshold")
+track_previous_values(CATEGORY_FIELDS)
+
+Deltas = Dict[str, Dict[str, float]]
+
+def contribution(values) -> Dict[str, float]:
+    """单个商品对所属分类各指标的贡献，与 _aggregates 的SQL口径一致"""
+    active = plain_value(values.get("status")) == ProductStatus.ACTIVE.value
+    if not active:
+        return {**dict.fromkeys(METRICS, 0), "product_count": 1}
+    stock = values.get("stock") or 0
+    alert_threshold = values.get("alert_threshold")
+    return {
+        "product_count": 1,
+        "active_count": 1,
+        "stock_units": stock,
+        "stock_value": stock * (values.get("cost") or 0),
+        "in_stock_count": int(stock > 0),
+        "stockout_count": int(stock == 0),
+        "overstock_count": int(
+            values.get("stock") is not None and alert_threshold is not None and stock > alert_threshold * 2
+        ),
+    }
+
+def _aggregates():
+    active = active_condition()
+    stock = func.coalesce(Product.stock, 0)
+
+    def active_sum(value, condition=None):
+        when = active if condition is None else and_(active, condition)
+        return func.coalesce(func.sum(case((when, value), else_=0)), 0)
+
+    return (
+        func.count().label("product_count"),
+        active_sum(1).label("active_count"),
+        active_sum(stock).label("stock_units"),
+        active_sum(stock * func.coalesce(Product.cost, 0)).label("stock_value"),
+        active_sum(1, stock > 0).label("in_stock_count"),
+        active_sum(1, stock == 0).label("stockout_count"),
+        active_sum(1, Product.stock > Product.alert_threshold * 2).label("overstock_count"),
+    )
+
+class CategoryStats:
+    """
+    商品分类维度
+
+    product_categories 按分类保存商品数、有效商品数、库存件数、库存金额及库存结构，
+    通过ORM写入商品（含库存变动对 Product.stock 的修改）时在同一事务中增量维护，
+    分类列表与利润、库存分析直接读取，不再扫描商品表。
+    绕过ORM的批量写入需在写入前后调用 snapshot，再用 adjust 提交两次快照的差值
+    """
+
+    def ensure(self, engine: Engine) -> None:
+        """维度表为空而存在商品时全量重建；可重复执行"""
+        with engine.begin() as conn:
+            if conn.execute(select(ProductCategory.name).limit(1)).first() is None:
+                if conn.execute(select(Product.id).limit(1)).first():
+                    self.rebuild(conn)
+
+    def rebuild(self, conn: Connection) -> None:
+        """按商品表全量重建"""
+        conn.execute(delete(ProductCategory))
+        self.adjust(conn, self._group(conn, select().select_from(Product)))
+
+    @staticmethod
+    def _group(conn, query) -> Deltas:
+        grouped = query.with_only_columns(Product.category, *_aggregates()).group_by(Product.category)
+        totals: Deltas = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+        for row in conn.execute(grouped):
+            values = totals[plain_value(row.category)]
+            for metric in METRICS:
+                values[metric] += getattr(row, metric) or 0
+        return totals
+
+    def snapshot(self, conn: Connection, product_ids: Iterable[int]) -> Deltas:
+        """汇总指定商品当前对各分类的贡献，用于批量写入前后求差值"""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        return self._group(conn, select().select_from(Product).where(Product.id.in_(product_ids)))
+
+    @staticmethod
+    def difference(after: Deltas, before: Deltas) -> Deltas:
+        """两次快照的差值"""
+        deltas: Deltas = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+        for name, values in after.items():
+            for metric in METRICS:
+                deltas[name][metric] += values[metric]
+        for name, values in before.items():
+            for metric in METRICS:
+                deltas[name][metric] -= values[metric]
+        return deltas
+
+    def adjust(self, conn: Connection, deltas: Deltas) -> None:
+        """按分类累加指标变化"""
+        params = [
+            {"name": name, **values}
+            for name, values in deltas.items() if any(values.values())
+        ]
+        if params:
+            conn.execute(upsert_statement(conn, ProductCategory, ["name"], increment_columns=METRICS), params)
+
+    def all(self, db: Session) -> List[ProductCategory]:
+        """有商品的分类，按名称排序"""
+        return db.query(ProductCategory).filter(
+            ProductCategory.product_count > 0
+        ).order_by(ProductCategory.name).all()
+
+category_stats = CategoryStats()
+
+@event.listens_for(Session, "after_flush")
+def _count_categories(session, flush_context):
+    deltas: Deltas = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+
+    def add(values, sign):
+        name = plain_value(values.get("category"))
+        for metric, value in contribution(values).items():
+            deltas[name][metric] += sign * value
+
+    for obj in session.new:
+        if isinstance(obj, Product):
+            add({field: getattr(obj, field) for field in CATEGORY_FIELDS}, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            add(previous_values(obj, CATEGORY_FIELDS), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Product):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[field].history.has_changes() for field in CATEGORY_FIELDS):
+            add(previous_values(obj, CATEGORY_FIELDS), -1)
+            add({field: state.dict.get(field) for field in CATEGORY_FIELDS}, 1)
+    if deltas:
+        category_stats.adjust(session.connection(), deltas)
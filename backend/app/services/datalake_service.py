@@ -0,0 +1,218 @@
+import enum
+import json
+import os
+import shutil
+import uuid
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.sales import Order, OrderItem
+from ..models.stock import StockRecord, StockTimeline
+from ..utils.query import iter_keyset
+
+class ExportMode(str, enum.Enum):
+    """数据湖导出模式"""
+    FULL = "full"  # 全量重写
+    INCREMENTAL = "incremental"  # 按 updated_at 增量追加
+
+class DataLakeService:
+    """
+    数据湖导出服务
+
+    将订单、订单明细、库存记录和库存时间线按日期（及店铺）分区写入Parquet文件，
+    目录结构为 {DATALAKE_DIR}/{表名}/dt=YYYY-MM-DD[/store_name=xxx]/*.parquet。
+    增量模式只追加 updated_at 晚于上次导出的记录，同一id可能出现多次，读取时取 updated_at 最新的一条
+    """
+
+    WATERMARK_FILE = "_watermarks.json"
+
+    def __init__(self):
+        self.base_dir = os.path.join(os.getcwd(), settings.DATALAKE_DIR)
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def _table_specs(self) -> Dict[str, dict]:
+        """各表的查询列、关联、分区日期列以及是否按店铺分区"""
+        return {
+            "orders": {
+                "model": Order,
+                "columns": list(Order.__table__.columns),
+                "joins": [],
+                "date_column": "order_date",
+                "partition_by_store": True
+            },
+            "order_items": {
+                "model": OrderItem,
+                "columns": list(OrderItem.__table__.columns) + [
+                    Order.order_date.label("order_date"),
+                    Order.store_name.label("store_name")
+                ],
+                "joins": [(Order, Order.id == OrderItem.order_id)],
+                "date_column": "order_date",
+                "partition_by_store": True
+            },
+            "stock_records": {
+                "model": StockRecord,
+                "columns": list(StockRecord.__table__.columns),
+                "joins": [],
+                "date_column": "created_at",
+                "partition_by_store": False
+            },
+            "stock_timeline": {
+                "model": StockTimeline,
+                "columns": list(StockTimeline.__table__.columns),
+                "joins": [],
+                "date_column": "date",
+                "partition_by_store": False
+            }
+        }
+
+    def _load_watermarks(self) -> Dict[str, str]:
+        path = os.path.join(self.base_dir, self.WATERMARK_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_watermarks(self, watermarks: Dict[str, str]) -> None:
+        path = os.path.join(self.base_dir, self.WATERMARK_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(watermarks, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _arrow_schema(columns: list) -> pa.Schema:
+        """根据数据库列类型生成固定的Parquet结构，避免各批次推断出不同类型"""
+        fields = []
+        for column in columns:
+            column_type = column.type
+            if isinstance(column_type, Boolean):
+                arrow_type = pa.bool_()
+            elif isinstance(column_type, Integer):
+                arrow_type = pa.int64()
+            elif isinstance(column_type, Float):
+                arrow_type = pa.float64()
+            elif isinstance(column_type, DateTime):
+                arrow_type = pa.timestamp("us")
+            elif isinstance(column_type, Date):
+                arrow_type = pa.date32()
+            else:  # 字符串、枚举和JSON统一存为字符串
+                arrow_type = pa.string()
+            fields.append(pa.field(column.name, arrow_type))
+        fields.append(pa.field("dt", pa.string()))
+        return pa.schema(fields)
+
+    @staticmethod
+    def _to_record(row, date_column: str) -> dict:
+        """转换为可写入Parquet的基础类型，并生成分区列"""
+        record = {}
+        for key, value in row._asdict().items():
+            if isinstance(value, enum.Enum):
+                value = value.value
+            elif isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False)
+            record[key] = value
+
+        day = record.get(date_column)
+        if isinstance(day, datetime):
+            day = day.date()
+        record["dt"] = day.isoformat() if isinstance(day, date) else "unknown"
+        return record
+
+    def export_table(
+        self,
+        db: Session,
+        table_name: str,
+        mode: ExportMode = ExportMode.INCREMENTAL,
+        since: Optional[datetime] = None
+    ) -> dict:
+        """导出单张表，返回导出行数和本次最大 updated_at"""
+        spec = self._table_specs()[table_name]
+        model = spec["model"]
+        partition_cols = ["dt", "store_name"] if spec["partition_by_store"] else ["dt"]
+
+        query = db.query(*spec["columns"])
+        for target, condition in spec["joins"]:
+            query = query.join(target, condition)
+        if mode == ExportMode.INCREMENTAL and since is not None:
+            query = query.filter(model.updated_at > since)
+
+        # 全量模式先写入临时目录，完成后整体替换，避免读取方看到半成品
+        table_dir = os.path.join(self.base_dir, table_name)
+        target_dir = f"{table_dir}.tmp" if mode == ExportMode.FULL else table_dir
+        if mode == ExportMode.FULL:
+            shutil.rmtree(target_dir, ignore_errors=True)
+
+        schema = self._arrow_schema(spec["columns"])
+        run_id = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        batch_size = settings.DATALAKE_BATCH_SIZE
+        total_rows = 0
+        max_updated_at = since
+        batch: List[dict] = []
+        part = 0
+
+        def flush():
+            nonlocal part
+            table = pa.Table.from_pylist(batch, schema=schema)
+            pq.write_to_dataset(
+                table,
+                root_path=target_dir,
+                partition_cols=partition_cols,
+                basename_template=f"{run_id}-{part}-{{i}}.parquet"
+            )
+            part += 1
+
+        for row in iter_keyset(query, model.id, batch_size):
+            record = self._to_record(row, spec["date_column"])
+            updated_at = record.get("updated_at")
+            if updated_at and (max_updated_at is None or updated_at > max_updated_at):
+                max_updated_at = updated_at
+            batch.append(record)
+            total_rows += 1
+            if len(batch) >= batch_size:
+                flush()
+                batch = []
+        if batch:
+            flush()
+
+        if mode == ExportMode.FULL:
+            shutil.rmtree(table_dir, ignore_errors=True)
+            if os.path.exists(target_dir):
+                os.replace(target_dir, table_dir)
+
+        return {"rows": total_rows, "max_updated_at": max_updated_at}
+
+    def export_all(
+        self,
+        mode: ExportMode = ExportMode.INCREMENTAL,
+        tables: Optional[List[str]] = None
+    ) -> Dict[str, int]:
+        """导出所有（或指定）表并更新增量水位，返回各表导出行数"""
+        watermarks = self._load_watermarks()
+        db = SessionLocal()
+        try:
+            result = {}
+            for table_name in tables or list(self._table_specs().keys()):
+                since = None
+                if mode == ExportMode.INCREMENTAL and watermarks.get(table_name):
+                    since = datetime.fromisoformat(watermarks[table_name])
+
+                exported = self.export_table(db, table_name, mode, since)
+                result[table_name] = exported["rows"]
+                if exported["max_updated_at"] is not None:
+                    watermarks[table_name] = exported["max_updated_at"].isoformat()
+
+                # 每张表导出后立即记录水位，中途失败时已完成的表不会重复导出
+                self._save_watermarks(watermarks)
+            return result
+        finally:
+            db.close()
+
+datalake_service = DataLakeService()
@@ -0,0 +1,166 @@
+import time
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.packing_list import PackingList, PackingListItem, BoxSpecs
+from ..models.product import Product
+
+class FreightAllocationService:
+    """
+    头程运费分摊服务
+
+    一批货（若干装箱单）的运费账单按计费重分摊：
+    1. 每种箱规的计费重 = 箱数 × max(实重, 外箱尺寸体积重, 边体积体积重)；
+    2. 运费按各装箱单计费重占比分到装箱单；
+    3. 装箱单内按 数量 × 单件重量 分到明细，缺少单件重量的产品按该装箱单已知单件重量的均值估算；
+    4. 明细运费精确到分，尾差按最大余数法补齐，保证合计等于账单金额。
+    全部计算为数组运算，结果写回明细的运费与单位到岸成本，并更新产品的单位头程运费
+    """
+
+    def _chargeable_weight(self, boxes: np.ndarray, divisor: float) -> np.ndarray:
+        """按箱规计算计费重，boxes 列依次为 长、宽、高(cm)、单箱重量(kg)、边体积(m³)、箱数"""
+        length, width, height, weight, edge_volume, count = boxes.T
+        volumetric = length * width * height / divisor
+        edge_volumetric = edge_volume * 1_000_000 / divisor
+        return np.maximum(weight, np.maximum(volumetric, edge_volumetric)) * count
+
+    @staticmethod
+    def _round_cents(amounts: np.ndarray, total: float) -> np.ndarray:
+        """将金额舍入到分，尾差按小数部分从大到小逐分补齐"""
+        cents = amounts * 100
+        rounded = np.floor(cents)
+        shortfall = int(round(total * 100 - rounded.sum()))
+        if shortfall > 0:
+            order = np.argsort(rounded - cents)[:shortfall]  # 小数部分越大越靠前
+            rounded[order] += 1
+        return rounded / 100
+
+    def allocate(
+        self,
+        db: Session,
+        packing_list_ids: List[int],
+        freight_amount: float,
+        volumetric_divisor: Optional[float] = None
+    ) -> dict:
+        """
+        分摊一批货的头程运费并写回数据库（不提交事务）
+
+        返回各装箱单的计费重与运费以及本次处理的箱规、明细数量
+        """
+        started = time.perf_counter()
+        divisor = volumetric_divisor or settings.FREIGHT_VOLUMETRIC_DIVISOR
+        packing_list_ids = sorted(set(packing_list_ids))
+
+        # 箱规：每行一种规格
+        box_rows = db.execute(
+            select(
+                BoxSpecs.packing_list_id, BoxSpecs.length, BoxSpecs.width, BoxSpecs.height,
+                BoxSpecs.weight, BoxSpecs.edge_volume, BoxSpecs.total_pieces
+            ).where(BoxSpecs.packing_list_id.in_(packing_list_ids))
+        ).all()
+        if not box_rows:
+            raise ValueError("所选装箱单没有箱子规格，无法计算计费重")
+
+        box_data = np.array([tuple(row) for row in box_rows], dtype=float)
+        box_list_ids = box_data[:, 0].astype(np.int64)
+        missing = sorted(set(packing_list_ids) - set(box_list_ids.tolist()))
+        if missing:
+            raise ValueError(f"装箱单 {', '.join(map(str, missing))} 缺少箱子规格，无法计算计费重")
+
+        list_ids = np.array(packing_list_ids, dtype=np.int64)
+        box_list_index = np.searchsorted(list_ids, box_list_ids)
+        box_chargeable = self._chargeable_weight(np.nan_to_num(box_data[:, 1:]), divisor)
+        list_chargeable = np.bincount(box_list_index, weights=box_chargeable, minlength=len(list_ids))
+        total_chargeable = list_chargeable.sum()
+        if total_chargeable <= 0:
+            raise ValueError("计费重为0，请检查箱子规格")
+        list_freight = freight_amount * list_chargeable / total_chargeable
+
+        # 明细：数量、单件重量、单件采购成本
+        item_rows = db.execute(
+            select(
+                PackingListItem.id, PackingListItem.packing_list_id, PackingListItem.product_id,
+                PackingListItem.quantity, Product.weight, Product.cost
+            )
+            .join(Product, Product.id == PackingListItem.product_id)
+            .where(PackingListItem.packing_list_id.in_(packing_list_ids))
+            .order_by(PackingListItem.id)
+        ).all()
+        if not item_rows:
+            raise ValueError("所选装箱单没有明细，无法分摊运费")
+
+        item_data = np.array([tuple(row) for row in item_rows], dtype=float)
+        item_ids = item_data[:, 0].astype(np.int64)
+        item_list_index = np.searchsorted(list_ids, item_data[:, 1].astype(np.int64))
+        product_ids = item_data[:, 2].astype(np.int64)
+        quantity = np.nan_to_num(item_data[:, 3]).clip(min=0)
+        unit_weight = item_data[:, 4]
+        unit_cost = np.nan_to_num(item_data[:, 5])
+
+        # 缺少单件重量时使用同装箱单已知单件重量的均值，全部缺失时按数量分摊
+        known = np.isfinite(unit_weight) & (unit_weight > 0)
+        known_sum = np.bincount(item_list_index, weights=np.where(known, unit_weight, 0), minlength=len(list_ids))
+        known_count = np.bincount(item_list_index, weights=known.astype(float), minlength=len(list_ids))
+        list_mean_weight = np.divide(known_sum, known_count, out=np.ones_like(known_sum), where=known_count > 0)
+        basis = quantity * np.where(known, unit_weight, list_mean_weight[item_list_index])
+
+        list_basis = np.bincount(item_list_index, weights=basis, minlength=len(list_ids))
+        if list_basis.sum() <= 0:
+            raise ValueError("明细数量为0，无法分摊运费")
+        share = np.divide(
+            basis, list_basis[item_list_index],
+            out=np.zeros_like(basis), where=list_basis[item_list_index] > 0
+        )
+        # 没有明细可承担的装箱单，其运费由其他装箱单按计费重分担
+        covered = list_basis > 0
+        list_freight = np.where(covered, list_freight, 0)
+        list_freight *= freight_amount / list_freight.sum()
+
+        item_freight = self._round_cents(list_freight[item_list_index] * share, freight_amount)
+        unit_freight = np.divide(item_freight, quantity, out=np.zeros_like(item_freight), where=quantity > 0)
+        landed_cost = unit_cost + unit_freight
+        list_freight = np.bincount(item_list_index, weights=item_freight, minlength=len(list_ids))
+
+        # 产品单位头程运费：本批货中该产品的运费合计 / 数量合计
+        unique_products, product_index = np.unique(product_ids, return_inverse=True)
+        product_freight = np.bincount(product_index, weights=item_freight)
+        product_quantity = np.bincount(product_index, weights=quantity)
+        product_unit_freight = np.divide(
+            product_freight, product_quantity,
+            out=np.zeros_like(product_freight), where=product_quantity > 0
+        )
+
+        db.execute(update(PackingListItem), [
+            {"id": int(item_id), "freight_cost": float(freight), "landed_cost": round(float(landed), 4)}
+            for item_id, freight, landed in zip(item_ids, item_freight, landed_cost)
+        ])
+        db.execute(update(PackingList), [
+            {"id": int(list_id), "chargeable_weight": round(float(chargeable), 3), "freight_cost": round(float(freight), 2)}
+            for list_id, chargeable, freight in zip(list_ids, list_chargeable, list_freight)
+        ])
+        db.execute(update(Product), [
+            {"id": int(product_id), "freight_cost": round(float(freight), 4)}
+            for product_id, freight in zip(unique_products, product_unit_freight)
+        ])
+
+        return {
+            "freight_amount": freight_amount,
+            "chargeable_weight": round(float(total_chargeable), 3),
+            "boxes": len(box_rows),
+            "items": len(item_rows),
+            "packing_lists": [
+                {
+                    "packing_list_id": int(list_id),
+                    "chargeable_weight": round(float(chargeable), 3),
+                    "freight_cost": round(float(freight), 2)
+                }
+                for list_id, chargeable, freight in zip(list_ids, list_chargeable, list_freight)
+            ],
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+
+freight_service = FreightAllocationService()
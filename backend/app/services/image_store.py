@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.product import ProductImage
+from ..utils.image import render_thumbnails, thumbnail_path
+
+_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+# 缩略图进程池常驻，与打印进程池相同，首次使用时创建
+_image_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _image_pool
+
+def is_digest(value: str) -> bool:
+    """是否为合法的内容摘要，用于校验URL中的路径参数"""
+    return bool(_DIGEST.match(value))
+
+class ImageStore:
+    """
+    内容寻址的商品图片存储
+
+    原图按内容SHA-256保存为 UPLOAD_DIR/images/<摘要前两位>/<摘要>，相同内容只存一份；
+    上传时边写盘边计算摘要，缩略图在进程池中生成，不阻塞事件循环。
+    文件写入后不再修改，URL可长期缓存
+    """
+
+    @property
+    def root(self) -> str:
+        return os.path.join(settings.UPLOAD_DIR, "images")
+
+    def path(self, digest: str, size: Optional[int] = None) -> str:
+        """原图或缩略图的文件路径"""
+        path = os.path.join(self.root, digest[:2], digest)
+        return path if size is None else thumbnail_path(path, size)
+
+    def url(self, digest: str, size: Optional[int] = None) -> str:
+        base = f"{settings.API_V1_STR}/images/{digest}"
+        return base if size is None else f"{base}/{size}"
+
+    def thumbnail_urls(self, digest: str) -> Dict[str, str]:
+        """各尺寸缩略图URL"""
+        return {str(size): self.url(digest, size) for size in settings.IMAGE_THUMBNAIL_SIZES}
+
+    async def save(self, file: UploadFile) -> Tuple[str, int]:
+        """
+        将上传图片分块写入存储，返回 (摘要, 字节数)
+
+        超过 MAX_UPLOAD_SIZE 时抛出 ValueError；内容已存在时丢弃本次写入的临时文件
+        """
+        os.makedirs(self.root, exist_ok=True)
+        fd, temp = tempfile.mkstemp(prefix="upload_", dir=self.root)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = await file.read(settings.IMPORT_SPOOL_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > settings.MAX_UPLOAD_SIZE:
+                        raise ValueError(f"图片大小超过限制({settings.MAX_UPLOAD_SIZE // (1024 * 1024)}MB)")
+                    digest.update(chunk)
+                    f.write(chunk)
+            if not size:
+                raise ValueError("图片内容为空")
+
+            path = self.path(digest.hexdigest())
+            if os.path.exists(path):
+                os.remove(temp)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp, path)
+            return digest.hexdigest(), size
+        except Exception:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    async def process(self, digest: str) -> dict:
+        """在进程池中校验原图并生成缺少的缩略图，返回媒体类型与宽高"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_image_pool(), render_thumbnails,
+            self.path(digest), settings.IMAGE_THUMBNAIL_SIZES, settings.IMAGE_MAX_PIXELS
+        )
+
+    def remove(self, digest: str) -> None:
+        """删除原图及其缩略图"""
+        for path in [self.path(digest)] + [self.path(digest, size) for size in settings.IMAGE_THUMBNAIL_SIZES]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def is_referenced(self, db: Session, digest: str) -> bool:
+        return db.execute(select(ProductImage.id).where(ProductImage.digest == digest).limit(1)).first() is not None
+
+    def list_thumbnails(self, db: Session, product_ids: Iterable[int]) -> Dict[int, List[str]]:
+        """一次查询取得各商品列表尺寸的缩略图URL，按显示顺序"""
+        product_ids = list(product_ids)
+        thumbnails: Dict[int, List[str]] = defaultdict(list)
+        if not product_ids:
+            return thumbnails
+        rows = db.execute(
+            select(ProductImage.product_id, ProductImage.digest)
+            .where(ProductImage.product_id.in_(product_ids))
+            .order_by(ProductImage.product_id, ProductImage.position, ProductImage.id)
+        )
+        size = settings.IMAGE_LIST_THUMBNAIL_SIZE
+        for product_id, digest in rows:
+            thumbnails[product_id].append(self.url(digest, size))
+        return thumbnails
+
+image_store = ImageStore()
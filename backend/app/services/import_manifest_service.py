@@ -0,0 +1,156 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.import_manifest import ImportManifest, ImportManifestGroup, ImportStatus
+
+class ImportManifestService:
+    """导入清单服务：按内容哈希去重并支持失败续传"""
+
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def hash_file(self, path: str) -> str:
+        """计算文件内容的SHA-256"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def hash_group(self, *parts) -> str:
+        """计算逻辑分组内容的SHA-256"""
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_or_create(
+        self,
+        db: Session,
+        import_type: str,
+        file_hash: str,
+        filename: str,
+        user_id: Optional[int] = None
+    ) -> ImportManifest:
+        """获取或创建导入清单"""
+        return self._get_or_create(db, import_type, file_hash, filename, user_id)[0]
+
+    def _get_or_create(
+        self,
+        db: Session,
+        import_type: str,
+        file_hash: str,
+        filename: str,
+        user_id: Optional[int]
+    ) -> Tuple[ImportManifest, bool]:
+        """获取或创建导入清单，返回 (清单, 是否新建)"""
+        manifest = db.query(ImportManifest).filter(
+            ImportManifest.import_type == import_type,
+            ImportManifest.file_hash == file_hash
+        ).first()
+        if manifest:
+            return manifest, False
+
+        manifest = ImportManifest(
+            import_type=import_type,
+            file_hash=file_hash,
+            filename=filename,
+            status=ImportStatus.PROCESSING,
+            created_by=user_id
+        )
+        try:
+            with db.begin_nested():
+                db.add(manifest)
+        except IntegrityError:
+            # 同一文件被并发上传，使用先创建的清单
+            manifest = db.query(ImportManifest).filter(
+                ImportManifest.import_type == import_type,
+                ImportManifest.file_hash == file_hash
+            ).one()
+            return manifest, False
+        return manifest, True
+
+    def claim(
+        self,
+        db: Session,
+        import_type: str,
+        file_hash: str,
+        filename: str,
+        user_id: Optional[int] = None,
+        stale_seconds: int = 600
+    ) -> Tuple[ImportManifest, bool]:
+        """
+        获取或创建导入清单并标记为导入中，返回 (清单, 是否由本次调用取得)
+
+        新建的清单归本次调用；已有清单用一条带条件的UPDATE抢占，并发请求中只有一个能成功。
+        已完成，或其他请求正在导入（stale_seconds 秒内有进度）的清单不会被抢占
+        """
+        manifest, created = self._get_or_create(db, import_type, file_hash, filename, user_id)
+        if created:
+            return manifest, True
+
+        now = datetime.utcnow()
+        claimed = db.execute(
+            update(ImportManifest)
+            .where(
+                ImportManifest.id == manifest.id,
+                ImportManifest.status != ImportStatus.COMPLETED,
+                or_(
+                    ImportManifest.status != ImportStatus.PROCESSING,
+                    ImportManifest.updated_at < now - timedelta(seconds=stale_seconds)
+                )
+            )
+            .values(status=ImportStatus.PROCESSING, result=None, error=None, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        db.refresh(manifest)
+        return manifest, claimed
+
+    def completed_groups(self, db: Session, manifest: ImportManifest) -> Dict[str, ImportManifestGroup]:
+        """获取清单中已成功写入的分组，键为分组哈希"""
+        groups = db.query(ImportManifestGroup).filter(
+            ImportManifestGroup.manifest_id == manifest.id,
+            ImportManifestGroup.status == ImportStatus.COMPLETED
+        ).all()
+        return {group.group_hash: group for group in groups}
+
+    def record_group(
+        self,
+        db: Session,
+        manifest: ImportManifest,
+        group_hash: str,
+        group_key: Optional[str] = None,
+        details: Optional[dict] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """记录分组写入结果，成功记录需与分组数据在同一事务中提交"""
+        # 续传时先清除该分组上次失败的记录
+        db.query(ImportManifestGroup).filter(
+            ImportManifestGroup.manifest_id == manifest.id,
+            ImportManifestGroup.group_hash == group_hash,
+            ImportManifestGroup.status != ImportStatus.COMPLETED
+        ).delete(synchronize_session=False)
+
+        db.add(ImportManifestGroup(
+            manifest_id=manifest.id,
+            group_hash=group_hash,
+            group_key=group_key,
+            status=ImportStatus.FAILED if error else ImportStatus.COMPLETED,
+            details=details,
+            error=error
+        ))
+
+    def finish(self, db: Session, manifest: ImportManifest, result: dict, failed: int = 0) -> None:
+        """保存导入结果并更新清单状态"""
+        manifest.result = result
+        manifest.status = ImportStatus.PARTIAL if failed else ImportStatus.COMPLETED
+        manifest.error = None
+
+    def fail(self, db: Session, manifest: ImportManifest, error: str) -> None:
+        """标记整个导入失败，已提交的分组仍可续传"""
+        manifest.status = ImportStatus.FAILED
+        manifest.error = error
+
+import_manifest_service = ImportManifestService()
@@ -0,0 +1,248 @@
+import bisect
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.packing_list import BoxSpecs
+
+@dataclass(frozen=True)
+class ContainerSpec:
+    """集装箱类型，尺寸单位cm，重量单位kg，体积单位m³"""
+    name: str
+    length: float
+    width: float
+    height: float
+    max_weight: float
+    max_volume: Optional[float] = None
+
+    @property
+    def volume(self) -> float:
+        inner = self.length * self.width * self.height / 1_000_000
+        return min(inner, self.max_volume) if self.max_volume else inner
+
+# 常用集装箱内尺寸与载重
+DEFAULT_CONTAINERS = [
+    ContainerSpec("20GP", 589, 234, 238, 28000),
+    ContainerSpec("40GP", 1203, 234, 238, 26500),
+    ContainerSpec("40HQ", 1203, 234, 269, 26500),
+]
+
+@dataclass
+class _Box:
+    """待装的单个箱子"""
+    spec_id: int
+    packing_list_id: int
+    length: float
+    width: float
+    height: float
+    weight: float
+
+    @property
+    def volume(self) -> float:
+        return self.length * self.width * self.height
+
+    def orientations(self, allow_rotation: bool, allow_tipping: bool) -> List[Tuple[float, float, float]]:
+        """可用的摆放方向（长、宽、高），默认只允许水平旋转"""
+        l, w, h = self.length, self.width, self.height
+        if allow_tipping:
+            candidates = [(l, w, h), (w, l, h), (l, h, w), (h, l, w), (w, h, l), (h, w, l)]
+        elif allow_rotation:
+            candidates = [(l, w, h), (w, l, h)]
+        else:
+            candidates = [(l, w, h)]
+        return list(dict.fromkeys(candidates))
+
+@dataclass
+class _Load:
+    """单个集装箱的装载状态，空闲空间按 (x, z, y) 排序，优先填满箱底最里侧"""
+    spec: ContainerSpec
+    min_dim: float
+    free: List[Tuple[float, float, float, float, float, float]] = field(default_factory=list)
+    placements: List[Tuple[_Box, float, float, float, Tuple[float, float, float]]] = field(default_factory=list)
+    weight: float = 0
+    volume: float = 0
+
+    def __post_init__(self):
+        self.free = [(0, 0, 0, self.spec.length, self.spec.width, self.spec.height)]
+
+    def place(self, box: _Box, orientations: List[Tuple[float, float, float]]) -> bool:
+        """首次适配：在第一个放得下的空闲空间放入箱子，并将剩余空间按断头台方式切分"""
+        if self.weight + box.weight > self.spec.max_weight:
+            return False
+        box_volume = box.volume / 1_000_000
+        if self.volume + box_volume > self.spec.volume + 1e-9:
+            return False
+
+        for index, (x, z, y, free_l, free_w, free_h) in enumerate(self.free):
+            for l, w, h in orientations:
+                if l > free_l or w > free_w or h > free_h:
+                    continue
+                del self.free[index]
+                # 剩余空间：前方整段、侧面与箱子等长的一段、上方与箱子底面相同的一段
+                for space in (
+                    (x + l, z, y, free_l - l, free_w, free_h),
+                    (x, z, y + w, l, free_w - w, free_h),
+                    (x, z + h, y, l, w, free_h - h),
+                ):
+                    if min(space[3:]) >= self.min_dim:
+                        bisect.insort(self.free, space)
+                self.placements.append((box, x, y, z, (l, w, h)))
+                self.weight += box.weight
+                self.volume += box_volume
+                return True
+        return False
+
+class LoadPlanningService:
+    """
+    集装箱装载规划服务
+
+    按体积从大到小的首次适配递减（FFD）启发式把箱子装入集装箱：
+    每个箱子依次尝试已开启的集装箱，都放不下时开启能容纳它的最大箱型；
+    集装箱内部使用断头台切分的空闲空间，支持水平旋转（可选允许侧放）。
+    装载完成后逐个尝试换成能装下同样箱子的更小箱型
+    """
+
+    def load_boxes(self, db: Session, packing_list_ids: List[int]) -> List[_Box]:
+        """读取装箱单的箱规并按箱数展开为单个箱子"""
+        rows = db.execute(
+            select(
+                BoxSpecs.id, BoxSpecs.packing_list_id, BoxSpecs.length,
+                BoxSpecs.width, BoxSpecs.height, BoxSpecs.weight, BoxSpecs.total_pieces
+            ).where(BoxSpecs.packing_list_id.in_(packing_list_ids)).order_by(BoxSpecs.id)
+        ).all()
+
+        total = sum(row.total_pieces or 0 for row in rows)
+        if total > settings.LOAD_PLAN_MAX_BOXES:
+            raise ValueError(f"箱子数量 {total} 超过单次规划上限 {settings.LOAD_PLAN_MAX_BOXES}")
+
+        boxes = []
+        for row in rows:
+            box = _Box(row.id, row.packing_list_id, row.length, row.width, row.height, row.weight or 0)
+            boxes.extend([box] * (row.total_pieces or 0))
+        return boxes
+
+    def _pack(
+        self,
+        boxes: List[_Box],
+        containers: List[ContainerSpec],
+        allow_rotation: bool,
+        allow_tipping: bool
+    ) -> Tuple[List[_Load], List[_Box]]:
+        """FFD装载，返回集装箱列表和无法装入任何箱型的箱子"""
+        if not boxes:
+            return [], []
+        min_dim = min(min(box.length, box.width, box.height) for box in boxes)
+        by_size = sorted(containers, key=lambda spec: spec.volume, reverse=True)
+
+        loads: List[_Load] = []
+        unplaced: List[_Box] = []
+        orientation_cache: Dict[Tuple[float, float, float], List[Tuple[float, float, float]]] = {}
+        for box in sorted(boxes, key=lambda b: (b.volume, b.weight), reverse=True):
+            dims = (box.length, box.width, box.height)
+            if dims not in orientation_cache:
+                orientation_cache[dims] = box.orientations(allow_rotation, allow_tipping)
+            orientations = orientation_cache[dims]
+
+            if any(load.place(box, orientations) for load in loads):
+                continue
+            for spec in by_size:
+                load = _Load(spec, min_dim)
+                if load.place(box, orientations):
+                    loads.append(load)
+                    break
+            else:
+                unplaced.append(box)
+        return loads, unplaced
+
+    def _downsize(
+        self,
+        loads: List[_Load],
+        containers: List[ContainerSpec],
+        allow_rotation: bool,
+        allow_tipping: bool
+    ) -> List[_Load]:
+        """尝试将每个集装箱换成能装下其全部箱子的更小箱型"""
+        by_size = sorted(containers, key=lambda spec: spec.volume)
+        result = []
+        for load in loads:
+            boxes = [placement[0] for placement in load.placements]
+            for spec in by_size:
+                if spec.volume >= load.spec.volume:
+                    break
+                if load.volume > spec.volume or load.weight > spec.max_weight:
+                    continue
+                repacked, unplaced = self._pack(boxes, [spec], allow_rotation, allow_tipping)
+                if len(repacked) == 1 and not unplaced:
+                    load = repacked[0]
+                    break
+            result.append(load)
+        return result
+
+    def plan(
+        self,
+        boxes: List[_Box],
+        containers: Optional[List[ContainerSpec]] = None,
+        allow_rotation: bool = True,
+        allow_tipping: bool = False,
+        include_positions: bool = True
+    ) -> dict:
+        """计算装载方案，返回各集装箱的箱子分配、利用率以及无法装入的箱子"""
+        started = time.perf_counter()
+        containers = containers or DEFAULT_CONTAINERS
+        loads, unplaced = self._pack(boxes, containers, allow_rotation, allow_tipping)
+        loads = self._downsize(loads, containers, allow_rotation, allow_tipping)
+
+        result_containers = []
+        for index, load in enumerate(loads, start=1):
+            assignments: Dict[Tuple[int, int], int] = {}
+            for box, *_ in load.placements:
+                key = (box.packing_list_id, box.spec_id)
+                assignments[key] = assignments.get(key, 0) + 1
+
+            container = {
+                "index": index,
+                "container_type": load.spec.name,
+                "boxes": len(load.placements),
+                "weight": round(load.weight, 2),
+                "volume": round(load.volume, 3),
+                "volume_utilization": round(load.volume / load.spec.volume * 100, 2),
+                "weight_utilization": round(load.weight / load.spec.max_weight * 100, 2),
+                "assignments": [
+                    {"packing_list_id": packing_list_id, "box_spec_id": spec_id, "quantity": quantity}
+                    for (packing_list_id, spec_id), quantity in assignments.items()
+                ],
+                "placements": []
+            }
+            if include_positions:
+                container["placements"] = [
+                    {
+                        "packing_list_id": box.packing_list_id,
+                        "box_spec_id": box.spec_id,
+                        "x": x, "y": y, "z": z,
+                        "length": l, "width": w, "height": h
+                    }
+                    for box, x, y, z, (l, w, h) in load.placements
+                ]
+            result_containers.append(container)
+
+        unplaced_counts: Dict[Tuple[int, int], int] = {}
+        for box in unplaced:
+            key = (box.packing_list_id, box.spec_id)
+            unplaced_counts[key] = unplaced_counts.get(key, 0) + 1
+
+        return {
+            "total_boxes": len(boxes),
+            "container_count": len(result_containers),
+            "containers": result_containers,
+            "unplaced": [
+                {"packing_list_id": packing_list_id, "box_spec_id": spec_id, "quantity": quantity}
+                for (packing_list_id, spec_id), quantity in unplaced_counts.items()
+            ],
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+
+load_planning_service = LoadPlanningService()
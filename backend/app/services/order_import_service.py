@@ -0,0 +1,407 @@
+import json
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.import_manifest import ImportManifest
+from ..models.sales import Order, OrderItem, OrderStatus, PaymentStatus
+from ..schemas.sales import OrderImportError, OrderImportResult
+from ..utils.excel import iter_csv_chunks, iter_workbook_chunks
+from ..utils.query import upsert_statement
+from .import_manifest_service import import_manifest_service
+from .product_catalog import product_catalog
+
+# 订单级字段，同一订单取第一个非空值
+ORDER_FIELDS = (
+    "order_no", "order_date", "store_name", "status", "payment_status", "customer_name",
+    "customer_email", "shipping_fee", "tax", "discount", "tracking_no", "carrier", "notes"
+)
+# 明细级字段；line_amount 为行金额（单价×数量），item_* 按订单汇总
+LINE_FIELDS = ("sku", "quantity", "unit_price", "line_amount", "item_tax", "item_discount", "item_shipping")
+NUMERIC_FIELDS = {
+    "shipping_fee", "tax", "discount", "quantity", "unit_price",
+    "line_amount", "item_tax", "item_discount", "item_shipping"
+}
+REQUIRED_FIELDS = ("order_no", "sku", "quantity")
+ORDER_STATUSES = {status.value for status in OrderStatus}
+PAYMENT_STATUSES = {status.value for status in PaymentStatus}
+
+# 订单写入时更新的列，创建时间和操作员保留首次导入的值
+ORDER_UPDATE_COLUMNS = [
+    "store_name", "platform", "order_date", "status", "payment_status", "subtotal", "shipping_fee",
+    "tax", "discount", "total", "customer_name", "customer_email", "tracking_no", "carrier",
+    "notes", "content_hash", "updated_at"
+]
+
+# 内置平台列映射：列名 -> 字段，状态原值 -> 订单状态；字段名本身也可直接作为列名
+PLATFORM_MAPPINGS = {
+    "default": {
+        "columns": {
+            "订单编号": "order_no", "订单日期": "order_date", "店铺": "store_name", "订单状态": "status",
+            "支付状态": "payment_status", "SKU": "sku", "数量": "quantity", "单价": "unit_price",
+            "金额": "line_amount", "运费": "shipping_fee", "税费": "tax", "折扣": "discount",
+            "客户姓名": "customer_name", "客户邮箱": "customer_email", "物流单号": "tracking_no",
+            "承运商": "carrier", "备注": "notes",
+        },
+        "statuses": {
+            "待处理": "pending", "处理中": "processing", "已发货": "shipped",
+            "已完成": "completed", "已取消": "cancelled",
+        },
+    },
+    "amazon": {
+        "columns": {
+            "amazon-order-id": "order_no", "purchase-date": "order_date", "order-status": "status",
+            "sku": "sku", "quantity": "quantity", "quantity-purchased": "quantity",
+            "item-price": "line_amount", "item-tax": "item_tax", "shipping-price": "item_shipping",
+            "item-promotion-discount": "item_discount", "buyer-name": "customer_name",
+            "buyer-email": "customer_email", "tracking-number": "tracking_no", "carrier": "carrier",
+        },
+        "statuses": {
+            "Pending": "pending", "Unshipped": "processing", "Shipping": "processing",
+            "Shipped": "shipped", "Shipped - Delivered to Buyer": "completed", "Cancelled": "cancelled",
+        },
+    },
+    "shopee": {
+        "columns": {
+            "Order ID": "order_no", "Order Creation Date": "order_date", "Order Status": "status",
+            "SKU Reference No.": "sku", "Quantity": "quantity", "Deal Price": "unit_price",
+            "Buyer Paid Shipping Fee": "shipping_fee", "Seller Discount": "discount",
+            "Username (Buyer)": "customer_name", "Tracking Number*": "tracking_no",
+            "Shipping Option": "carrier", "Remark from buyer": "notes",
+            "订单编号": "order_no", "订单成立日期": "order_date", "订单状态": "status",
+            "商品选项货号": "sku", "数量": "quantity", "商品活动价格": "unit_price",
+            "买家支付的运费": "shipping_fee", "买家账号": "customer_name", "包裹查询号码": "tracking_no",
+        },
+        "statuses": {
+            "Unpaid": "pending", "To ship": "processing", "Shipping": "shipped", "Completed": "completed",
+            "Cancelled": "cancelled", "待付款": "pending", "待出货": "processing", "运送中": "shipped",
+            "已完成": "completed", "不成立": "cancelled",
+        },
+    },
+}
+
+def load_mappings() -> Dict[str, dict]:
+    """内置映射与 ORDER_IMPORT_MAPPINGS_FILE 合并，同名平台以文件为准"""
+    mappings = dict(PLATFORM_MAPPINGS)
+    if settings.ORDER_IMPORT_MAPPINGS_FILE:
+        with open(settings.ORDER_IMPORT_MAPPINGS_FILE, encoding="utf-8") as f:
+            mappings.update(json.load(f))
+    return mappings
+
+def _clean(value):
+    """空单元格（None、NaN、空白字符串）统一为 None"""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+def _text(value) -> Optional[str]:
+    value = _clean(value)
+    return None if value is None else str(value)
+
+def _amount(value) -> float:
+    return float(value or 0)
+
+class OrderImportService:
+    """
+    平台订单批量导入服务
+
+    逐块读取平台导出的CSV/XLSX，按平台列映射转换为订单和明细（一行一个明细），
+    按订单编号批量 upsert：内容哈希未变化的订单跳过，变化的订单整体替换明细。
+    每块提交一次并把进度写入导入清单，在后台任务中执行。
+    同一订单的行需相邻，跨块的订单会并入下一块处理；导入只记录销售，不扣减库存
+    """
+
+    def mapping(self, platform: str) -> dict:
+        mapping = load_mappings().get(platform)
+        if mapping is None:
+            raise ValueError(f"不支持的平台: {platform}")
+        return mapping
+
+    @staticmethod
+    def resolve_columns(columns, mapping: dict) -> Dict[str, str]:
+        """表头 -> 字段，忽略无法识别的列"""
+        fields = set(ORDER_FIELDS) | set(LINE_FIELDS)
+        names = mapping.get("columns", {})
+        resolved = {}
+        for column in columns:
+            field = names.get(column, column if column in fields else None)
+            if field and field not in resolved.values():
+                resolved[column] = field
+        missing = [field for field in REQUIRED_FIELDS if field not in resolved.values()]
+        if missing:
+            raise ValueError(f"缺少必要列: {', '.join(missing)}")
+        if "unit_price" not in resolved.values() and "line_amount" not in resolved.values():
+            raise ValueError("缺少单价或金额列")
+        return resolved
+
+    @staticmethod
+    def _frame(df: pd.DataFrame, columns: Dict[str, str], first_row: int) -> pd.DataFrame:
+        """按列映射整块转换类型，_row 为文件中的行号"""
+        frame = df[list(columns)].rename(columns=columns)
+        for field in frame.columns:
+            if field in NUMERIC_FIELDS:
+                frame[field] = pd.to_numeric(frame[field], errors="coerce")
+            elif field == "order_date":
+                dates = pd.to_datetime(frame[field], errors="coerce", utc=True)
+                frame[field] = [None if pd.isna(value) else value.date() for value in dates]
+            else:
+                frame[field] = [_text(value) for value in frame[field]]
+        frame["_row"] = range(first_row, first_row + len(frame))
+        return frame
+
+    def iter_order_frames(self, path: str, filename: str, mapping: dict) -> Iterator[Tuple[pd.DataFrame, int]]:
+        """
+        逐块生成 (订单行, 本块读取的行数)
+
+        每块末尾的订单可能延续到下一块，暂存后并入下一块
+        """
+        chunks = iter_csv_chunks(path) if filename.lower().endswith(".csv") else iter_workbook_chunks(path)
+        columns = None
+        first_row = 2  # 第1行为表头
+        pending = None
+        for df in chunks:
+            if columns is None:
+                columns = self.resolve_columns(df.columns, mapping)
+            frame = self._frame(df, columns, first_row)
+            first_row += len(df)
+            if pending is not None:
+                frame = pd.concat([pending, frame], ignore_index=True)
+            if frame.empty:
+                # 只有表头的文件
+                continue
+            tail = frame["order_no"] == frame["order_no"].iloc[-1]
+            pending = frame[tail]
+            yield frame[~tail], len(df)
+        if pending is not None:
+            yield pending, 0
+
+    def _build(
+        self,
+        order_no: str,
+        records: List[dict],
+        platform: str,
+        store_name: Optional[str],
+        statuses: Dict[str, str],
+        products: dict
+    ) -> Tuple[dict, List[dict]]:
+        """由一个订单的全部行生成订单和明细，数据有误时抛出 ValueError"""
+        header = {}
+        for field in ORDER_FIELDS:
+            header[field] = next((record[field] for record in records if _clean(record.get(field)) is not None), None)
+        store = header["store_name"] or store_name
+        if not store:
+            raise ValueError("缺少店铺名称")
+        if header["order_date"] is None:
+            raise ValueError("订单日期无效")
+
+        status = header["status"]
+        status = statuses.get(status, status.lower()) if status else OrderStatus.PENDING.value
+        status = OrderStatus(status) if status in ORDER_STATUSES else OrderStatus.PENDING
+        payment_status = header["payment_status"]
+        # 平台订单默认已由平台收款
+        if payment_status not in PAYMENT_STATUSES:
+            payment_status = PaymentStatus.PAID.value
+
+        items = []
+        for record in records:
+            product = products.get(record.get("sku"))
+            if product is None:
+                raise ValueError(f"SKU {record.get('sku')} 不存在")
+            quantity = record.get("quantity")
+            if _clean(quantity) is None or quantity <= 0 or quantity != int(quantity):
+                raise ValueError(f"SKU {product.sku} 数量无效")
+            quantity = int(quantity)
+            unit_price = _clean(record.get("unit_price"))
+            if unit_price is None:
+                line_amount = _clean(record.get("line_amount"))
+                if line_amount is None:
+                    raise ValueError(f"SKU {product.sku} 缺少单价")
+                unit_price = line_amount / quantity
+            subtotal = quantity * unit_price
+            tax, discount = _amount(_clean(record.get("item_tax"))), _amount(_clean(record.get("item_discount")))
+            items.append({
+                "product_id": product.id,
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "subtotal": subtotal,
+                "tax": tax,
+                "discount": discount,
+                "total": subtotal + tax - discount,
+                "sku": product.sku,
+                "product_name": product.name or product.sku,
+                "shipping": _amount(_clean(record.get("item_shipping"))),
+            })
+
+        subtotal = sum(item["subtotal"] for item in items)
+        shipping_fee = header["shipping_fee"] if header["shipping_fee"] is not None else sum(item["shipping"] for item in items)
+        tax = header["tax"] if header["tax"] is not None else sum(item["tax"] for item in items)
+        discount = header["discount"] if header["discount"] is not None else sum(item["discount"] for item in items)
+        for item in items:
+            del item["shipping"]
+        order = {
+            "order_no": order_no,
+            "store_name": store,
+            "platform": platform,
+            "order_date": header["order_date"],
+            "status": status,
+            "payment_status": PaymentStatus(payment_status),
+            "subtotal": subtotal,
+            "shipping_fee": shipping_fee,
+            "tax": tax,
+            "discount": discount,
+            "total": subtotal + shipping_fee + tax - discount,
+            "customer_name": header["customer_name"],
+            "customer_email": header["customer_email"],
+            "tracking_no": header["tracking_no"],
+            "carrier": header["carrier"],
+            "notes": header["notes"],
+        }
+        order["content_hash"] = import_manifest_service.hash_group(
+            sorted((key, value) for key, value in order.items() if key != "content_hash"), items
+        )
+        return order, items
+
+    @staticmethod
+    def _fail(result: OrderImportResult, row: int, order_no: Optional[str], message: str) -> None:
+        result.failed += 1
+        if len(result.errors) < settings.IMPORT_MAX_ERRORS:
+            result.errors.append(OrderImportError(row=row, order_no=order_no, message=message))
+
+    def write(
+        self,
+        db: Session,
+        frame: pd.DataFrame,
+        platform: str,
+        store_name: Optional[str],
+        statuses: Dict[str, str],
+        user_id: Optional[int],
+        result: OrderImportResult
+    ) -> None:
+        """按订单编号批量写入一块订单行"""
+        records = frame.to_dict("records")
+        grouped: Dict[str, List[dict]] = {}
+        for record in records:
+            order_no = _clean(record.get("order_no"))
+            if order_no is None:
+                self._fail(result, record["_row"], None, "缺少订单编号")
+                continue
+            grouped.setdefault(order_no, []).append(record)
+        if not grouped:
+            return
+
+        products = product_catalog.by_skus(db, {record.get("sku") for record in records if record.get("sku")})
+        orders: Dict[str, Tuple[dict, List[dict]]] = {}
+        for order_no, rows in grouped.items():
+            try:
+                orders[order_no] = self._build(order_no, rows, platform, store_name, statuses, products)
+            except ValueError as e:
+                self._fail(result, rows[0]["_row"], order_no, str(e))
+        result.orders += len(grouped)
+        if not orders:
+            return
+
+        conn = db.connection()
+        existing = {
+            order_no: (order_id, content_hash)
+            for order_no, order_id, content_hash in conn.execute(
+                select(Order.order_no, Order.id, Order.content_hash).where(Order.order_no.in_(list(orders)))
+            )
+        }
+        changed = {
+            order_no: order for order_no, order in orders.items()
+            if order_no not in existing or existing[order_no][1] != order[0]["content_hash"]
+        }
+        result.unchanged += len(orders) - len(changed)
+        if not changed:
+            return
+
+        now = datetime.utcnow()
+        written = {
+            order_no: order_id
+            for order_id, order_no in conn.execute(
+                upsert_statement(conn, Order, ["order_no"], update_columns=ORDER_UPDATE_COLUMNS)
+                .returning(Order.id, Order.order_no),
+                [
+                    {**order, "operator_id": user_id, "created_at": now, "updated_at": now}
+                    for order, _ in changed.values()
+                ]
+            )
+        }
+        # 明细按订单整体替换；upsert 写入的订单都先删除旧明细，
+        # 包括查询之后才被并发导入创建的订单
+        conn.execute(delete(OrderItem).where(OrderItem.order_id.in_(list(written.values()))))
+        replaced = [order_no for order_no in written if order_no in existing]
+        conn.execute(insert(OrderItem), [
+            {**item, "order_id": written[order_no], "created_at": now, "updated_at": now}
+            for order_no, (_, items) in changed.items()
+            for item in items
+        ])
+        result.created += len(written) - len(replaced)
+        result.updated += len(replaced)
+
+    def import_file(
+        self,
+        db: Session,
+        manifest: ImportManifest,
+        path: str,
+        filename: str,
+        platform: str,
+        store_name: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> OrderImportResult:
+        """导入平台订单文件，每块提交一次并把进度写入导入清单"""
+        started = time.perf_counter()
+        mapping = self.mapping(platform)
+        statuses = mapping.get("statuses", {})
+        result = OrderImportResult()
+        for frame, rows in self.iter_order_frames(path, filename, mapping):
+            result.total += rows
+            if len(frame):
+                self.write(db, frame, platform, store_name, statuses, user_id, result)
+            result.elapsed_seconds = round(time.perf_counter() - started, 3)
+            if result.elapsed_seconds:
+                result.rows_per_second = round(result.total / result.elapsed_seconds, 1)
+            manifest.result = result.dict()
+            db.commit()
+        return result
+
+    def run(
+        self,
+        manifest_id: int,
+        path: str,
+        filename: str,
+        platform: str,
+        store_name: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> None:
+        """后台任务入口：使用独立会话导入，结束后更新清单状态并删除上传文件"""
+        db = SessionLocal()
+        try:
+            manifest = db.get(ImportManifest, manifest_id)
+            try:
+                result = self.import_file(db, manifest, path, filename, platform, store_name, user_id)
+                import_manifest_service.finish(db, manifest, result.dict(), result.failed)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                import_manifest_service.fail(db, manifest, f"导入失败: {str(e)}")
+                db.commit()
+        finally:
+            db.close()
+            if os.path.exists(path):
+                os.remove(path)
+
+order_import_service = OrderImportService()
@@ -0,0 +1,130 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, selectinload
+
+from ..models.product import Product
+from ..models.sales import Order, OrderItem
+from ..schemas.sales import OrderCreate
+from .category_stats import category_stats
+from .product_catalog import product_catalog
+from .product_facets import product_facet_counter
+from .response_cache import STOCK_TAG, category_tag, response_cache
+
+def _amount(value) -> float:
+    return float(value or 0)
+
+class OrderService:
+    """
+    订单创建服务
+
+    一批订单只做固定次数的语句：商品从进程内目录批量解析，所有明细的库存用一条
+    UPDATE ... WHERE stock >= 数量 原子扣减，订单和明细各一条批量INSERT，
+    全部在同一事务中完成；库存扣减绕过ORM，分面计数和分类汇总按前后快照的差值同步
+    """
+
+    @staticmethod
+    def _deduct_stock(conn: Connection, quantities: Dict[int, int]) -> None:
+        """
+        按商品扣减库存，任一商品库存不足时不扣减并抛出 ValueError
+
+        单条UPDATE对每个商品同时检查并扣减，并发下单不会超卖；
+        更新行数少于商品数说明有商品库存不足，由调用方回滚事务
+        """
+        quantity = case(quantities, value=Product.id)
+        result = conn.execute(
+            update(Product)
+            .where(Product.id.in_(list(quantities)), Product.stock >= quantity)
+            .values(stock=Product.stock - quantity)
+        )
+        if result.rowcount == len(quantities):
+            return
+
+        rows = conn.execute(
+            select(Product.name, Product.stock).where(Product.id.in_(list(quantities)))
+            .where(Product.stock < quantity)
+        ).all()
+        names = ", ".join(name or "" for name, _ in rows) or "部分商品"
+        raise ValueError(f"产品 {names} 库存不足")
+
+    def create_orders(self, db: Session, orders: List[OrderCreate], operator_id: int) -> List[Order]:
+        """
+        批量创建订单并扣减库存，返回创建的订单（含明细），顺序与传入一致
+
+        商品不存在时抛出 LookupError，库存不足时抛出 ValueError，均不写入任何数据
+        """
+        quantities: Dict[int, int] = Counter()
+        for data in orders:
+            for item in data.items:
+                quantities[item.product_id] += item.quantity
+        if not quantities:
+            raise ValueError("订单没有明细")
+
+        products = product_catalog.get_many(db, quantities)
+        missing = [product_id for product_id in quantities if product_id not in products]
+        if missing:
+            raise LookupError(f"产品ID {', '.join(map(str, missing))} 不存在")
+
+        conn = db.connection()
+        try:
+            product_ids = list(quantities)
+            facets_before = product_facet_counter.snapshot(conn, product_ids)
+            categories_before = category_stats.snapshot(conn, product_ids)
+            self._deduct_stock(conn, quantities)
+
+            # 订单编号：时间戳 + 批内序号
+            now = datetime.now()
+            prefix = f"SO{now.strftime('%Y%m%d%H%M%S%f')}"
+            order_rows = []
+            for index, data in enumerate(orders):
+                subtotal = sum(item.quantity * _amount(item.unit_price) for item in data.items)
+                order_rows.append({
+                    **data.dict(exclude={"items"}),
+                    "order_no": f"{prefix}{index:03d}",
+                    "subtotal": subtotal,
+                    "total": subtotal + _amount(data.shipping_fee) + _amount(data.tax) - _amount(data.discount),
+                    "operator_id": operator_id,
+                })
+            # 按订单编号对应回传入顺序；要求按参数顺序返回时部分数据库会退化为逐行INSERT
+            inserted = dict(conn.execute(insert(Order).returning(Order.order_no, Order.id), order_rows).all())
+            order_ids = [inserted[row["order_no"]] for row in order_rows]
+
+            item_rows = []
+            for order_id, data in zip(order_ids, orders):
+                for item in data.items:
+                    product = products[item.product_id]
+                    subtotal = item.quantity * _amount(item.unit_price)
+                    item_rows.append({
+                        **item.dict(),
+                        "order_id": order_id,
+                        "subtotal": subtotal,
+                        "total": subtotal + _amount(item.tax) - _amount(item.discount),
+                        "sku": product.sku,
+                        "product_name": product.name,
+                    })
+            conn.execute(insert(OrderItem), item_rows)
+
+            after = product_facet_counter.snapshot(conn, product_ids)
+            after.subtract(facets_before)
+            product_facet_counter.adjust(conn, after)
+            category_stats.adjust(
+                conn, category_stats.difference(category_stats.snapshot(conn, product_ids), categories_before)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        # 商品目录不含库存，无需记录变更
+        response_cache.invalidate(STOCK_TAG, *{category_tag(product.category) for product in products.values()})
+
+        created = {
+            order.id: order
+            for order in db.query(Order).options(selectinload(Order.items)).filter(Order.id.in_(order_ids))
+        }
+        return [created[order_id] for order_id in order_ids]
+
+order_service = OrderService()
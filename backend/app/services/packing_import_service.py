@@ -0,0 +1,213 @@
+from collections import Counter
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal, engine
+from ..models.import_manifest import ImportManifest
+from ..models.packing_list import PackingList, PackingListItem
+from ..models.product import Product
+from ..schemas.packing_list import FileImportResult
+from ..utils.excel import iter_workbook_chunks, parse_packing_list
+from .import_manifest_service import import_manifest_service
+from .product_catalog import product_catalog
+
+def init_worker() -> None:
+    """导入进程池的初始化函数：丢弃从父进程继承的数据库连接，子进程使用自己的连接"""
+    engine.dispose(close=False)
+
+class PackingImportService:
+    """
+    装箱单导入
+
+    按 IMPORT_CHUNK_ROWS 行分批解析并写入，每批提交一次，内存占用与文件大小无关；
+    同一店铺/SKU跨批次出现时合并到已创建的装箱单，导入清单记录每个分组的写入结果以便续传
+    """
+
+    def save_parsed(
+        self,
+        db: Session,
+        parsed_data: List[dict],
+        imported: dict,
+        result,
+        manifest: Optional[ImportManifest] = None,
+        completed: Optional[dict] = None,
+        occurrences: Optional[Counter] = None
+    ) -> None:
+        """
+        保存解析后的装箱单数据
+
+        imported 记录已创建的 (店铺, SKU) -> (装箱单ID, 明细ID, 单价)，
+        同一店铺/SKU再次出现时合并到已创建的装箱单；
+        result 需提供 total/created/updated/failed/skipped/errors 字段。
+        传入 manifest 时按分组内容哈希记录写入结果，completed 中已成功的分组直接跳过；
+        哈希只取决于分组内容，与分批行数无关，文件中内容相同的分组按 occurrences 中的出现次序区分
+        """
+        completed = completed or {}
+        occurrences = Counter() if occurrences is None else occurrences
+    
+        # 从商品目录批量解析本批所有SKU，新建的产品也放入同一映射
+        products = product_catalog.by_skus(db, (data['sku'] for data in parsed_data))
+    
+        # 处理每个装箱单
+        for data in parsed_data:
+            key = (data['store_name'], data['sku'])
+            group_hash = None
+            if manifest:
+                content_hash = import_manifest_service.hash_group(data)
+                occurrences[content_hash] += 1
+                group_hash = import_manifest_service.hash_group(content_hash, occurrences[content_hash])
+                if group_hash in completed:
+                    result.skipped += 1
+                    continue
+        
+            try:
+                # 每个分组使用独立的保存点，失败时不会残留半成品数据
+                with db.begin_nested():
+                    if key in imported:
+                        # 跨批次的同一装箱单，追加装箱数量
+                        packing_list_id, item_id, price = imported[key]
+                        packing_item = db.get(PackingListItem, item_id)
+                        packing_item.quantity += data['quantity']
+                        packing_item.box_quantities = packing_item.box_quantities + data['box_quantities']
+                    
+                        packing_list = db.get(PackingList, packing_list_id)
+                        packing_list.total_boxes += len(data['box_quantities'])
+                        packing_list.total_pieces += data['quantity']
+                        packing_list.total_value += data['quantity'] * price
+                    else:
+                        result.total += 1
+                    
+                        # 查找或创建产品
+                        product = products.get(data['sku'])
+                        if not product:
+                            product = Product(
+                                sku=data['sku'],
+                                name=data['sku'],
+                                chinese_name=f"待补充({data['sku']})",
+                                type=data['type'],
+                                is_auto_created=True,
+                                needs_completion=True
+                            )
+                            db.add(product)
+                            db.flush()
+                            products[data['sku']] = product
+                            result.created += 1
+                    
+                        # 创建装箱单
+                        packing_list = PackingList(
+                            store_name=data['store_name'],
+                            type=data['type'],
+                            remarks=data['remarks'],
+                            total_boxes=len(data['box_quantities']),
+                            total_pieces=data['quantity'],
+                            total_weight=0,  # 需要根据实际情况计算
+                            total_volume=0,  # 需要根据实际情况计算
+                            total_value=data['quantity'] * (product.price or 0)
+                        )
+                        db.add(packing_list)
+                        db.flush()
+                    
+                        # 创建装箱单明细
+                        packing_item = PackingListItem(
+                            packing_list_id=packing_list.id,
+                            product_id=product.id,
+                            quantity=data['quantity'],
+                            box_quantities=data['box_quantities']
+                        )
+                        db.add(packing_item)
+                        db.flush()
+                    
+                        imported[key] = (packing_list.id, packing_item.id, product.price or 0)
+                        result.updated += 1
+                
+                    if manifest:
+                        packing_list_id, item_id, price = imported[key]
+                        import_manifest_service.record_group(
+                            db, manifest, group_hash,
+                            group_key=f"{data['store_name']}/{data['sku']}",
+                            details={
+                                'store_name': data['store_name'],
+                                'sku': data['sku'],
+                                'packing_list_id': packing_list_id,
+                                'packing_item_id': item_id,
+                                'price': price
+                            }
+                        )
+            
+            except Exception as e:
+                result.failed += 1
+                result.errors.append(f"处理 {data['sku']} 失败: {str(e)}")
+                if manifest:
+                    import_manifest_service.record_group(
+                        db, manifest, group_hash,
+                        group_key=f"{data['store_name']}/{data['sku']}",
+                        error=str(e)
+                    )
+
+    @staticmethod
+    def restore_imported(completed: dict) -> dict:
+        """根据已完成的清单分组恢复 (店铺, SKU) -> (装箱单ID, 明细ID, 单价) 映射"""
+        imported = {}
+        for group in completed.values():
+            details = group.details or {}
+            imported[(details['store_name'], details['sku'])] = (
+                details['packing_list_id'],
+                details['packing_item_id'],
+                details['price']
+            )
+        return imported
+
+    def import_file(
+        self,
+        db: Session,
+        manifest: ImportManifest,
+        path: str,
+        result,
+        store_name: Optional[str] = None
+    ) -> int:
+        """
+        分批解析并写入整个文件，每批提交一次并把进度写入导入清单，返回读取的数据行数
+
+        文件中没有"店铺"列时使用 store_name 填充
+        """
+        completed = import_manifest_service.completed_groups(db, manifest)
+        imported = self.restore_imported(completed)
+        occurrences = Counter()
+        rows = 0
+        for df in iter_workbook_chunks(path):
+            rows += len(df)
+            if store_name and '店铺' not in df.columns:
+                df['店铺'] = store_name
+            self.save_parsed(db, parse_packing_list(df), imported, result, manifest, completed, occurrences)
+            # 中断后可从未提交的分组续传
+            manifest.result = result.dict()
+            db.commit()
+        return rows
+
+    def run_file(self, manifest_id: int, path: str, filename: str, store_name: str) -> dict:
+        """
+        进程池入口：在子进程中使用独立会话解析并写入单个文件
+
+        结束后更新清单状态，返回 FileImportResult 的字典；父进程只等待结果，不再接收解析数据
+        """
+        result = FileImportResult(filename=filename, store_name=store_name)
+        db = SessionLocal()
+        try:
+            manifest = db.get(ImportManifest, manifest_id)
+            try:
+                result.rows = self.import_file(db, manifest, path, result, store_name)
+                result.success = True
+                import_manifest_service.finish(db, manifest, result.dict(), result.failed)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                result.success = False
+                result.errors.append(f"店铺 {store_name} 导入失败: {str(e)}")
+                import_manifest_service.fail(db, manifest, str(e))
+                db.commit()
+        finally:
+            db.close()
+        return result.dict()
+
+packing_import_service = PackingImportService()
@@ -0,0 +1,251 @@
+import enum
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.product import Product, ProductChange
+from .product_tags import parse_tags
+
+class CatalogProduct(NamedTuple):
+    """目录中的商品，只保留高频查询需要的字段"""
+    id: int
+    sku: Optional[str]
+    name: Optional[str]
+    category: Optional[str]
+    price: Optional[float]
+    cost: Optional[float]
+    weight: Optional[float]
+    volume: Optional[float]
+    tags: Tuple[str, ...]
+    status: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+_COLUMNS = (
+    Product.id, Product.sku, Product.name, Product.category, Product.price, Product.cost,
+    Product.weight, Product.volume, Product.tags, Product.status, Product.created_at, Product.updated_at
+)
+
+def normalize_sku(code: str) -> str:
+    """与产品SKU校验规则一致：去空白并转大写"""
+    return code.strip().upper()
+
+def _entry(row) -> CatalogProduct:
+    status = row.status.value if isinstance(row.status, enum.Enum) else row.status
+    tags = tuple(parse_tags(row.tags))
+    return CatalogProduct(
+        row.id, row.sku, row.name, row.category, row.price, row.cost,
+        row.weight, row.volume, tags, status, row.created_at, row.updated_at
+    )
+
+class ProductCatalog:
+    """
+    进程内商品目录
+
+    启动时全量加载，按ID、SKU、分类建立索引。商品通过ORM写入时在同一事务中记录
+    product_changes，各进程最多每 CATALOG_SYNC_INTERVAL 秒读取一次新增的变更并只重载变更的商品，
+    本进程提交后立即同步；绕过ORM的批量写入需调用 record_changes
+    """
+
+    def __init__(self):
+        self._by_id: Dict[int, CatalogProduct] = {}
+        self._by_sku: Dict[str, int] = {}
+        self._by_category: Dict[Optional[str], Set[int]] = {}
+        self._version = 0  # 已同步的最大变更ID
+        self._checked_at = 0.0
+        self._stale = False
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    # 索引维护
+    def _put(self, entry: CatalogProduct) -> None:
+        self._remove(entry.id)
+        self._by_id[entry.id] = entry
+        if entry.sku:
+            self._by_sku[normalize_sku(entry.sku)] = entry.id
+        self._by_category.setdefault(entry.category, set()).add(entry.id)
+
+    def _remove(self, product_id: int) -> None:
+        entry = self._by_id.pop(product_id, None)
+        if entry is None:
+            return
+        if entry.sku and self._by_sku.get(normalize_sku(entry.sku)) == product_id:
+            del self._by_sku[normalize_sku(entry.sku)]
+        ids = self._by_category.get(entry.category)
+        if ids is not None:
+            ids.discard(product_id)
+            if not ids:
+                del self._by_category[entry.category]
+
+    def load(self, db: Session, batch_size: int = 10000) -> int:
+        """
+        全量加载商品并清理过期的变更日志，返回商品数
+
+        使用独立连接读取和清理，不提交调用方会话中未完成的事务
+        """
+        retention = datetime.utcnow() - timedelta(days=settings.CATALOG_CHANGE_RETENTION_DAYS)
+        with self._lock, db.get_bind().begin() as conn:
+            # 先记下变更位置再加载，加载期间的变更会在下次同步时重放
+            version = conn.execute(select(func.max(ProductChange.id))).scalar() or 0
+            self._by_id.clear()
+            self._by_sku.clear()
+            self._by_category.clear()
+
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    select(*_COLUMNS).where(Product.id > last_id).order_by(Product.id).limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                for row in rows:
+                    self._put(_entry(row))
+                last_id = rows[-1].id
+
+            self._version = version
+            self._checked_at = time.monotonic()
+            self._stale = False
+            self._loaded = True
+
+            conn.execute(delete(ProductChange).where(ProductChange.created_at < retention))
+        return len(self._by_id)
+
+    def sync(self, db: Session, force: bool = False) -> None:
+        """按变更日志增量同步，未加载时全量加载"""
+        if not self._loaded:
+            self.load(db)
+            return
+        if not (force or self._stale or time.monotonic() - self._checked_at >= settings.CATALOG_SYNC_INTERVAL):
+            return
+
+        with self._lock:
+            changes = db.execute(
+                select(ProductChange.id, ProductChange.product_id)
+                .where(ProductChange.id > self._version)
+                .order_by(ProductChange.id)
+            ).all()
+            if changes:
+                self._refresh(db, {product_id for _, product_id in changes})
+                self._version = changes[-1].id
+            self._checked_at = time.monotonic()
+            self._stale = False
+
+    def _refresh(self, db: Session, product_ids: Set[int]) -> None:
+        """重载指定商品，已删除的从索引中移除"""
+        rows = db.execute(select(*_COLUMNS).where(Product.id.in_(product_ids))).all()
+        for product_id in product_ids:
+            self._remove(product_id)
+        for row in rows:
+            self._put(_entry(row))
+
+    # 查询
+    def get(self, db: Session, product_id: int) -> Optional[CatalogProduct]:
+        return self.get_many(db, [product_id]).get(product_id)
+
+    def get_many(self, db: Session, product_ids: Iterable[int]) -> Dict[int, CatalogProduct]:
+        """
+        批量按ID获取，不存在的ID不在结果中
+
+        目录中没有的ID再查一次数据库，以覆盖其他进程刚创建、尚未同步的商品
+        """
+        self.sync(db)
+        result: Dict[int, CatalogProduct] = {}
+        missing: List[int] = []
+        by_id = self._by_id
+        for product_id in dict.fromkeys(product_ids):
+            entry = by_id.get(product_id)
+            if entry is None:
+                missing.append(product_id)
+            else:
+                result[product_id] = entry
+
+        if missing:
+            rows = db.execute(select(*_COLUMNS).where(Product.id.in_(missing))).all()
+            with self._lock:
+                for row in rows:
+                    entry = _entry(row)
+                    self._put(entry)
+                    result[entry.id] = entry
+        return result
+
+    def by_skus(self, db: Session, codes: Iterable[str]) -> Dict[str, CatalogProduct]:
+        """
+        批量按SKU获取商品，结果以传入的SKU为键
+
+        目录中没有的SKU再查一次数据库，以覆盖其他进程刚创建、尚未同步的商品
+        """
+        self.sync(db)
+        result: Dict[str, CatalogProduct] = {}
+        missing: Dict[str, List[str]] = {}
+        by_sku, by_id = self._by_sku, self._by_id
+        for code in codes:
+            if not code or code in result:
+                continue
+            sku = normalize_sku(code)
+            product_id = by_sku.get(sku)
+            if product_id is None:
+                missing.setdefault(sku, []).append(code)
+            else:
+                result[code] = by_id[product_id]
+
+        if missing:
+            rows = db.execute(
+                select(*_COLUMNS).where(func.upper(Product.sku).in_(list(missing)))
+            ).all()
+            with self._lock:
+                for row in rows:
+                    entry = _entry(row)
+                    self._put(entry)
+                    for code in missing.get(normalize_sku(entry.sku), ()):
+                        result[code] = entry
+        return result
+
+    def resolve_skus(self, db: Session, codes: Iterable[str]) -> Dict[str, int]:
+        """批量将SKU解析为商品ID，结果以传入的SKU为键"""
+        return {code: entry.id for code, entry in self.by_skus(db, codes).items()}
+
+    def in_category(self, db: Session, category: Optional[str]) -> List[CatalogProduct]:
+        """获取分类下的商品，按ID排序"""
+        self.sync(db)
+        return [self._by_id[product_id] for product_id in sorted(self._by_category.get(category, ()))]
+
+    def all(self, db: Session) -> List[CatalogProduct]:
+        """获取全部商品，按ID排序"""
+        self.sync(db)
+        return [self._by_id[product_id] for product_id in sorted(self._by_id)]
+
+    # 变更通知
+    @staticmethod
+    def record_changes(conn: Connection, product_ids: Iterable[int]) -> None:
+        """记录商品变更，需与商品写入在同一事务中执行"""
+        params = [{"product_id": product_id} for product_id in set(product_ids)]
+        if params:
+            conn.execute(insert(ProductChange), params)
+
+    def mark_stale(self) -> None:
+        """本进程提交了商品变更，下次查询时立即同步"""
+        self._stale = True
+
+product_catalog = ProductCatalog()
+
+@event.listens_for(Session, "after_flush")
+def _record_product_changes(session, flush_context):
+    product_ids = {obj.id for obj in list(session.new) + list(session.deleted) if isinstance(obj, Product)}
+    product_ids.update(
+        obj.id for obj in session.dirty
+        if isinstance(obj, Product) and session.is_modified(obj, include_collections=False)
+    )
+    if product_ids:
+        product_catalog.record_changes(session.connection(), product_ids)
+        session.info["catalog_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _mark_catalog_stale(session):
+    if session.info.pop("catalog_changed", False):
+        product_catalog.mark_stale()
@@ -0,0 +1,274 @@
+import enum
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, event, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query, Session
+
+from ..config import settings
+from ..models.product import Product, ProductFacetCount, ProductStatus
+from ..utils.query import upsert_statement
+
+FACETS = ("category", "type", "stock_state", "price_band")
+
+# 影响分面归属的商品字段
+FACET_FIELDS = ("category", "type", "stock", "alert_threshold", "price", "status")
+
+IN_STOCK = "in_stock"
+LOW_STOCK = "low_stock"
+OUT_OF_STOCK = "out_of_stock"
+
+FacetKey = Tuple[str, str, str, str]
+
+def plain_value(value) -> str:
+    """枚举取值，None 存为空字符串，用作计数表的键"""
+    if isinstance(value, enum.Enum):
+        value = value.value
+    return "" if value is None else str(value)
+
+def _band_label(index: int) -> str:
+    bands = settings.FACET_PRICE_BANDS
+    low = bands[index]
+    if index + 1 < len(bands):
+        return f"{low:g}-{bands[index + 1]:g}"
+    return f"{low:g}+"
+
+def stock_state(stock: Optional[int], alert_threshold: Optional[int]) -> str:
+    """库存状态：无库存、低于预警阈值、有库存"""
+    stock = stock or 0
+    if stock <= 0:
+        return OUT_OF_STOCK
+    if stock <= (alert_threshold or 0):
+        return LOW_STOCK
+    return IN_STOCK
+
+def price_band(price: Optional[float]) -> str:
+    """价格所在区间，区间下限见 FACET_PRICE_BANDS"""
+    if price is None:
+        return ""
+    index = bisect_right(settings.FACET_PRICE_BANDS, price) - 1
+    return _band_label(max(index, 0))
+
+def stock_state_expression():
+    stock = func.coalesce(Product.stock, 0)
+    return case(
+        (stock <= 0, OUT_OF_STOCK),
+        (stock <= func.coalesce(Product.alert_threshold, 0), LOW_STOCK),
+        else_=IN_STOCK
+    )
+
+def price_band_expression():
+    bands = settings.FACET_PRICE_BANDS
+    whens = [(Product.price < bands[index + 1], _band_label(index)) for index in range(len(bands) - 1)]
+    return case((Product.price.is_(None), ""), *whens, else_=_band_label(len(bands) - 1))
+
+def active_condition():
+    """有效商品的SQL条件，商品搜索与分面计数共用，保证两者口径一致"""
+    return Product.status == ProductStatus.ACTIVE
+
+def facet_key(values) -> Optional[FacetKey]:
+    """商品所属的分面组合，非有效商品返回 None"""
+    if plain_value(values.get("status")) != ProductStatus.ACTIVE.value:
+        return None
+    return (
+        plain_value(values.get("category")),
+        plain_value(values.get("type")),
+        stock_state(values.get("stock"), values.get("alert_threshold")),
+        price_band(values.get("price"))
+    )
+
+class ProductFacetCounter:
+    """
+    商品分面计数
+
+    product_facet_counts 按 (分类, 类型, 库存状态, 价格区间) 保存有效商品数，
+    通过ORM写入商品时在同一事务中增量维护；无关键词、标签和价格范围条件的搜索直接由其汇总分面，
+    其余情况对筛选后的商品做一次分组统计。绕过ORM的批量写入需在写入前后调用 snapshot，
+    再用 adjust 提交两次快照的差值
+    """
+
+    def ensure(self, engine: Engine) -> None:
+        """计数表为空而存在商品时全量重建；可重复执行"""
+        with engine.begin() as conn:
+            if conn.execute(select(ProductFacetCount.count).limit(1)).first() is None:
+                if conn.execute(select(Product.id).limit(1)).first():
+                    self.rebuild(conn)
+
+    def rebuild(self, conn: Connection) -> None:
+        """按商品表全量重建计数"""
+        conn.execute(delete(ProductFacetCount))
+        rows = self._group(conn, select().select_from(Product).where(active_condition()))
+        self.adjust(conn, rows)
+
+    @staticmethod
+    def _group(conn, query) -> Counter:
+        """对商品查询做一次分组统计，返回 分面组合 -> 商品数"""
+        state, band = stock_state_expression(), price_band_expression()
+        grouped = (
+            query.with_only_columns(Product.category, Product.type, state, band, func.count())
+            .group_by(Product.category, Product.type, state, band)
+            .order_by(None)
+        )
+        counts = Counter()
+        for category, type_, state_value, band_value, count in conn.execute(grouped):
+            counts[(plain_value(category), plain_value(type_), state_value, band_value)] += count
+        return counts
+
+    def snapshot(self, conn: Connection, product_ids: Iterable[int]) -> Counter:
+        """统计指定商品当前的分面组合，用于批量写入前后求差值"""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return Counter()
+        return self._group(conn, select().select_from(Product).where(
+            active_condition(), Product.id.in_(product_ids)
+        ))
+
+    def adjust(self, conn: Connection, deltas: Dict[FacetKey, int]) -> None:
+        """按组合累加计数变化"""
+        params = [
+            dict(zip(FACETS, key), count=delta)
+            for key, delta in deltas.items() if delta
+        ]
+        if params:
+            conn.execute(
+                upsert_statement(conn, ProductFacetCount, FACETS, increment_columns=["count"]),
+                params
+            )
+
+    def counts(
+        self,
+        db: Session,
+        category: Optional[str] = None,
+        type: Optional[str] = None,
+        in_stock: Optional[bool] = None
+    ) -> Counter:
+        """从计数表读取满足分类、类型和库存条件的分面组合"""
+        query = select(*(getattr(ProductFacetCount, facet) for facet in FACETS), ProductFacetCount.count).where(
+            ProductFacetCount.count > 0
+        )
+        if category:
+            query = query.where(ProductFacetCount.category == category)
+        if type:
+            query = query.where(ProductFacetCount.type == type)
+        if in_stock is not None:
+            if in_stock:
+                query = query.where(ProductFacetCount.stock_state != OUT_OF_STOCK)
+            else:
+                query = query.where(ProductFacetCount.stock_state == OUT_OF_STOCK)
+        return Counter({tuple(row[:4]): row[4] for row in db.execute(query)})
+
+    def grouped(self, query: Query) -> Counter:
+        """对已加筛选条件的商品查询做一次分组统计"""
+        return self._group(query.session, query.statement)
+
+    @staticmethod
+    def summarize(counts: Dict[FacetKey, int]) -> Dict[str, List[dict]]:
+        """将分面组合的计数汇总为各分面的取值计数，按数量降序"""
+        facets = {facet: Counter() for facet in FACETS}
+        for key, count in counts.items():
+            for facet, value in zip(FACETS, key):
+                facets[facet][value] += count
+        return {
+            facet: [
+                {"value": value or None, "count": count}
+                for value, count in sorted(values.items(), key=lambda item: (-item[1], item[0]))
+            ]
+            for facet, values in facets.items()
+        }
+
+product_facet_counter = ProductFacetCounter()
+
+# 需要在flush前读取原值的商品字段，各计数模块注册各自依赖的字段
+_tracked_fields = set(FACET_FIELDS)
+
+# session.info 中保存flush前从数据库读取的原值，主键 -> {字段: 值}
+PREVIOUS_VALUES_KEY = "product_previous_values"
+
+def track_previous_values(fields: Iterable[str]) -> None:
+    """登记需要在 after_flush 中取得原值的商品字段"""
+    _tracked_fields.update(fields)
+
+def _history_value(state, field):
+    """属性历史中的原值，未加载（如提交后已过期）时返回 (False, None)"""
+    history = state.attrs[field].history
+    if history.deleted:
+        return True, history.deleted[0]
+    if history.unchanged:
+        return True, history.unchanged[0]
+    return False, None
+
+@event.listens_for(Session, "before_flush")
+def _capture_previous_values(session, flush_context, instances):
+    """
+    flush前从数据库读取将被修改或删除的商品的原值
+
+    提交后字段默认过期，之后再赋值时属性历史中没有原值，
+    写入后就无法再取得，因此在写入前对这些商品统一查询一次
+    """
+    fields = sorted(_tracked_fields)
+    pending = []
+    for obj in (*session.dirty, *session.deleted):
+        if not isinstance(obj, Product):
+            continue
+        state = inspect(obj)
+        if not state.has_identity:
+            continue
+        if obj not in session.deleted and not any(state.attrs[field].history.has_changes() for field in fields):
+            continue
+        if not all(_history_value(state, field)[0] for field in fields):
+            pending.append(state.identity[0])
+    loaded = {}
+    if pending:
+        rows = session.connection().execute(
+            select(Product.id, *(getattr(Product, field) for field in fields)).where(Product.id.in_(pending))
+        )
+        loaded = {row.id: row._asdict() for row in rows}
+    session.info[PREVIOUS_VALUES_KEY] = loaded
+
+def previous_values(obj, fields: Iterable[str]) -> dict:
+    """对象在本次flush之前的字段值，用于在 after_flush 中计算增量"""
+    state = inspect(obj)
+    loaded = {}
+    if state.session is not None and state.has_identity:
+        loaded = state.session.info.get(PREVIOUS_VALUES_KEY, {}).get(state.identity[0], {})
+    values = {}
+    for field in fields:
+        known, value = _history_value(state, field)
+        if known:
+            values[field] = value
+        elif field in loaded:
+            values[field] = loaded[field]
+        else:
+            values[field] = state.dict.get(field)
+    return values
+
+@event.listens_for(Session, "after_flush")
+def _count_product_facets(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Product):
+            key = facet_key({field: getattr(obj, field) for field in FACET_FIELDS})
+            if key:
+                deltas[key] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            key = facet_key(previous_values(obj, FACET_FIELDS))
+            if key:
+                deltas[key] -= 1
+    for obj in session.dirty:
+        if not isinstance(obj, Product):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[field].history.has_changes() for field in FACET_FIELDS):
+            continue
+        before = facet_key(previous_values(obj, FACET_FIELDS))
+        after = facet_key({field: state.dict.get(field) for field in FACET_FIELDS})
+        if before != after:
+            if before:
+                deltas[before] -= 1
+            if after:
+                deltas[after] += 1
+    if deltas:
+        product_facet_counter.adjust(session.connection(), deltas)
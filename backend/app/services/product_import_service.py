@@ -0,0 +1,253 @@
+import math
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.product import Product, ProductStatus, ProductType
+from ..schemas.product import ProductImportError, ProductImportResult, ProductImportRow
+from ..utils.excel import iter_csv_chunks, iter_workbook_chunks
+from ..utils.query import upsert_statement
+from .category_stats import category_stats
+from .product_catalog import product_catalog
+from .product_facets import product_facet_counter
+from .product_search import SEARCH_FIELDS, product_search_index
+from .product_tags import format_tags, parse_tags, product_tag_index
+from .response_cache import PRODUCT_TAG, STOCK_TAG, category_tag, response_cache
+
+# 导入列名 -> 产品字段，与导出列名一致，也可直接使用字段名
+IMPORT_COLUMNS = {
+    "SKU": "sku",
+    "商品名称": "name",
+    "中文名称": "chinese_name",
+    "描述": "description",
+    "分类": "category",
+    "类型": "type",
+    "状态": "status",
+    "价格": "price",
+    "成本": "cost",
+    "重量": "weight",
+    "体积": "volume",
+    "库存": "stock",
+    "预警阈值": "alert_threshold",
+    "标签": "tags",
+}
+IMPORT_FIELDS = set(IMPORT_COLUMNS.values())
+
+# 新建产品未提供时使用的默认值
+INSERT_DEFAULTS = {
+    "type": ProductType.PHYSICAL,
+    "status": ProductStatus.ACTIVE,
+    "cost": 0,
+    "freight_cost": 0,
+    "stock": 0,
+    "alert_threshold": 10,
+}
+
+_ROWS = TypeAdapter(List[ProductImportRow])
+
+def _clean(value):
+    """空单元格（None、NaN、空白字符串）统一为 None"""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+class ProductImportService:
+    """
+    产品批量导入服务
+
+    逐块读取CSV/XLSX，每块用 TypeAdapter 一次校验，按SKU使用 INSERT ... ON CONFLICT 批量写入：
+    upsert 模式更新已有产品（空单元格保留原值），insert 模式跳过已有SKU。
+    每块单独提交，并同步搜索索引、标签索引、分面计数和商品目录
+    """
+
+    def iter_chunks(self, path: str, filename: str) -> Iterator[pd.DataFrame]:
+        if filename.lower().endswith(".csv"):
+            return iter_csv_chunks(path)
+        return iter_workbook_chunks(path)
+
+    @staticmethod
+    def resolve_columns(columns) -> Dict[str, str]:
+        """表头 -> 产品字段，忽略无法识别的列"""
+        mapping = {}
+        for column in columns:
+            field = IMPORT_COLUMNS.get(column, column if column in IMPORT_FIELDS else None)
+            if field and field not in mapping.values():
+                mapping[column] = field
+        if "sku" not in mapping.values():
+            raise ValueError("缺少SKU列")
+        return mapping
+
+    def validate(
+        self,
+        df: pd.DataFrame,
+        mapping: Dict[str, str],
+        first_row: int,
+        result: ProductImportResult
+    ) -> List[Tuple[int, ProductImportRow]]:
+        """校验一块数据，返回 [(行号, 行数据)]，校验失败的行记入 result"""
+        records = [
+            {field: _clean(value) for field, value in zip(mapping.values(), values)}
+            for values in df[list(mapping)].itertuples(index=False, name=None)
+        ]
+        try:
+            rows = _ROWS.validate_python(records)
+            return [(first_row + index, row) for index, row in enumerate(rows)]
+        except ValidationError as e:
+            invalid = {}
+            for error in e.errors():
+                index = error["loc"][0]
+                field = error["loc"][1] if len(error["loc"]) > 1 else None
+                invalid.setdefault(index, (field, error["msg"]))
+
+        for index, (field, message) in invalid.items():
+            self._fail(result, first_row + index, records[index].get("sku"), field, message)
+        valid = [index for index in range(len(records)) if index not in invalid]
+        rows = _ROWS.validate_python([records[index] for index in valid])
+        return [(first_row + index, row) for index, row in zip(valid, rows)]
+
+    @staticmethod
+    def _fail(
+        result: ProductImportResult,
+        row: int,
+        sku: Optional[str],
+        field: Optional[str],
+        message: str
+    ) -> None:
+        result.failed += 1
+        if len(result.errors) < settings.IMPORT_MAX_ERRORS:
+            result.errors.append(ProductImportError(row=row, sku=sku, field=field, message=message))
+
+    def write(
+        self,
+        db: Session,
+        rows: List[Tuple[int, ProductImportRow]],
+        fields: Set[str],
+        mode: str,
+        user_id: Optional[int],
+        result: ProductImportResult,
+        categories: Set[Optional[str]]
+    ) -> None:
+        """按SKU批量写入一块已校验的数据"""
+        # 同一块内重复的SKU以最后一行为准
+        by_sku: Dict[str, Tuple[int, ProductImportRow]] = {}
+        for row_no, row in rows:
+            previous = by_sku.get(row.sku)
+            if previous:
+                result.skipped += 1
+                if len(result.errors) < settings.IMPORT_MAX_ERRORS:
+                    result.errors.append(ProductImportError(
+                        row=previous[0], sku=row.sku, field="sku", message=f"SKU重复，以第 {row_no} 行为准"
+                    ))
+            by_sku[row.sku] = (row_no, row)
+        if not by_sku:
+            return
+
+        conn = db.connection()
+        existing = {
+            sku: (product_id, category)
+            for sku, product_id, category in conn.execute(
+                select(Product.sku, Product.id, Product.category).where(Product.sku.in_(list(by_sku)))
+            )
+        }
+        if mode == "insert":
+            result.skipped += len(existing)
+            for sku in existing:
+                del by_sku[sku]
+            if not by_sku:
+                return
+        categories.update(category for _, category in existing.values())
+
+        now = datetime.utcnow()
+        update_fields = sorted(fields - {"sku"})
+        columns = set(fields) | set(INSERT_DEFAULTS) | {"updated_at", "created_by"}
+        params = []
+        for sku, (_, row) in by_sku.items():
+            values = row.model_dump(include=fields)
+            if values.get("type"):
+                values["type"] = ProductType(values["type"])
+            if values.get("status"):
+                values["status"] = ProductStatus(values["status"])
+            if values.get("tags"):
+                values["tags"] = format_tags(parse_tags(values["tags"]))
+            if sku not in existing:
+                # 新产品补默认值；已有产品的空值保留原值
+                for field, default in INSERT_DEFAULTS.items():
+                    if values.get(field) is None:
+                        values[field] = default
+            values["updated_at"] = now
+            values["created_by"] = user_id
+            params.append({column: values.get(column) for column in columns})
+            categories.add(values.get("category"))
+
+        existing_ids = [product_id for product_id, _ in existing.values()]
+        before = product_facet_counter.snapshot(conn, existing_ids)
+        categories_before = category_stats.snapshot(conn, existing_ids)
+        statement = upsert_statement(
+            conn, Product, ["sku"],
+            update_columns=(update_fields + ["updated_at"]) if mode == "upsert" else (),
+            skip_nulls=True
+        ).returning(Product.id, Product.sku)
+        written = conn.execute(statement, params).all()
+
+        product_ids = [product_id for product_id, _ in written]
+        created = [product_id for product_id, sku in written if sku not in existing]
+        result.created += len(created)
+        result.updated += len(written) - len(created)
+        result.skipped += len(params) - len(written)  # 并发导入时被其他事务先插入的SKU
+
+        # 同步依赖商品表的索引与计数
+        after = product_facet_counter.snapshot(conn, product_ids)
+        after.subtract(before)
+        product_facet_counter.adjust(conn, after)
+        category_stats.adjust(
+            conn, category_stats.difference(category_stats.snapshot(conn, product_ids), categories_before)
+        )
+        search_fields = {field for field, _ in SEARCH_FIELDS}
+        product_search_index.refresh(conn, product_ids if fields & search_fields else created)
+        product_tag_index.refresh(conn, product_ids if "tags" in fields else created)
+        product_catalog.record_changes(conn, product_ids)
+
+    def import_file(
+        self,
+        db: Session,
+        path: str,
+        filename: str,
+        mode: str = "upsert",
+        user_id: Optional[int] = None
+    ) -> ProductImportResult:
+        """导入产品文件，每块提交一次，返回逐行错误报告"""
+        started = time.perf_counter()
+        result = ProductImportResult(success=True, message="导入成功")
+        categories: Set[Optional[str]] = set()
+        first_row = 2  # 第1行为表头
+        try:
+            for df in self.iter_chunks(path, filename):
+                mapping = self.resolve_columns(df.columns)
+                rows = self.validate(df, mapping, first_row, result)
+                result.total += len(df)
+                first_row += len(df)
+                self.write(db, rows, set(mapping.values()), mode, user_id, result, categories)
+                db.commit()
+                product_catalog.mark_stale()
+        finally:
+            response_cache.invalidate(PRODUCT_TAG, STOCK_TAG, *(category_tag(c) for c in categories))
+
+        if result.failed:
+            result.message = f"导入完成，{result.failed} 行失败"
+        result.elapsed_seconds = round(time.perf_counter() - started, 3)
+        if result.elapsed_seconds:
+            result.rows_per_second = round(result.total / result.elapsed_seconds, 1)
+        return result
+
+product_import_service = ProductImportService()
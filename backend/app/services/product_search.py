@@ -0,0 +1,245 @@
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Float, Integer, event, func, inspect, or_, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query
+
+from ..config import settings
+from ..models.product import Product
+
+# 中日韩统一表意文字及扩展区、兼容区
+_CJK = r'㐀-䶿一-鿿豈-﫿'
+_RUN_PATTERN = re.compile(rf'[{_CJK}]+|[^\W_{_CJK}]+')
+_CJK_PATTERN = re.compile(rf'[{_CJK}]')
+
+# 参与搜索的字段及其在bm25排序中的权重
+SEARCH_FIELDS = (("sku", 10.0), ("name", 5.0), ("chinese_name", 5.0))
+PG_TRGM_INDEXES = {
+    "sku": "ix_products_sku_trgm",
+    "name": "ix_products_name_trgm",
+    "chinese_name": "ix_products_chinese_name_trgm",
+}
+
+def _runs(value: Optional[str]) -> List[str]:
+    """统一全半角和大小写后切分为连续的汉字段或字母数字段"""
+    if not value:
+        return []
+    return _RUN_PATTERN.findall(unicodedata.normalize("NFKC", value).lower())
+
+def index_terms(value: Optional[str]) -> str:
+    """
+    生成写入FTS5影子表的检索词
+
+    汉字段：单字和相邻两字；字母数字段：整词及所有单字母、两字母、三字母片段，
+    查询端按同样规则切分，可匹配任意位置的子串
+    """
+    terms = []
+    for run in _runs(value):
+        if _CJK_PATTERN.match(run):
+            terms.extend(run)
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+            for size in (1, 2, 3):
+                terms.extend(run[i:i + size] for i in range(len(run) - size + 1))
+    return " ".join(dict.fromkeys(terms))
+
+def match_expression(keyword: str) -> Optional[str]:
+    """
+    将搜索关键词转换为FTS5 MATCH表达式，所有片段均需命中
+
+    汉字段按相邻两字切分（单字直接匹配），字母数字段按三字母片段切分，
+    不足三个字母时整段匹配索引中的单字母或两字母片段
+    """
+    clauses = []
+    for run in _runs(keyword):
+        if _CJK_PATTERN.match(run):
+            grams = [run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)]
+        elif len(run) < 3:
+            grams = [run]
+        else:
+            grams = [run[i:i + 3] for i in range(len(run) - 2)]
+        clauses.extend(f'"{gram}"' for gram in dict.fromkeys(grams))
+    return " AND ".join(clauses) or None
+
+def needs_recheck(keyword: str) -> bool:
+    """
+    关键词含多个片段（被标点、空格隔开或汉字与字母数字相邻）时，
+    FTS5只能保证各片段分别命中，不能保证相邻，需要再用 ILIKE 核对原文
+    """
+    return len(_runs(keyword)) > 1
+
+class ProductSearchIndex:
+    """
+    商品搜索索引
+
+    PostgreSQL：为 sku/name/chinese_name 建立 pg_trgm GIN 索引，ILIKE 走索引，按相似度排序；
+    SQLite：维护 FTS5 影子表（rowid 为商品ID），写入时由ORM事件同步，
+    汉字按单字/双字、字母数字按一至三字母片段切分，按 bm25 排序
+    （命中数超过 SEARCH_RANK_LIMIT 的宽泛关键词改按商品ID排序，避免为大量结果计算相关度）；
+    其他数据库或未调用 ensure 时退化为 ILIKE 扫描。
+    绕过ORM的批量写入需调用 refresh 同步影子表
+    """
+
+    # 检索词规则变化时更换表名，启动时重建；旧表在 ensure 中删除
+    TABLE = "product_search_v2"
+    LEGACY_TABLES = ("product_search",)
+
+    def __init__(self):
+        self.dialect: Optional[str] = None
+        self.ready = False
+
+    def ensure(self, engine: Engine) -> None:
+        """创建索引结构，SQLite下影子表为空时全量重建；可重复执行"""
+        self.dialect = engine.dialect.name
+        if self.dialect == "postgresql":
+            with engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for column, index_name in PG_TRGM_INDEXES.items():
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS {index_name} "
+                        f"ON products USING gin ({column} gin_trgm_ops)"
+                    ))
+        elif self.dialect == "sqlite":
+            with engine.begin() as conn:
+                for table in self.LEGACY_TABLES:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} USING fts5("
+                    f"{', '.join(field for field, _ in SEARCH_FIELDS)}, tokenize='unicode61')"
+                ))
+                indexed = conn.execute(text(f"SELECT count(*) FROM {self.TABLE}")).scalar()
+                if not indexed:
+                    self.rebuild(conn)
+        self.ready = True
+
+    @property
+    def uses_fts(self) -> bool:
+        return self.ready and self.dialect == "sqlite"
+
+    def rebuild(self, conn: Connection, batch_size: int = 5000) -> int:
+        """按商品表全量重建FTS5影子表，返回写入行数"""
+        conn.execute(text(f"DELETE FROM {self.TABLE}"))
+        columns = [Product.id] + [getattr(Product, field) for field, _ in SEARCH_FIELDS]
+        total = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                select(*columns)
+                .where(Product.id > last_id)
+                .order_by(Product.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return total
+            self._write(conn, rows)
+            total += len(rows)
+            last_id = rows[-1].id
+
+    def _write(self, conn: Connection, rows: Iterable) -> None:
+        """写入（或替换）影子表记录"""
+        params = [
+            {"rowid": row.id, **{field: index_terms(getattr(row, field, None)) for field, _ in SEARCH_FIELDS}}
+            for row in rows
+        ]
+        if not params:
+            return
+        fields = [field for field, _ in SEARCH_FIELDS]
+        conn.execute(text(f"DELETE FROM {self.TABLE} WHERE rowid = :rowid"), [{"rowid": p["rowid"]} for p in params])
+        conn.execute(
+            text(
+                f"INSERT INTO {self.TABLE} (rowid, {', '.join(fields)}) "
+                f"VALUES (:rowid, {', '.join(':' + field for field in fields)})"
+            ),
+            params
+        )
+
+    def sync(self, conn: Connection, product) -> None:
+        """同步单个商品到影子表"""
+        if self.uses_fts:
+            self._write(conn, [product])
+
+    def refresh(self, conn: Connection, product_ids: Iterable[int]) -> None:
+        """按ID重新同步商品，已删除的商品从影子表移除"""
+        if not self.uses_fts:
+            return
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        conn.execute(
+            text(f"DELETE FROM {self.TABLE} WHERE rowid = :rowid"),
+            [{"rowid": product_id} for product_id in product_ids]
+        )
+        columns = [Product.id] + [getattr(Product, field) for field, _ in SEARCH_FIELDS]
+        self._write(conn, conn.execute(select(*columns).where(Product.id.in_(product_ids))).all())
+
+    def remove(self, conn: Connection, product_id: int) -> None:
+        """从影子表删除商品"""
+        if self.uses_fts:
+            conn.execute(text(f"DELETE FROM {self.TABLE} WHERE rowid = :rowid"), {"rowid": product_id})
+
+    @staticmethod
+    def _contains(keyword: str):
+        """任一搜索字段包含关键词原文"""
+        pattern = f"%{keyword}%"
+        return or_(*(getattr(Product, field).ilike(pattern) for field, _ in SEARCH_FIELDS))
+
+    def apply(self, query: Query, keyword: str) -> Query:
+        """为商品查询加上关键词过滤和相关度排序"""
+        keyword = keyword.strip()
+        if not keyword:
+            return query
+
+        expression = match_expression(keyword) if self.uses_fts else None
+        if expression is not None:
+            hits = query.session.execute(
+                text(f"SELECT count(*) FROM {self.TABLE} WHERE {self.TABLE} MATCH :expression"),
+                {"expression": expression}
+            ).scalar()
+            if hits <= settings.SEARCH_RANK_LIMIT:
+                weights = ", ".join(str(weight) for _, weight in SEARCH_FIELDS)
+                rank = f"bm25({self.TABLE}, {weights})"
+            else:
+                rank = "rowid"
+            matches = (
+                text(
+                    f"SELECT rowid AS product_id, {rank} AS rank "
+                    f"FROM {self.TABLE} WHERE {self.TABLE} MATCH :expression"
+                )
+                .bindparams(expression=expression)
+                .columns(product_id=Integer, rank=Float)
+                .subquery("search_matches")
+            )
+            query = query.join(matches, matches.c.product_id == Product.id)
+            if needs_recheck(keyword):
+                query = query.filter(self._contains(keyword))
+            # SKU完全相同的排在最前，其余按bm25（越小越相关）
+            return query.order_by(func.upper(Product.sku) != keyword.upper(), matches.c.rank)
+
+        query = query.filter(self._contains(keyword))
+        if self.ready and self.dialect == "postgresql":
+            relevance = func.greatest(*(
+                func.similarity(func.coalesce(getattr(Product, field), ""), keyword)
+                for field, _ in SEARCH_FIELDS
+            ))
+            return query.order_by(func.upper(Product.sku) != keyword.upper(), relevance.desc())
+        return query
+
+product_search_index = ProductSearchIndex()
+
+@event.listens_for(Product, "after_insert")
+def _index_product_search(mapper, connection, target):
+    product_search_index.sync(connection, target)
+
+@event.listens_for(Product, "after_update")
+def _sync_product_search(mapper, connection, target):
+    # 只有参与搜索的字段变化时才重写索引
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field, _ in SEARCH_FIELDS):
+        product_search_index.sync(connection, target)
+
+@event.listens_for(Product, "after_delete")
+def _remove_product_search(mapper, connection, target):
+    product_search_index.remove(connection, target.id)
@@ -0,0 +1,165 @@
+import json
+import re
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, event, func, inspect, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query, Session
+
+from ..models.product import Product, ProductTag
+
+_SEPARATOR = re.compile(r'[,，]')
+
+def parse_tags(value) -> List[str]:
+    """
+    解析商品标签，兼容逗号分隔的字符串、JSON数组字符串和列表
+
+    去除首尾空白，空标签丢弃，保持原有顺序去重
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("["):
+            try:
+                value = json.loads(text)
+            except ValueError:
+                value = _SEPARATOR.split(text.strip("[]"))
+        else:
+            value = _SEPARATOR.split(text)
+    tags = (str(tag).strip() for tag in value if tag is not None)
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+def format_tags(tags: Iterable[str]) -> str:
+    """将标签列表保存为 Product.tags 的逗号分隔格式"""
+    return ",".join(parse_tags(list(tags)))
+
+class ProductTagIndex:
+    """
+    商品标签索引
+
+    Product.tags 仍以逗号分隔字符串保存，同时在 product_tags 中按 (标签, 商品ID) 建立主键，
+    按标签筛选和统计只访问该索引；通过ORM写入商品时由映射事件同步，
+    绕过ORM的批量写入需调用 refresh
+    """
+
+    def ensure(self, engine: Engine) -> None:
+        """索引为空而商品已有标签时全量重建，用于未执行回填迁移的数据库；可重复执行"""
+        with engine.begin() as conn:
+            if conn.execute(select(ProductTag.product_id).limit(1)).first() is None:
+                if conn.execute(select(Product.id).where(Product.tags.isnot(None)).limit(1)).first():
+                    self.rebuild(conn)
+
+    def _write(self, conn: Connection, rows: Iterable[Tuple[int, object]]) -> None:
+        params = [
+            {"product_id": product_id, "tag": tag}
+            for product_id, tags in rows
+            for tag in parse_tags(tags)
+        ]
+        if params:
+            conn.execute(insert(ProductTag), params)
+
+    def sync(self, conn: Connection, product) -> None:
+        """按商品当前的标签重写索引"""
+        conn.execute(delete(ProductTag).where(ProductTag.product_id == product.id))
+        self._write(conn, [(product.id, product.tags)])
+
+    def refresh(self, conn: Connection, product_ids: Iterable[int]) -> None:
+        """按ID重新同步商品标签，已删除的商品从索引移除"""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        conn.execute(delete(ProductTag).where(ProductTag.product_id.in_(product_ids)))
+        self._write(conn, conn.execute(
+            select(Product.id, Product.tags).where(Product.id.in_(product_ids))
+        ).all())
+
+    def rebuild(self, conn: Connection, batch_size: int = 5000) -> int:
+        """按商品表全量重建标签索引，返回处理的商品数"""
+        conn.execute(delete(ProductTag))
+        total = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                select(Product.id, Product.tags)
+                .where(Product.id > last_id, Product.tags.isnot(None))
+                .order_by(Product.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return total
+            self._write(conn, rows)
+            total += len(rows)
+            last_id = rows[-1].id
+
+    def remove(self, conn: Connection, product_id: int) -> None:
+        conn.execute(delete(ProductTag).where(ProductTag.product_id == product_id))
+
+    @staticmethod
+    def matching(tags_any: Optional[Sequence[str]] = None, tags_all: Optional[Sequence[str]] = None):
+        """
+        返回满足标签条件的商品ID子查询，无条件时返回 None
+
+        tags_any 命中任一标签即可，tags_all 需包含全部标签；两者同时给出时取交集
+        """
+        tags_any = parse_tags(tags_any)
+        tags_all = parse_tags(tags_all)
+        if not tags_any and not tags_all:
+            return None
+
+        query = select(ProductTag.product_id)
+        if tags_all:
+            # 只读 (tag, product_id) 主键：命中的标签数等于要求的标签数
+            query = (
+                query.where(ProductTag.tag.in_(tags_all))
+                .group_by(ProductTag.product_id)
+                .having(func.count() == len(tags_all))
+            )
+            if tags_any:
+                query = query.where(ProductTag.product_id.in_(
+                    select(ProductTag.product_id).where(ProductTag.tag.in_(tags_any))
+                ))
+        else:
+            query = query.where(ProductTag.tag.in_(tags_any)).distinct()
+        return query
+
+    def apply(
+        self,
+        query: Query,
+        tags_any: Optional[Sequence[str]] = None,
+        tags_all: Optional[Sequence[str]] = None
+    ) -> Query:
+        """为商品查询加上标签过滤"""
+        matching = self.matching(tags_any, tags_all)
+        if matching is None:
+            return query
+        return query.filter(Product.id.in_(matching))
+
+    def facet_counts(self, db: Session, product_ids=None, limit: int = 50) -> List[dict]:
+        """
+        按标签统计商品数，按数量降序
+
+        product_ids 为商品ID子查询时只统计其中的商品，为 None 时直接汇总整个索引
+        """
+        count = func.count().label("count")
+        query = select(ProductTag.tag, count).group_by(ProductTag.tag)
+        if product_ids is not None:
+            query = query.where(ProductTag.product_id.in_(product_ids))
+        rows = db.execute(query.order_by(count.desc(), ProductTag.tag).limit(limit)).all()
+        return [{"tag": row.tag, "count": row.count} for row in rows]
+
+product_tag_index = ProductTagIndex()
+
+@event.listens_for(Product, "after_insert")
+def _index_product_tags(mapper, connection, target):
+    if target.tags:
+        product_tag_index.sync(connection, target)
+
+@event.listens_for(Product, "after_update")
+def _sync_product_tags(mapper, connection, target):
+    if inspect(target).attrs.tags.history.has_changes():
+        product_tag_index.sync(connection, target)
+
+@event.listens_for(Product, "after_delete")
+def _remove_product_tags(mapper, connection, target):
+    product_tag_index.remove(connection, target.id)
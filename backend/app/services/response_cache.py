@@ -0,0 +1,311 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Set, Tuple, Union
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.product import Product
+from ..models.stock import StockRecord
+
+class CacheBackend:
+    """缓存后端接口，值为JSON字符串，每个条目可带多个标签"""
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, expire: int, tags: Sequence[str] = ()) -> None:
+        raise NotImplementedError
+
+    def invalidate_tags(self, *tags: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内LRU缓存，超过 max_entries 时淘汰最久未使用的条目"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, expire: int, tags: Sequence[str] = ()) -> None:
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + expire, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_tags(self, *tags: str) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+class RedisCacheBackend(CacheBackend):
+    """
+    共享缓存后端，兼容Redis协议的客户端即可（get/set/delete/sadd/smembers/expire）
+
+    每个标签对应一个集合，记录带该标签的缓存键；按标签失效时删除集合中的全部键。
+    标签集合保留 tag_ttl 秒，集合中已过期的键在失效时删除不会产生影响
+    """
+
+    def __init__(self, client, prefix: str = "cache:", tag_ttl: int = 86400):
+        self.client = client
+        self.prefix = prefix
+        self.tag_ttl = tag_ttl
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    @staticmethod
+    def _decode(value: Union[bytes, str]) -> str:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        return None if value is None else self._decode(value)
+
+    def set(self, key: str, value: str, expire: int, tags: Sequence[str] = ()) -> None:
+        self.client.set(self.prefix + key, value, ex=expire)
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            self.client.sadd(tag_key, self.prefix + key)
+            self.client.expire(tag_key, max(expire, self.tag_ttl))
+
+    def invalidate_tags(self, *tags: str) -> None:
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys = [self._decode(key) for key in self.client.smembers(tag_key)]
+            self.client.delete(*keys, tag_key)
+
+    def clear(self) -> None:
+        self.client.flushdb()
+
+class LocalRedis:
+    """
+    进程内的Redis替身，实现 RedisCacheBackend 用到的命令，
+    用于测试和未部署Redis的单机环境
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], Any]] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._alive(key)
+            return value.encode("utf-8") if isinstance(value, str) else None
+
+    def set(self, key: str, value: str, ex: Optional[int] = None) -> bool:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ex if ex else None, value)
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def sadd(self, key: str, *members: str) -> int:
+        with self._lock:
+            members_set = self._alive(key)
+            if not isinstance(members_set, set):
+                members_set = set()
+                self._data[key] = (None, members_set)
+            before = len(members_set)
+            members_set.update(members)
+            return len(members_set) - before
+
+    def smembers(self, key: str) -> Set[bytes]:
+        with self._lock:
+            members_set = self._alive(key)
+            return {member.encode("utf-8") for member in members_set} if isinstance(members_set, set) else set()
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            value = self._alive(key)
+            if value is None:
+                return False
+            self._data[key] = (time.monotonic() + seconds, value)
+            return True
+
+    def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+            return True
+
+def create_backend() -> CacheBackend:
+    """按配置创建缓存后端：memory（默认）、redis 或 local（进程内Redis替身）"""
+    if settings.CACHE_BACKEND == "redis":
+        import redis  # 仅在使用共享缓存时需要安装
+
+        return RedisCacheBackend(redis.Redis.from_url(settings.CACHE_REDIS_URL), settings.CACHE_KEY_PREFIX)
+    if settings.CACHE_BACKEND == "local":
+        return RedisCacheBackend(LocalRedis(), settings.CACHE_KEY_PREFIX)
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+class ResponseCache:
+    """接口响应缓存，缓存键包含调用者的权限范围，按标签失效"""
+
+    # 不参与缓存键的参数
+    IGNORED_PARAMS = {"db", "current_user"}
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend or create_backend()
+
+    @staticmethod
+    def permission_scope(user) -> str:
+        """权限范围：管理员共用一份，其他用户按权限集合区分"""
+        if user is None:
+            return "anonymous"
+        if getattr(user, "role", None) == "admin":
+            return "admin"
+        permissions = sorted(getattr(user, "permissions", None) or [])
+        return hashlib.sha1(json.dumps(permissions).encode("utf-8")).hexdigest()[:16]
+
+    def make_key(self, func: Callable, params: Dict[str, Any], user=None) -> str:
+        values = {
+            name: value for name, value in params.items()
+            if name not in self.IGNORED_PARAMS
+        }
+        digest = hashlib.sha1(
+            json.dumps(jsonable_encoder(values), sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        return f"{func.__module__}.{func.__qualname__}:{self.permission_scope(user)}:{digest}"
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.backend.get(key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value: Any, expire: int, tags: Iterable[str] = ()) -> None:
+        self.backend.set(key, json.dumps(value, ensure_ascii=False), expire, list(tags))
+
+    def invalidate(self, *tags: str) -> None:
+        if tags:
+            self.backend.invalidate_tags(*tags)
+
+    def cached(
+        self,
+        expire: int,
+        tags: Union[Sequence[str], Callable[[Dict[str, Any]], Sequence[str]]],
+        response_model=None
+    ):
+        """
+        缓存接口返回值的装饰器
+
+        tags 可以是固定列表，或根据接口参数返回标签列表的函数；
+        response_model 用于将ORM对象转换为可序列化的数据
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = self.make_key(func, kwargs, kwargs.get("current_user"))
+                hit = self.get(key)
+                if hit is not None:
+                    return hit
+
+                result = await func(*args, **kwargs)
+                if response_model is not None:
+                    result = response_model.model_validate(result)
+                payload = jsonable_encoder(result)
+                self.set(key, payload, expire, tags(kwargs) if callable(tags) else tags)
+                return payload
+            return wrapper
+        return decorator
+
+response_cache = ResponseCache()
+
+# 通过ORM写入的商品和库存变更在事务提交后自动失效相关缓存，
+# 绕过ORM的批量语句需自行调用 response_cache.invalidate
+PRODUCT_TAG = "products"
+STOCK_TAG = "stock"
+
+def category_tag(category: Optional[str]) -> str:
+    return f"category:{category}"
+
+def product_tags(product, changed: Optional[Set[str]] = None) -> Set[str]:
+    """商品变更需要失效的标签，changed 为空表示新增或删除"""
+    state = inspect(product)
+    tags = {category_tag(product.category)}
+    category = state.attrs.category.history
+    tags.update(category_tag(value) for value in category.deleted or ())
+    if changed is None or changed - {"stock", "updated_at"}:
+        tags.add(PRODUCT_TAG)
+    if changed is None or "stock" in changed:
+        tags.add(STOCK_TAG)
+    return tags
+
+@event.listens_for(Session, "after_flush")
+def _collect_cache_tags(session, flush_context):
+    tags = session.info.setdefault("cache_tags", set())
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Product):
+            tags.update(product_tags(obj))
+        elif isinstance(obj, StockRecord):
+            tags.add(STOCK_TAG)
+    for obj in session.dirty:
+        if isinstance(obj, Product):
+            changed = {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+            if changed:
+                tags.update(product_tags(obj, changed))
+        elif isinstance(obj, StockRecord):
+            tags.add(STOCK_TAG)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_cache_tags(session):
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        response_cache.invalidate(*tags)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_cache_tags(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("cache_tags", None)
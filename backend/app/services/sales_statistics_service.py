@@ -0,0 +1,110 @@
+from datetime import date, datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import case, distinct, func, select
+from sqlalchemy.orm import Session
+
+from ..models.product import Product
+from ..models.sales import Order, OrderItem, OrderStatus, SalesStatistics
+from ..utils.query import upsert_statement
+
+STATISTICS_COLUMNS = [
+    "order_count", "completed_order_count", "cancelled_order_count", "total_sales", "total_cost",
+    "gross_profit", "shipping_fee", "tax", "discount", "total_items", "unique_items",
+    "average_order_value", "conversion_rate", "updated_at"
+]
+
+Key = Tuple[date, str, str]
+
+class SalesStatisticsService:
+    """
+    销售统计计算
+
+    整个日期范围只执行两次分组查询（订单、明细），按 (日期, 店铺, 平台) 合并后
+    一条批量 upsert 写入 sales_statistics，回填长时间段的代价与天数基本无关
+    """
+
+    @staticmethod
+    def _order_totals(db: Session, start_date: date, end_date: date) -> Dict[Key, dict]:
+        key = (Order.order_date, Order.store_name, Order.platform)
+        rows = db.execute(
+            select(
+                *key,
+                func.count(Order.id).label("order_count"),
+                func.sum(case((Order.status == OrderStatus.COMPLETED, 1), else_=0)).label("completed_order_count"),
+                func.sum(case((Order.status == OrderStatus.CANCELLED, 1), else_=0)).label("cancelled_order_count"),
+                func.coalesce(func.sum(Order.total), 0).label("total_sales"),
+                func.coalesce(func.sum(Order.shipping_fee), 0).label("shipping_fee"),
+                func.coalesce(func.sum(Order.tax), 0).label("tax"),
+                func.coalesce(func.sum(Order.discount), 0).label("discount")
+            )
+            .where(Order.order_date.between(start_date, end_date))
+            .group_by(*key)
+        )
+        return {(row.order_date, row.store_name, row.platform): row._asdict() for row in rows}
+
+    @staticmethod
+    def _item_totals(db: Session, start_date: date, end_date: date) -> Dict[Key, dict]:
+        key = (Order.order_date, Order.store_name, Order.platform)
+        rows = db.execute(
+            select(
+                *key,
+                func.coalesce(func.sum(OrderItem.quantity), 0).label("total_items"),
+                func.count(distinct(OrderItem.product_id)).label("unique_items"),
+                func.coalesce(func.sum(OrderItem.quantity * func.coalesce(Product.cost, 0)), 0).label("total_cost")
+            )
+            .select_from(OrderItem)
+            .join(Order, OrderItem.order_id == Order.id)
+            .outerjoin(Product, OrderItem.product_id == Product.id)
+            .where(Order.order_date.between(start_date, end_date))
+            .group_by(*key)
+        )
+        return {(row.order_date, row.store_name, row.platform): row._asdict() for row in rows}
+
+    def calculate(self, db: Session, start_date: date, end_date: date) -> int:
+        """计算日期范围内（含两端）每天各店铺、平台的销售统计，返回写入的记录数；由调用方提交"""
+        if start_date > end_date:
+            raise ValueError("开始日期不能晚于结束日期")
+
+        orders = self._order_totals(db, start_date, end_date)
+        items = self._item_totals(db, start_date, end_date)
+
+        now = datetime.utcnow()
+        params = []
+        for key, totals in orders.items():
+            item_totals = items.get(key, {})
+            order_count = totals["order_count"]
+            total_sales = float(totals["total_sales"])
+            total_cost = float(item_totals.get("total_cost") or 0)
+            params.append({
+                "date": key[0],
+                "store_name": key[1],
+                "platform": key[2],
+                "order_count": order_count,
+                "completed_order_count": totals["completed_order_count"] or 0,
+                "cancelled_order_count": totals["cancelled_order_count"] or 0,
+                "total_sales": total_sales,
+                "total_cost": total_cost,
+                "gross_profit": total_sales - total_cost,
+                "shipping_fee": float(totals["shipping_fee"]),
+                "tax": float(totals["tax"]),
+                "discount": float(totals["discount"]),
+                "total_items": item_totals.get("total_items") or 0,
+                "unique_items": item_totals.get("unique_items") or 0,
+                "average_order_value": total_sales / order_count if order_count else 0,
+                "conversion_rate": (totals["completed_order_count"] or 0) / order_count if order_count else 0,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        if params:
+            conn = db.connection()
+            conn.execute(
+                upsert_statement(
+                    conn, SalesStatistics, ["date", "store_name", "platform"], update_columns=STATISTICS_COLUMNS
+                ),
+                params
+            )
+        return len(params)
+
+sales_statistics_service = SalesStatisticsService()
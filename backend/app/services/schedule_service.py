@@ -1,3 +1,4 @@
+import asyncio
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, timedelta
@@ -8,6 +9,7 @@ from ..database import SessionLocal
 from ..models.operation_log import OperationLog
 from ..models.user import User
 from .backup_service import backup_service, BackupType
+from .datalake_service import datalake_service, ExportMode
 
 class ScheduleService:
     def __init__(self):
@@ -26,6 +28,10 @@ class ScheduleService:
         # 每30天清理一次过期日志
         self.schedule_clean_logs("0 4 */30 * *")
         
+        # 每天凌晨2点增量导出数据湖，每周日全量重写一次
+        self.schedule_datalake_export("0 2 * * 1-6", ExportMode.INCREMENTAL)
+        self.schedule_datalake_export("0 2 * * 0", ExportMode.FULL)
+        
         # 启动调度器
         self.scheduler.start()
 
@@ -101,6 +107,29 @@ class ScheduleService:
         self.jobs[job_id] = cron
         print(f"已调度日志清理任务: {cron}")
 
+    def schedule_datalake_export(self, cron: str, mode: ExportMode = ExportMode.INCREMENTAL):
+        """调度数据湖导出任务"""
+        job_id = f"datalake_{mode}"
+        
+        async def datalake_job():
+            try:
+                print(f"开始执行{mode}数据湖导出任务...")
+                # 导出耗时较长，放到线程中执行，避免阻塞事件循环
+                result = await asyncio.to_thread(datalake_service.export_all, mode)
+                print(f"{mode}数据湖导出任务完成: {result}")
+                
+            except Exception as e:
+                print(f"{mode}数据湖导出任务执行失败:", str(e))
+        
+        self.scheduler.add_job(
+            datalake_job,
+            CronTrigger.from_crontab(cron),
+            id=job_id,
+            replace_existing=True
+        )
+        self.jobs[job_id] = cron
+        print(f"已调度{mode}数据湖导出任务: {cron}")
+
     def cancel_all_jobs(self):
         """取消所有定时任务"""
         for job_id in self.jobs:
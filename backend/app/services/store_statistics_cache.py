@@ -0,0 +1,65 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    """去掉时区信息，便于与查询参数比较"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.replace(tzinfo=None)
+
+class StoreStatisticsCache:
+    """
+    店铺统计缓存
+
+    按 (开始时间, 结束时间) 缓存统计结果；装箱单变更时只清除覆盖其创建时间的范围。
+    缓存保存在进程内，STATS_CACHE_TTL 限定多进程部署时其他进程变更造成的最长延迟
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[Optional[datetime], Optional[datetime]], Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, start: Optional[datetime], end: Optional[datetime]) -> Optional[Any]:
+        """获取缓存的统计结果，过期或不存在时返回None"""
+        key = (_naive(start), _naive(end))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            return value
+
+    def set(self, start: Optional[datetime], end: Optional[datetime], value: Any) -> None:
+        """缓存统计结果"""
+        key = (_naive(start), _naive(end))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, *created_at: Optional[datetime]) -> None:
+        """
+        清除覆盖指定创建时间的缓存范围
+
+        不传参数或任一时间为None时清除全部缓存
+        """
+        with self._lock:
+            if not created_at or any(moment is None for moment in created_at):
+                self._entries.clear()
+                return
+
+            moments = [_naive(moment) for moment in created_at]
+            for start, end in list(self._entries):
+                if any(
+                    (start is None or moment >= start) and (end is None or moment <= end)
+                    for moment in moments
+                ):
+                    self._entries.pop((start, end), None)
+
+store_statistics_cache = StoreStatisticsCache(settings.STATS_CACHE_TTL)
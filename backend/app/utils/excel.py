@@ -1,10 +1,26 @@
-from typing import BinaryIO, Dict, List, Optional
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+import codecs
+import csv
+import enum
+import math
+import numbers
+import os
+import re
+import shutil
+import tempfile
+import zipfile
 import pandas as pd
-from openpyxl import Workbook
+from fastapi import UploadFile
+from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 import io
 
+from ..config import settings
+
 def read_workbook(file: BinaryIO) -> pd.DataFrame:
     """读取Excel文件"""
     try:
@@ -15,6 +31,186 @@ def read_workbook(file: BinaryIO) -> pd.DataFrame:
     except Exception as e:
         raise ValueError(f"读取Excel文件失败: {str(e)}")
 
+async def spool_upload(
+    file: UploadFile,
+    max_size: Optional[int] = None,
+    directory: Optional[str] = None
+) -> str:
+    """
+    将上传文件分块写入磁盘临时文件，返回文件路径
+
+    超过 max_size（默认 IMPORT_MAX_FILE_SIZE）时抛出 ValueError，
+    调用方负责在处理完成后删除临时文件
+    """
+    max_size = max_size or settings.IMPORT_MAX_FILE_SIZE
+    suffix = os.path.splitext(file.filename or "")[1] or ".xlsx"
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="import_", dir=directory)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await file.read(settings.IMPORT_SPOOL_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError(f"文件大小超过限制({max_size // (1024 * 1024)}MB)")
+                f.write(chunk)
+        return path
+    except Exception:
+        os.remove(path)
+        raise
+
+def cell_text(value: Any) -> Optional[str]:
+    """
+    按文本读取单元格：空单元格为 None，纯数字单元格转为文本
+
+    同一列有空单元格时 pandas 把整列读成浮点数，整数值去掉小数部分（12345.0 -> "12345"）
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return str(int(value)) if float(value).is_integer() else str(value)
+    text = str(value).strip()
+    return text or None
+
+def iter_workbook_chunks(
+    path: str,
+    chunk_rows: Optional[int] = None,
+    sheet_name: Optional[str] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    以只读模式逐行读取Excel，每 chunk_rows 行生成一个DataFrame
+
+    内存占用只与批大小有关，与文件大小无关；空行会被跳过。
+    没有数据行（含空工作表）时仍生成一个只有表头的空DataFrame，调用方可照常校验列
+    """
+    chunk_rows = chunk_rows or settings.IMPORT_CHUNK_ROWS
+    try:
+        wb = load_workbook(path, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f"读取Excel文件失败: {str(e)}")
+    
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.active
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        
+        # 清理列名（去除空格）
+        columns = [str(c).strip() if c is not None else "" for c in header]
+        width = len(columns)
+        
+        buffer = []
+        yielded = False
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            # 只读模式下行长度可能与表头不一致，统一补齐/截断
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns)
+                yielded = True
+                buffer = []
+        
+        if buffer or not yielded:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        wb.close()
+
+def iter_csv_chunks(path: str, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    逐块读取CSV，每 chunk_rows 行生成一个DataFrame
+
+    所有列按字符串读取，空单元格为空字符串；兼容带BOM的UTF-8和GBK编码
+    """
+    chunk_rows = chunk_rows or settings.IMPORT_CHUNK_ROWS
+    with open(path, 'rb') as f:
+        head = f.read(64 * 1024)
+    try:
+        # 增量解码，允许开头片段截断在多字节字符中间
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'gbk'
+    
+    try:
+        reader = pd.read_csv(
+            path, dtype=str, keep_default_na=False, encoding=encoding,
+            chunksize=chunk_rows, skip_blank_lines=True
+        )
+        for df in reader:
+            df.columns = [str(c).strip() for c in df.columns]
+            yield df
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise ValueError(f"读取CSV文件失败: {str(e)}")
+
+def extract_workbooks(zip_path: str, target_dir: str) -> List[Tuple[str, str]]:
+    """
+    解压zip中的Excel文件，返回 [(文件名, 路径)]
+
+    忽略目录结构和非xlsx文件，兼容Windows压缩工具使用GBK编码的中文文件名
+    """
+    workbooks = []
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            for index, info in enumerate(zf.infolist()):
+                if info.is_dir():
+                    continue
+                
+                name = info.filename
+                if not info.flag_bits & 0x800:  # 未声明UTF-8编码
+                    try:
+                        name = name.encode('cp437').decode('gbk')
+                    except (UnicodeEncodeError, UnicodeDecodeError):
+                        pass
+                name = os.path.basename(name)
+                if not name.endswith('.xlsx') or name.startswith('~$'):
+                    continue
+                if info.file_size > settings.IMPORT_MAX_FILE_SIZE:
+                    raise ValueError(f"{name} 大小超过限制({settings.IMPORT_MAX_FILE_SIZE // (1024 * 1024)}MB)")
+                
+                path = os.path.join(target_dir, f"zip_{index}.xlsx")
+                with zf.open(info) as src, open(path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, settings.IMPORT_SPOOL_CHUNK_SIZE)
+                workbooks.append((name, path))
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"无法解压文件: {str(e)}")
+    return workbooks
+
+# 装箱单导出列（列名, 列宽）
+PACKING_LIST_HEADERS = [
+    ('店铺', 15),
+    ('类型', 10),
+    ('SKU', 15),
+    ('中文名称', 30),
+    ('数量', 10),
+    ('箱号', 15),
+    ('装箱数量', 10),
+    ('规格', 20),
+    ('重量(kg)', 12),
+    ('体积(m³)', 12),
+    ('备注', 20)
+]
+
+def iter_packing_list_rows(data: Iterable[Dict]) -> Iterator[List]:
+    """将装箱单明细展开为每箱一行的导出数据"""
+    for item in data:
+        for box in item.get('box_quantities') or []:
+            yield [
+                item.get('store_name', ''),
+                item.get('type', ''),
+                item.get('sku', ''),
+                item.get('chinese_name', ''),
+                item.get('quantity', 0),
+                box.get('box_no', ''),
+                box.get('quantity', 0),
+                box.get('specs', ''),
+                item.get('weight', 0),
+                item.get('volume', 0),
+                item.get('remarks', '')
+            ]
+
 def create_workbook(data: List[Dict], template_type: str = "packing_list") -> bytes:
     """创建Excel文件"""
     wb = Workbook()
@@ -33,19 +229,7 @@ def create_workbook(data: List[Dict], template_type: str = "packing_list") -> by
     
     if template_type == "packing_list":
         # 装箱单模板
-        headers = [
-            ('店铺', 15),
-            ('类型', 10),
-            ('SKU', 15),
-            ('中文名称', 30),
-            ('数量', 10),
-            ('箱号', 15),
-            ('装箱数量', 10),
-            ('规格', 20),
-            ('重量(kg)', 12),
-            ('体积(m³)', 12),
-            ('备注', 20)
-        ]
+        headers = PACKING_LIST_HEADERS
         
         # 设置表头
         for col, (header, width) in enumerate(headers, 1):
@@ -58,28 +242,15 @@ def create_workbook(data: List[Dict], template_type: str = "packing_list") -> by
         
         # 填充数据
         row = 2
-        for item in data:
-            for box in item.get('box_quantities', []):
-                ws.append([
-                    item.get('store_name', ''),
-                    item.get('type', ''),
-                    item.get('sku', ''),
-                    item.get('chinese_name', ''),
-                    item.get('quantity', 0),
-                    box.get('box_no', ''),
-                    box.get('quantity', 0),
-                    box.get('specs', ''),
-                    item.get('weight', 0),
-                    item.get('volume', 0),
-                    item.get('remarks', '')
-                ])
-                
-                # 设置单元格样式
-                for col in range(1, len(headers) + 1):
-                    cell = ws.cell(row=row, column=col)
-                    cell.border = border
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                row += 1
+        for values in iter_packing_list_rows(data):
+            ws.append(values)
+            
+            # 设置单元格样式
+            for col in range(1, len(headers) + 1):
+                cell = ws.cell(row=row, column=col)
+                cell.border = border
+                cell.alignment = Alignment(horizontal='center', vertical='center')
+            row += 1
     
     # 保存为字节流
     output = io.BytesIO()
@@ -114,4 +285,176 @@ def parse_packing_list(df: pd.DataFrame) -> List[Dict]:
             'remarks': group.iloc[0].get('备注', '')
         })
     
-    return result 
\ No newline at end of file
+    return result 
+
+# ---------------------------------------------------------------------------
+# 流式导出
+# ---------------------------------------------------------------------------
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+
+# 每写入多少行向客户端输出一次
+STREAM_FLUSH_ROWS = 500
+
+_ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# 样式0为普通单元格，样式1为表头（与 create_workbook 一致：微软雅黑加粗、灰色底纹）
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="微软雅黑"/></font></fonts>'
+    '<fills count="3"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FFD9D9D9"/><bgColor rgb="FFD9D9D9"/></patternFill></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+class _StreamBuffer:
+    """只追加的写缓冲，zipfile 会将其视为不可寻址的输出流"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _export_value(value: Any) -> Any:
+    """将导出值转换为基础类型"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _xlsx_cell(value: Any, style: int = 0) -> str:
+    """生成单元格XML，字符串使用内联字符串，无需共享字符串表"""
+    value = _export_value(value)
+    style_attr = f' s="{style}"' if style else ''
+    if value is None or value == '':
+        return f'<c{style_attr}/>'
+    if isinstance(value, bool):
+        return f'<c t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if value != value or value in (float('inf'), float('-inf')):  # NaN/无穷大
+            return f'<c{style_attr}/>'
+        return f'<c{style_attr}><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+def stream_workbook(
+    headers: Sequence[Tuple[str, float]],
+    rows: Iterable[Sequence],
+    sheet_name: str = "Sheet1"
+) -> Iterator[bytes]:
+    """
+    以流式方式生成单工作表的xlsx文件
+
+    headers 为 [(列名, 列宽)]；数据行边生成边压缩输出，
+    内存占用与行数无关，首个字节在读取数据前即可发出
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        zf.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        zf.writestr('xl/styles.xml', _XLSX_STYLES)
+        zf.writestr(
+            'xl/workbook.xml',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        )
+        yield buffer.drain()
+        
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            cols = ''.join(
+                f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>'
+                for i, (_, width) in enumerate(headers, 1)
+            )
+            header_cells = ''.join(_xlsx_cell(name, style=1) for name, _ in headers)
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<cols>{cols}</cols><sheetData><row r="1">{header_cells}</row>'
+            ).encode('utf-8'))
+            
+            lines = []
+            for row_no, values in enumerate(rows, 2):
+                lines.append(f'<row r="{row_no}">{"".join(_xlsx_cell(v) for v in values)}</row>')
+                if len(lines) >= STREAM_FLUSH_ROWS:
+                    sheet.write(''.join(lines).encode('utf-8'))
+                    lines = []
+                    yield buffer.drain()
+            
+            sheet.write((''.join(lines) + '</sheetData></worksheet>').encode('utf-8'))
+    yield buffer.drain()
+
+def stream_csv(headers: Sequence[Tuple[str, float]], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """以流式方式生成CSV文件（带BOM，Excel可直接识别中文）"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([name for name, _ in headers])
+    yield ('\ufeff' + output.getvalue()).encode('utf-8')
+    
+    output.seek(0)
+    output.truncate()
+    for count, values in enumerate(rows, 1):
+        writer.writerow([_export_value(v) for v in values])
+        if count % STREAM_FLUSH_ROWS == 0:
+            yield output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue().encode('utf-8')
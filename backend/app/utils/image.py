@@ -0,0 +1,63 @@
+from typing import List
+import os
+
+from PIL import Image, ImageOps
+
+# Pillow 格式名 -> 媒体类型，仅接受以下格式的原图
+IMAGE_MEDIA_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+    'GIF': 'image/gif',
+}
+THUMBNAIL_MEDIA_TYPE = 'image/jpeg'
+
+def thumbnail_path(path: str, size: int) -> str:
+    """原图对应尺寸的缩略图路径"""
+    return f"{path}_{size}.jpg"
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """转换为JPEG可保存的RGB，透明区域填充白色"""
+    if image.mode in ('RGB', 'L'):
+        return image
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+def render_thumbnails(path: str, sizes: List[int], max_pixels: int) -> dict:
+    """
+    校验原图并生成各尺寸缩略图，可在子进程中执行
+
+    缩略图按最长边等比缩放为JPEG，写在原图旁（见 thumbnail_path），已存在的尺寸跳过；
+    从大到小依次缩放，较小尺寸以上一尺寸为源。返回原图的媒体类型与宽高，
+    无法识别或不支持的图片抛出 ValueError
+    """
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(path) as image:
+            image.verify()
+        image = Image.open(path)
+    except Exception as e:
+        raise ValueError(f"无法识别的图片: {e}")
+
+    with image:
+        media_type = IMAGE_MEDIA_TYPES.get(image.format)
+        if media_type is None:
+            raise ValueError(f"不支持的图片格式: {image.format}")
+        width, height = image.size
+
+        pending = [size for size in sorted(sizes, reverse=True) if not os.path.exists(thumbnail_path(path, size))]
+        if pending:
+            # JPEG按目标尺寸降采样解码，大图无需完整解码
+            image.draft('RGB', (pending[0], pending[0]))
+            source = _flatten(ImageOps.exif_transpose(image))
+            for size in pending:
+                source = source.copy()
+                source.thumbnail((size, size), Image.LANCZOS)
+                target = thumbnail_path(path, size)
+                temp = f"{target}.{os.getpid()}.tmp"
+                source.save(temp, 'JPEG', quality=85, optimize=True, progressive=True)
+                os.replace(temp, target)
+
+    return {'media_type': media_type, 'width': width, 'height': height}
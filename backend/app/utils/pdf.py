@@ -0,0 +1,198 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import io
+
+from pypdf import PdfWriter
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfgen import canvas
+
+PDF_MEDIA_TYPE = 'application/pdf'
+ZIP_MEDIA_TYPE = 'application/zip'
+
+# 内置中文字体，无需字体文件
+PDF_FONT = 'STSong-Light'
+
+@lru_cache(maxsize=None)
+def _font() -> str:
+    """注册中文字体，每个进程只注册一次"""
+    pdfmetrics.registerFont(UnicodeCIDFont(PDF_FONT))
+    return PDF_FONT
+
+@lru_cache(maxsize=None)
+def _template(kind: str) -> dict:
+    """打印模板（页面尺寸、边距、列定义），每个进程首次使用时构建"""
+    if kind == 'packing_list':
+        return {
+            'page_size': A4,
+            'margin': 15 * mm,
+            'row_height': 7 * mm,
+            # (列名, 列宽, 取值键)
+            'columns': [
+                ('SKU', 45 * mm, 'sku'),
+                ('品名', 65 * mm, 'name'),
+                ('数量', 20 * mm, 'quantity'),
+                ('箱号/装箱数量', 50 * mm, 'boxes'),
+            ],
+        }
+    if kind == 'box_label':
+        return {
+            'page_size': (100 * mm, 150 * mm),
+            'margin': 6 * mm,
+            'row_height': 6 * mm,
+        }
+    raise ValueError(f"未知的打印模板: {kind}")
+
+def _fit(c: canvas.Canvas, text: str, width: float, font: str, size: float) -> str:
+    """截断超出列宽的文字"""
+    text = '' if text is None else str(text)
+    if c.stringWidth(text, font, size) <= width:
+        return text
+    while text and c.stringWidth(text + '…', font, size) > width:
+        text = text[:-1]
+    return text + '…'
+
+def _draw_packing_list(c: canvas.Canvas, document: dict) -> None:
+    """绘制装箱单，明细超出一页时自动分页并重复表头"""
+    font = _font()
+    template = _template('packing_list')
+    page_width, page_height = template['page_size']
+    margin = template['margin']
+    row_height = template['row_height']
+    columns = template['columns']
+
+    def header(page: int) -> float:
+        c.setPageSize(template['page_size'])
+        c.setFont(font, 16)
+        c.drawString(margin, page_height - margin - 6 * mm, f"装箱单 #{document['id']}")
+        c.setFont(font, 10)
+        c.drawRightString(page_width - margin, page_height - margin - 6 * mm, f"第 {page} 页")
+        c.drawString(
+            margin, page_height - margin - 13 * mm,
+            f"店铺：{document.get('store_name') or ''}    类型：{document.get('type') or ''}    "
+            f"总箱数：{len(document['boxes'])}    总件数：{document['total_pieces']}"
+        )
+        if document.get('remarks'):
+            c.drawString(margin, page_height - margin - 19 * mm, _fit(c, f"备注：{document['remarks']}", page_width - 2 * margin, font, 10))
+
+        y = page_height - margin - 28 * mm
+        x = margin
+        c.setFont(font, 10)
+        for title, width, _ in columns:
+            c.drawString(x + 1 * mm, y + 2 * mm, title)
+            x += width
+        c.line(margin, y, page_width - margin, y)
+        return y - row_height
+
+    page = 1
+    y = header(page)
+    c.setFont(font, 9)
+    for item in document['items']:
+        if y < margin:
+            c.showPage()
+            page += 1
+            y = header(page)
+            c.setFont(font, 9)
+        x = margin
+        for _, width, key in columns:
+            c.drawString(x + 1 * mm, y + 2 * mm, _fit(c, item[key], width - 2 * mm, font, 9))
+            x += width
+        y -= row_height
+    c.showPage()
+
+def _draw_box_labels(c: canvas.Canvas, document: dict) -> None:
+    """每箱一张标签：店铺、装箱单号、箱号及箱内SKU"""
+    font = _font()
+    template = _template('box_label')
+    page_width, page_height = template['page_size']
+    margin = template['margin']
+    row_height = template['row_height']
+    total = len(document['boxes'])
+
+    for index, (box_no, contents) in enumerate(document['boxes'].items(), start=1):
+        c.setPageSize(template['page_size'])
+        c.setFont(font, 12)
+        c.drawString(margin, page_height - margin - 5 * mm, _fit(c, document.get('store_name'), page_width - 2 * margin, font, 12))
+        c.setFont(font, 9)
+        c.drawString(margin, page_height - margin - 11 * mm, f"装箱单 #{document['id']}  {document.get('type') or ''}")
+        c.setFont(font, 28)
+        c.drawCentredString(page_width / 2, page_height - margin - 28 * mm, str(box_no))
+        c.setFont(font, 10)
+        c.drawCentredString(page_width / 2, page_height - margin - 35 * mm, f"第 {index} 箱 / 共 {total} 箱")
+        c.line(margin, page_height - margin - 39 * mm, page_width - margin, page_height - margin - 39 * mm)
+
+        y = page_height - margin - 39 * mm - row_height
+        c.setFont(font, 9)
+        for sku, quantity in contents:
+            if y < margin + row_height:
+                c.drawString(margin, y, '…')
+                break
+            c.drawString(margin, y, _fit(c, sku, page_width - 2 * margin - 15 * mm, font, 9))
+            c.drawRightString(page_width - margin, y, str(quantity))
+            y -= row_height
+        c.showPage()
+
+def render_packing_lists(
+    documents: List[dict],
+    include_packing_list: bool = True,
+    include_labels: bool = True,
+    split: bool = False
+) -> List[Tuple[str, bytes]]:
+    """
+    渲染装箱单及箱标签，可在子进程中执行
+
+    split 为 True 时每个装箱单单独生成一个PDF，否则整批生成一个PDF；
+    返回 [(文件名, PDF内容)]
+    """
+    def render(batch: List[dict]) -> bytes:
+        buffer = io.BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+        for document in batch:
+            if include_packing_list:
+                _draw_packing_list(c, document)
+            if include_labels:
+                _draw_box_labels(c, document)
+        c.save()
+        return buffer.getvalue()
+
+    if split:
+        return [(f"packing_list_{document['id']}.pdf", render([document])) for document in documents]
+    return [(f"packing_lists_{documents[0]['id']}.pdf", render(documents))] if documents else []
+
+def build_print_documents(rows) -> List[dict]:
+    """将按装箱单、明细排序的查询结果组装为打印数据，并按箱号汇总箱内SKU"""
+    documents: Dict[int, dict] = {}
+    for row in rows:
+        document = documents.get(row['packing_list_id'])
+        if document is None:
+            document = documents[row['packing_list_id']] = {
+                'id': row['packing_list_id'],
+                'store_name': row.get('store_name'),
+                'type': row.get('type'),
+                'remarks': row.get('remarks'),
+                'total_pieces': 0,
+                'items': [],
+                'boxes': {},
+            }
+        box_quantities = row.get('box_quantities') or []
+        document['items'].append({
+            'sku': row['sku'],
+            'name': row.get('chinese_name') or row.get('name') or '',
+            'quantity': row['quantity'],
+            'boxes': ', '.join(f"{box['box_no']}×{box['quantity']}" for box in box_quantities),
+        })
+        document['total_pieces'] += row['quantity'] or 0
+        for box in box_quantities:
+            document['boxes'].setdefault(str(box['box_no']), []).append((row['sku'], box['quantity']))
+    return list(documents.values())
+
+def merge_pdfs(parts: List[bytes]) -> bytes:
+    """按顺序合并多个PDF"""
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(io.BytesIO(part))
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
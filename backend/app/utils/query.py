@@ -0,0 +1,104 @@
+from collections import defaultdict, deque
+from typing import Dict, Iterator, List, Sequence
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Query, Session
+
+def iter_keyset(query: Query, key_column, batch_size: int = 1000) -> Iterator:
+    """
+    按键列游标分批遍历查询结果（keyset分页）
+
+    每批使用 key > 上一批最后一个键 的条件查询，代价与偏移量无关；
+    key_column 需唯一且出现在查询结果中
+    """
+    last_key = None
+    while True:
+        batch_query = query if last_key is None else query.filter(key_column > last_key)
+        batch = batch_query.order_by(key_column).limit(batch_size).all()
+        if not batch:
+            return
+        yield from batch
+        last_key = getattr(batch[-1], key_column.key)
+        if len(batch) < batch_size:
+            return
+
+def sync_rows(
+    db: Session,
+    model,
+    filters: Sequence,
+    key_fields: Sequence[str],
+    value_fields: Sequence[str],
+    rows: List[dict]
+) -> Dict[str, int]:
+    """
+    将子表记录同步为 rows 描述的状态，只执行必要的批量增删改
+
+    现有记录按 key_fields 分组，按id顺序与传入记录逐一配对（同键多条时按出现顺序配对）；
+    配对成功且 value_fields 有变化的批量更新，未配对的传入记录批量插入，剩余的现有记录批量删除。
+    rows 中需包含插入所需的全部列（如外键），返回各操作的行数
+    """
+    columns = [model.id] + [getattr(model, field) for field in (*key_fields, *value_fields)]
+    existing = defaultdict(deque)
+    for row in db.execute(select(*columns).where(*filters).order_by(model.id)):
+        existing[tuple(getattr(row, field) for field in key_fields)].append(row)
+
+    inserts, updates = [], []
+    for data in rows:
+        matches = existing.get(tuple(data[field] for field in key_fields))
+        if not matches:
+            inserts.append(data)
+            continue
+        current = matches.popleft()
+        changes = {
+            field: data[field]
+            for field in value_fields
+            if field in data and getattr(current, field) != data[field]
+        }
+        if changes:
+            updates.append({"id": current.id, **changes})
+
+    delete_ids = [row.id for matches in existing.values() for row in matches]
+    if delete_ids:
+        db.execute(
+            delete(model).where(model.id.in_(delete_ids)),
+            execution_options={"synchronize_session": False}
+        )
+    if updates:
+        db.execute(update(model), updates)
+    if inserts:
+        db.execute(insert(model), inserts)
+
+    return {"created": len(inserts), "updated": len(updates), "deleted": len(delete_ids)}
+
+def upsert_statement(
+    bind,
+    table,
+    index_elements: Sequence[str],
+    update_columns: Sequence[str] = (),
+    increment_columns: Sequence[str] = (),
+    skip_nulls: bool = False
+):
+    """
+    构造 INSERT ... ON CONFLICT 语句（PostgreSQL/SQLite）
+
+    冲突时 update_columns 取新值（skip_nulls 为 True 时新值为空则保留原值），
+    increment_columns 累加新值，两者都为空时忽略冲突行；
+    bind 为连接或引擎，用于确定数据库方言，table 可以是模型或表
+    """
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"不支持的数据库: {dialect}")
+
+    table = getattr(table, "__table__", table)
+    statement = dialect_insert(table)
+    values = {
+        column: func.coalesce(statement.excluded[column], table.c[column]) if skip_nulls else statement.excluded[column]
+        for column in update_columns
+    }
+    values.update({column: table.c[column] + statement.excluded[column] for column in increment_columns})
+    if not values:
+        return statement.on_conflict_do_nothing(index_elements=index_elements)
+    return statement.on_conflict_do_update(index_elements=index_elements, set_=values)
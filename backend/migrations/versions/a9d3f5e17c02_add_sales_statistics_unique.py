@@ -0,0 +1,54 @@
+"""销售统计按日期/店铺/平台唯一
+
+Revision ID: a9d3f5e17c02
+Revises: f2c6a8e41d95
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3f5e17c02'
+down_revision = 'f2c6a8e41d95'
+branch_labels = None
+depends_on = None
+
+CONSTRAINT_NAME = 'uq_sales_statistics_date_store_platform'
+COLUMNS = ['date', 'store_name', 'platform']
+
+
+def _has_unique(inspector):
+    """create_all 建表的数据库已包含该约束"""
+    if any(c['name'] == CONSTRAINT_NAME or c['column_names'] == COLUMNS
+           for c in inspector.get_unique_constraints('sales_statistics')):
+        return True
+    return any(index['unique'] and index['column_names'] == COLUMNS
+               for index in inspector.get_indexes('sales_statistics'))
+
+
+def upgrade() -> None:
+    # sales_statistics 不在迁移中创建，由启动时 create_all 建表；
+    # 已有表不会补建约束，统计的 ON CONFLICT 写入依赖该约束
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('sales_statistics') or _has_unique(inspector):
+        return
+
+    # 同一日期/店铺/平台保留最后写入的一条
+    op.execute(
+        'DELETE FROM sales_statistics WHERE id NOT IN ('
+        'SELECT max_id FROM ('
+        'SELECT MAX(id) AS max_id FROM sales_statistics GROUP BY date, store_name, platform'
+        ') AS latest)'
+    )
+    with op.batch_alter_table('sales_statistics') as batch_op:
+        batch_op.create_unique_constraint(CONSTRAINT_NAME, COLUMNS)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('sales_statistics'):
+        return
+    if any(c['name'] == CONSTRAINT_NAME for c in inspector.get_unique_constraints('sales_statistics')):
+        with op.batch_alter_table('sales_statistics') as batch_op:
+            batch_op.drop_constraint(CONSTRAINT_NAME, type_='unique')
@@ -0,0 +1,33 @@
+"""新增商品SKU大写表达式索引
+
+Revision ID: b3e8c6d20f47
+Revises: a9d3f5e17c02
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8c6d20f47'
+down_revision = 'a9d3f5e17c02'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'ix_products_sku_upper'
+
+
+def _has_products():
+    return sa.inspect(op.get_bind()).has_table('products')
+
+
+def upgrade() -> None:
+    # 商品目录未命中时按 upper(sku) 回查数据库，没有该索引时每次都扫描全表；
+    # 表达式索引无法通过反射检查（SQLite 会跳过），用 IF NOT EXISTS 兼容 create_all 已建的索引
+    if _has_products():
+        op.create_index(INDEX_NAME, 'products', [sa.text('upper(sku)')], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    if _has_products():
+        op.drop_index(INDEX_NAME, table_name='products', if_exists=True)
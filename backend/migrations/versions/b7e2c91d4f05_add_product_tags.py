@@ -0,0 +1,75 @@
+"""新增商品标签索引表并回填
+
+Revision ID: b7e2c91d4f05
+Revises: initial_migration
+Create Date: 2026-10-19
+
+"""
+import json
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c91d4f05'
+down_revision = 'initial_migration'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+def _parse_tags(value):
+    """与 app.services.product_tags.parse_tags 一致，兼容逗号分隔和JSON数组"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("["):
+            try:
+                value = json.loads(text)
+            except ValueError:
+                value = re.split(r'[,，]', text.strip("[]"))
+        else:
+            value = re.split(r'[,，]', text)
+    tags = (str(tag).strip() for tag in value if tag is not None)
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+def upgrade() -> None:
+    # 创建商品标签表，主键 (tag, product_id) 供按标签筛选和统计
+    product_tags = op.create_table(
+        'product_tags',
+        sa.Column('tag', sa.String(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('tag', 'product_id')
+    )
+    op.create_index('ix_product_tags_product_id', 'product_tags', ['product_id'], unique=False)
+
+    # 按主键分批回填现有商品的标签
+    conn = op.get_bind()
+    products = sa.table('products', sa.column('id', sa.Integer()), sa.column('tags', sa.String()))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(products.c.id, products.c.tags)
+            .where(products.c.id > last_id, products.c.tags.isnot(None))
+            .order_by(products.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        params = [
+            {'tag': tag, 'product_id': product_id}
+            for product_id, tags in rows
+            for tag in _parse_tags(tags)
+        ]
+        if params:
+            conn.execute(sa.insert(product_tags), params)
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_tags_product_id', table_name='product_tags')
+    op.drop_table('product_tags')
@@ -0,0 +1,46 @@
+"""新增头程运费分摊相关列
+
+Revision ID: c41f7a9e0b3d
+Revises: b7e2c91d4f05
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c41f7a9e0b3d'
+down_revision = 'b7e2c91d4f05'
+branch_labels = None
+depends_on = None
+
+# (表名, 列)；表由启动时 create_all 创建的数据库可能已包含这些列
+COLUMNS = [
+    ('products', sa.Column('freight_cost', sa.Float(), nullable=True, server_default='0')),
+    ('packing_lists', sa.Column('chargeable_weight', sa.Float(), nullable=True)),
+    ('packing_lists', sa.Column('freight_cost', sa.Float(), nullable=True, server_default='0')),
+    ('packing_list_items', sa.Column('freight_cost', sa.Float(), nullable=True, server_default='0')),
+    ('packing_list_items', sa.Column('landed_cost', sa.Float(), nullable=True)),
+]
+
+
+def _existing_columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    for table, column in COLUMNS:
+        existing = _existing_columns(table)
+        if existing is not None and column.name not in existing:
+            op.add_column(table, column)
+
+
+def downgrade() -> None:
+    for table, column in reversed(COLUMNS):
+        existing = _existing_columns(table)
+        if existing is not None and column.name in existing:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column(column.name)
@@ -0,0 +1,99 @@
+"""新增装箱扫码进度列与扫码记录表
+
+Revision ID: d8e25b6c1a70
+Revises: c41f7a9e0b3d
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd8e25b6c1a70'
+down_revision = 'c41f7a9e0b3d'
+branch_labels = None
+depends_on = None
+
+# packing_scans 的外键：删除装箱单时删除扫码记录，删除明细时明细ID置空
+SCAN_FOREIGN_KEYS = [
+    ('packing_list_id', 'packing_lists', 'CASCADE'),
+    ('packing_item_id', 'packing_items', 'SET NULL'),
+]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    # packing_items 不在迁移中创建，由启动时 create_all 建表
+    if not inspector.has_table('packing_items'):
+        return
+
+    columns = {column['name'] for column in inspector.get_columns('packing_items')}
+    if 'packed_quantity' not in columns:
+        op.add_column(
+            'packing_items',
+            sa.Column('packed_quantity', sa.Integer(), nullable=False, server_default='0')
+        )
+    if 'is_packed' not in columns:
+        op.add_column(
+            'packing_items',
+            sa.Column('is_packed', sa.Boolean(), nullable=False, server_default=sa.false())
+        )
+
+    if not inspector.has_table('packing_scans'):
+        op.create_table(
+            'packing_scans',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('event_id', sa.String(length=64), nullable=False),
+            sa.Column('packing_list_id', sa.Integer(), nullable=False),
+            sa.Column('packing_item_id', sa.Integer(), nullable=True),
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('code', sa.String(), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('box_no', sa.String(length=20), nullable=True),
+            sa.Column('scanned_by', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['packing_list_id'], ['packing_lists.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['packing_item_id'], ['packing_items.id'], ondelete='SET NULL'),
+            sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+            sa.ForeignKeyConstraint(['scanned_by'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_packing_scans_id', 'packing_scans', ['id'], unique=False)
+        op.create_index('ix_packing_scans_event_id', 'packing_scans', ['event_id'], unique=True)
+        op.create_index('ix_packing_scans_packing_list_id', 'packing_scans', ['packing_list_id'], unique=False)
+        return
+
+    # 已由 create_all 建表的数据库：放开明细ID非空并重建外键的删除规则；
+    # SQLite 未开启外键约束，且无法按名称删除未命名外键，只修改可空性
+    is_sqlite = conn.dialect.name == 'sqlite'
+    foreign_keys = {
+        tuple(fk['constrained_columns']): fk['name']
+        for fk in inspector.get_foreign_keys('packing_scans')
+    }
+    with op.batch_alter_table('packing_scans') as batch_op:
+        batch_op.alter_column('packing_item_id', existing_type=sa.Integer(), nullable=True)
+        if is_sqlite:
+            return
+        for column, target, ondelete in SCAN_FOREIGN_KEYS:
+            name = foreign_keys.get((column,))
+            if name:
+                batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(
+                f'packing_scans_{column}_fkey', target, [column], ['id'], ondelete=ondelete
+            )
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('packing_items'):
+        return
+    if inspector.has_table('packing_scans'):
+        op.drop_index('ix_packing_scans_packing_list_id', table_name='packing_scans')
+        op.drop_index('ix_packing_scans_event_id', table_name='packing_scans')
+        op.drop_index('ix_packing_scans_id', table_name='packing_scans')
+        op.drop_table('packing_scans')
+    with op.batch_alter_table('packing_items') as batch_op:
+        batch_op.drop_column('is_packed')
+        batch_op.drop_column('packed_quantity')
@@ -0,0 +1,44 @@
+"""新增商品体积与装箱单明细重量、体积列
+
+Revision ID: e4b7d0c92f18
+Revises: d8e25b6c1a70
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7d0c92f18'
+down_revision = 'd8e25b6c1a70'
+branch_labels = None
+depends_on = None
+
+# (表名, 列)；均可为空，未维护的重量、体积不按0计算
+COLUMNS = [
+    ('products', sa.Column('volume', sa.Float(), nullable=True)),
+    ('packing_list_items', sa.Column('weight', sa.Float(), nullable=True)),
+    ('packing_list_items', sa.Column('volume', sa.Float(), nullable=True)),
+]
+
+
+def _existing_columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    for table, column in COLUMNS:
+        existing = _existing_columns(table)
+        if existing is not None and column.name not in existing:
+            op.add_column(table, column)
+
+
+def downgrade() -> None:
+    for table, column in reversed(COLUMNS):
+        existing = _existing_columns(table)
+        if existing is not None and column.name in existing:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column(column.name)
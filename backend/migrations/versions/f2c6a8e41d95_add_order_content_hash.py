@@ -0,0 +1,36 @@
+"""新增平台导入订单的内容哈希列
+
+Revision ID: f2c6a8e41d95
+Revises: e4b7d0c92f18
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a8e41d95'
+down_revision = 'e4b7d0c92f18'
+branch_labels = None
+depends_on = None
+
+
+def _existing_columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    # orders 不在迁移中创建，由启动时 create_all 建表；已有的订单哈希为空，下次导入时整体写入一次
+    existing = _existing_columns('orders')
+    if existing is not None and 'content_hash' not in existing:
+        op.add_column('orders', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    existing = _existing_columns('orders')
+    if existing is not None and 'content_hash' in existing:
+        with op.batch_alter_table('orders') as batch_op:
+            batch_op.drop_column('content_hash')
@@ -0,0 +1,39 @@
+from app.models.product import Product, ProductCategory, ProductStatus
+from app.services.category_stats import category_stats  # noqa: F401  注册分类维度的flush监听
+
+def _category(db, name):
+    db.expire_all()
+    return db.query(ProductCategory).filter(ProductCategory.name == name).one()
+
+def test_update_after_commit_adjusts_category_stock(db):
+    product = Product(sku="A-1", name="a", category="服装", cost=2, stock=0, status=ProductStatus.ACTIVE)
+    db.add(product)
+    db.commit()
+    assert _category(db, "服装").stockout_count == 1
+
+    # 提交后字段已过期，修改时属性历史中没有原值
+    product.stock = 50
+    db.commit()
+    category = _category(db, "服装")
+    assert category.stock_units == 50
+    assert category.stock_value == 100
+    assert (category.in_stock_count, category.stockout_count) == (1, 0)
+
+def test_category_change_after_commit_moves_product(db):
+    product = Product(sku="A-1", name="a", category="服装", cost=2, stock=3, status=ProductStatus.ACTIVE)
+    db.add(product)
+    db.commit()
+
+    product.category = "数码"
+    db.commit()
+    assert _category(db, "服装").product_count == 0
+    assert (_category(db, "数码").product_count, _category(db, "数码").stock_units) == (1, 3)
+
+def test_cost_change_after_commit_updates_stock_value(db):
+    product = Product(sku="A-1", name="a", category="服装", cost=2, stock=5, status=ProductStatus.ACTIVE)
+    db.add(product)
+    db.commit()
+
+    product.cost = 4
+    db.commit()
+    assert _category(db, "服装").stock_value == 20
@@ -0,0 +1,16 @@
+import pandas as pd
+
+from app.utils.excel import cell_text
+
+def test_cell_text_reads_numeric_skus_as_text():
+    # 列中有空单元格时 pandas 将整列读成浮点数
+    column = pd.Series([12345, None, "ab-1 ", 1.5]).astype(object)
+    column[0] = 12345.0
+    column[1] = float("nan")
+
+    assert column.map(cell_text).tolist() == ["12345", None, "ab-1", "1.5"]
+
+def test_cell_text_treats_blank_cells_as_empty():
+    assert cell_text(None) is None
+    assert cell_text("   ") is None
+    assert cell_text(7) == "7"
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from app.models.import_manifest import ImportStatus
+from app.services.import_manifest_service import import_manifest_service
+
+def _claim(db, stale_seconds=600):
+    manifest, claimed = import_manifest_service.claim(db, "orders:default", "a" * 64, "orders.csv", None, stale_seconds)
+    db.commit()
+    return manifest, claimed
+
+def test_new_manifest_is_claimed_once(db):
+    manifest, claimed = _claim(db)
+    assert claimed
+    assert manifest.status == ImportStatus.PROCESSING
+
+    # 导入进行中，重复上传不会再启动一次
+    _, claimed = _claim(db)
+    assert not claimed
+
+def test_failed_manifest_is_reclaimed(db):
+    manifest, _ = _claim(db)
+    import_manifest_service.fail(db, manifest, "中断")
+    db.commit()
+
+    manifest, claimed = _claim(db)
+    assert claimed
+    assert manifest.status == ImportStatus.PROCESSING
+    assert manifest.error is None
+
+def test_completed_manifest_is_not_claimed(db):
+    manifest, _ = _claim(db)
+    import_manifest_service.finish(db, manifest, {"total": 1})
+    db.commit()
+
+    manifest, claimed = _claim(db)
+    assert not claimed
+    assert manifest.status == ImportStatus.COMPLETED
+
+def test_stale_processing_manifest_is_reclaimed(db):
+    manifest, _ = _claim(db)
+    manifest.updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+
+    _, claimed = _claim(db)
+    assert claimed
@@ -0,0 +1,45 @@
+from app.models.packing_list import PackingListItem
+from app.services.product_catalog import CatalogProduct
+
+def _product(product_id, weight=None, volume=None):
+    return CatalogProduct(product_id, f"SKU-{product_id}", "", None, 10.0, 5.0, weight, volume, (), "active", None, None)
+
+def test_item_from_catalog_multiplies_weight_and_volume():
+    item = PackingListItem.from_catalog(7, _product(1, weight=0.5, volume=0.002), 4, [{"box_no": "1", "quantity": 4}])
+
+    assert (item.packing_list_id, item.product_id, item.quantity) == (7, 1, 4)
+    assert item.weight == 2.0
+    assert abs(item.volume - 0.008) < 1e-9
+
+def test_item_from_catalog_keeps_missing_weight_and_volume_empty():
+    item = PackingListItem.from_catalog(7, _product(2), 3, [{"box_no": "1", "quantity": 3}])
+
+    # 商品未维护重量、体积时留空，而不是按0写入
+    assert item.weight is None
+    assert item.volume is None
+
+def test_sync_rows_recomputes_weight_and_volume_on_quantity_change(db):
+    from sqlalchemy import select
+    from app.utils.query import sync_rows
+
+    products = {1: _product(1, weight=0.5, volume=0.002), 2: _product(2, weight=1.0)}
+    fields = ["quantity", "box_quantities", "weight", "volume"]
+
+    def sync(quantities):
+        items = [PackingListItem.from_catalog(7, products[pid], qty, []) for pid, qty in quantities.items()]
+        return sync_rows(
+            db, PackingListItem, [PackingListItem.packing_list_id == 7],
+            key_fields=["product_id"], value_fields=fields,
+            rows=[{"packing_list_id": 7, "product_id": item.product_id, **{f: getattr(item, f) for f in fields}} for item in items]
+        )
+
+    sync({1: 2})
+    assert sync({1: 4, 2: 3}) == {"created": 1, "updated": 1, "deleted": 0}
+
+    rows = {
+        row.product_id: row
+        for row in db.execute(select(PackingListItem.product_id, PackingListItem.weight, PackingListItem.volume))
+    }
+    assert rows[1].weight == 2.0 and abs(rows[1].volume - 0.008) < 1e-9
+    # 新增明细同样写入重量，商品未维护体积时留空
+    assert rows[2].weight == 3.0 and rows[2].volume is None
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+from app.database import get_db
+from app.dependencies import get_current_user
+from app.models import PackingItem, PackingList, Product, User
+from app.routers.packing import router
+
+@pytest.fixture
+def client(engine, db):
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, permissions="packing_lists:read")
+    return TestClient(app)
+
+def _add_lists(engine, count, items_per_list=3):
+    with engine.begin() as conn:
+        conn.execute(insert(Product), [{"id": 1, "sku": "A-1", "name": "a"}])
+        list_ids = conn.execute(
+            insert(PackingList).returning(PackingList.id),
+            [{"name": f"装箱单{index}", "created_by": 1, "updated_at": datetime(2026, 1, 1)} for index in range(count)]
+        ).scalars().all()
+        conn.execute(insert(PackingItem), [
+            {"packing_list_id": list_id, "product_id": 1, "quantity": 2}
+            for list_id in list_ids for _ in range(items_per_list)
+        ])
+
+def _count_queries(engine, request):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    return response, len(statements)
+
+def test_list_page_costs_fixed_number_of_queries(engine, client):
+    _add_lists(engine, 20)
+
+    one, one_queries = _count_queries(engine, lambda: client.get("/api/packing/", params={"limit": 1}))
+    many, many_queries = _count_queries(engine, lambda: client.get("/api/packing/", params={"limit": 20}))
+
+    assert len(one.json()) == 1 and len(many.json()) == 20
+    assert all(len(packing_list["items"]) == 3 for packing_list in many.json())
+    # 装箱单 + 明细，与分页大小无关
+    assert one_queries == many_queries == 2
+
+def test_get_packing_list_loads_items_in_one_query(engine, client):
+    _add_lists(engine, 2)
+
+    response, queries = _count_queries(engine, lambda: client.get("/api/packing/1"))
+    assert len(response.json()["items"]) == 3
+    assert queries == 2
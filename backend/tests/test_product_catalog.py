@@ -0,0 +1,46 @@
+from sqlalchemy import event, func, insert, select
+
+from app.models.product import Product
+from app.services.product_catalog import ProductCatalog
+
+def _add_products(engine, *rows):
+    with engine.begin() as conn:
+        conn.execute(insert(Product), list(rows))
+
+def test_get_many_falls_back_to_database(engine, db):
+    _add_products(engine, {"id": 1, "sku": "A-1", "name": "a", "weight": 1.5})
+    catalog = ProductCatalog()
+    catalog.load(db)
+
+    # 其他进程刚创建、尚未同步到目录的商品
+    _add_products(engine, {"id": 2, "sku": "B-2", "name": "b", "volume": 0.02})
+
+    products = catalog.get_many(db, [1, 2, 2, 3])
+    assert set(products) == {1, 2}
+    assert products[1].weight == 1.5
+    assert products[2].volume == 0.02
+    assert catalog.get(db, 2).sku == "B-2"
+
+def test_load_does_not_commit_caller_session(engine, db):
+    db.add(Product(sku="PENDING", name="pending"))
+    ProductCatalog().load(db)
+
+    assert db.new
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(Product)).scalar() == 0
+
+def test_by_skus_fallback_uses_sku_index(engine, db):
+    _add_products(engine, {"id": 1, "sku": "A-1", "name": "a"})
+    catalog = ProductCatalog()
+    catalog.load(db)
+    _add_products(engine, {"id": 2, "sku": "B-2", "name": "b"})
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    assert catalog.by_skus(db, ["b-2"])["b-2"].id == 2
+
+    fallback = next(statement for statement in statements if "upper(products.sku) IN" in statement)
+    with engine.connect() as conn:
+        plan = " ".join(str(row[-1]) for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {fallback}", ("B-2",)))
+    # 回查按表达式索引定位，不扫描商品表
+    assert "ix_products_sku_upper" in plan
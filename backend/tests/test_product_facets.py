@@ -0,0 +1,26 @@
+from app.models.product import Product, ProductStatus
+from app.services.product_facets import IN_STOCK, OUT_OF_STOCK, product_facet_counter
+
+def _stock_states(db):
+    counts = product_facet_counter.counts(db)
+    return {key[2]: count for key, count in counts.items()}
+
+def test_update_after_commit_moves_facet_count(db):
+    product = Product(sku="A-1", name="a", category="服装", price=10, stock=0, status=ProductStatus.ACTIVE)
+    db.add(product)
+    db.commit()
+    assert _stock_states(db) == {OUT_OF_STOCK: 1}
+
+    # 提交后字段已过期，修改时属性历史中没有原值
+    product.stock = 50
+    db.commit()
+    assert _stock_states(db) == {IN_STOCK: 1}
+
+def test_delete_after_commit_removes_facet_count(db):
+    product = Product(sku="A-1", name="a", category="服装", price=10, stock=5, status=ProductStatus.ACTIVE)
+    db.add(product)
+    db.commit()
+
+    db.delete(product)
+    db.commit()
+    assert _stock_states(db) == {}
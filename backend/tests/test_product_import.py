@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from app.schemas.product import ProductImportRow
+
+@pytest.mark.parametrize("cell, expected", [
+    (12345, "12345"),
+    (12345.0, "12345"),
+    (np.int64(678), "678"),
+    (np.float64(90.0), "90"),
+    (1.5, "1.5"),
+    (" ab-1 ", "AB-1"),
+])
+def test_numeric_sku_cells_are_read_as_text(cell, expected):
+    assert ProductImportRow(sku=cell).sku == expected
+
+def test_numeric_text_fields_are_read_as_text():
+    row = ProductImportRow(sku="A-1", name=2024, category=3.0, tags=7, price=12)
+    assert (row.name, row.category, row.tags) == ("2024", "3", "7")
+    assert row.price == 12.0
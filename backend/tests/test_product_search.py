@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+from app.services.product_search import index_terms, match_expression, needs_recheck
+
+PRODUCTS = {
+    1: "ABC-12345",
+    2: "abcd",
+    3: "蓝牙耳机",
+    4: "XYZ-900",
+}
+
+@pytest.fixture
+def search_table():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE VIRTUAL TABLE search USING fts5(sku, tokenize='unicode61')")
+    conn.executemany(
+        "INSERT INTO search (rowid, sku) VALUES (?, ?)",
+        [(product_id, index_terms(sku)) for product_id, sku in PRODUCTS.items()]
+    )
+    yield conn
+    conn.close()
+
+def _search(conn, keyword):
+    rows = conn.execute("SELECT rowid FROM search WHERE search MATCH ?", (match_expression(keyword),))
+    return {rowid for (rowid,) in rows}
+
+@pytest.mark.parametrize("keyword, expected", [
+    ("5", {1}),
+    ("d", {2}),
+    ("cd", {2}),
+    ("234", {1}),
+    ("abc", {1, 2}),
+    ("ABC-12345", {1}),
+    ("ｂｃｄ", {2}),
+    ("耳", {3}),
+    ("牙耳", {3}),
+])
+def test_substring_matches(search_table, keyword, expected):
+    assert _search(search_table, keyword) == expected
+
+def test_keyword_with_punctuation_matches_and_needs_recheck(search_table):
+    assert 1 in _search(search_table, "C-12")
+    assert needs_recheck("C-12")
+    assert not needs_recheck("12345")
+
+def test_no_match(search_table):
+    assert _search(search_table, "qq") == set()